@@ -3,82 +3,323 @@
 Listens for ``text.committed`` and emits ``plugin.rewrite`` with the
 corrected text. Idle if ``OPENAI_API_KEY`` is unset.
 
+Requests run concurrently on asyncio (``AsyncOpenAI``, one client and one
+connection pool for the process): at most ``GRAMMAR_GUARD_MAX_IN_FLIGHT``
+at a time, each bounded by ``GRAMMAR_GUARD_TIMEOUT_SEC``. Rewrites are
+published as they finish, keyed by the ``orig_ts`` of the commit they
+answer, so the note exporter files them correctly even out of order.
+``OPENAI_BASE_URL`` points it at any OpenAI-compatible server.
+
+Batching is opt-in: with ``GRAMMAR_GUARD_BATCH_WINDOW_MS`` > 0, commits
+arriving within that window (up to ``GRAMMAR_GUARD_BATCH_MAX``) go out as
+one JSON-mode request and the answer is split back into one
+``plugin.rewrite`` per ``orig_ts``. If the reply does not parse, the
+batch is retried as single requests. Batch size and latency
+distributions are logged.
+
+It publishes a heartbeat every ``GAINS_PLUGIN_HEARTBEAT_SEC`` from its
+event loop, so the supervisor restarts it if the loop wedges.
+
+Answers are kept in the shared rewrite cache
+(:mod:`services.plugins.cache`), so a repeated phrase is answered from
+memory or disk without a round trip; hit/miss counts are logged on exit.
+
 Bug fixes vs. previous version:
 * ``openai.ChatCompletion.create`` was removed in openai-python 1.0
   (Nov 2023). Uses the v1 client (``client.chat.completions.create``).
 * Default model bumped from ``gpt-3.5-turbo`` to ``gpt-4o-mini``.
 * Wire endpoints updated for the bus' XSUB side.
+* The API call ran synchronously inside the receive loop, so one slow
+  round trip delayed every later commit. Requests are now concurrent with
+  per-request timeouts.
+* Repeated phrases paid a full LLM round trip every time; they are now
+  served from the rewrite cache.
+* Per-request overhead dominated under load; commits can now be
+  micro-batched.
+* A wedged plug-in silently stopped rewrites; it now heartbeats so the
+  supervisor can restart it.
 """
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
 import os
 import time
+from collections import Counter, deque
+from collections.abc import Callable, Coroutine
+from typing import Any
 
-import zmq
+from services.bus.client import get_client
+from services.bus.protocol import PLUGIN_REWRITE, TEXT_COMMITTED
+from services.plugins.cache import RewriteCache, default_path
+from services.plugins.heartbeat import HEARTBEAT_SEC, beat, heartbeat
 
 log = logging.getLogger("gains.plugin.grammar_guard")
 
 MODEL = os.getenv("GRAMMAR_GUARD_MODEL", "gpt-4o-mini")
+MAX_IN_FLIGHT = int(os.getenv("GRAMMAR_GUARD_MAX_IN_FLIGHT", "4"))
+TIMEOUT_SEC = float(os.getenv("GRAMMAR_GUARD_TIMEOUT_SEC", "20"))
+BATCH_WINDOW_SEC = float(os.getenv("GRAMMAR_GUARD_BATCH_WINDOW_MS", "0")) / 1000
+BATCH_MAX = int(os.getenv("GRAMMAR_GUARD_BATCH_MAX", "8"))
 PROMPT = (
     "Rewrite the text with correct grammar but keep the meaning identical. "
     "Reply with the rewrite only, no commentary."
 )
+BATCH_PROMPT = (
+    "You receive a JSON object {\"texts\": [...]}. For each text, rewrite it "
+    "with correct grammar but keep the meaning identical. Reply with a JSON "
+    "object {\"rewrites\": [...]} holding exactly one rewrite per text, in "
+    "the same order, and nothing else."
+)
+
+
+def parse_batch(content: str | None, n: int) -> list[str]:
+    """Split a batched reply into ``n`` rewrites; ``ValueError`` if it does not fit."""
+    reply = json.loads(content or "")
+    rewrites = reply.get("rewrites") if isinstance(reply, dict) else None
+    if not isinstance(rewrites, list) or len(rewrites) != n:
+        raise ValueError(f"expected {n} rewrites, got {rewrites!r:.80}")
+    if not all(isinstance(r, str) for r in rewrites):
+        raise ValueError("non-string rewrite in batch reply")
+    return [r.strip() for r in rewrites]
+
+
+class BatchStats:
+    """Batch size histogram and request latency percentiles (recent window)."""
+
+    def __init__(self, window: int = 2048) -> None:
+        self.sizes: Counter[int] = Counter()
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.fallbacks = 0
+
+    @property
+    def count(self) -> int:
+        return sum(self.sizes.values())
+
+    def record(self, size: int, seconds: float) -> None:
+        self.sizes[size] += 1
+        self.latencies.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> str:
+        sizes = " ".join(f"{k}:{v}" for k, v in sorted(self.sizes.items()))
+        return (f"batches={self.count} sizes[{sizes}] "
+                f"p50={self.percentile(0.5) * 1000:.0f}ms p95={self.percentile(0.95) * 1000:.0f}ms "
+                f"fallbacks={self.fallbacks}")
+
+
+class GrammarGuard:
+    """Concurrent rewrite pipeline around one ``AsyncOpenAI`` client.
+
+    With a ``cache``, hits are published synchronously from :meth:`submit`
+    and every answer (including "no change") is stored. A positive
+    ``batch_window_sec`` turns on micro-batching.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        publish: Callable[[dict[str, Any]], None],
+        *,
+        model: str = MODEL,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        timeout_sec: float = TIMEOUT_SEC,
+        cache: RewriteCache | None = None,
+        batch_window_sec: float = BATCH_WINDOW_SEC,
+        batch_max: int = BATCH_MAX,
+    ) -> None:
+        self.client = client
+        self.publish = publish
+        self.model = model
+        self.timeout_sec = timeout_sec
+        self.cache = cache
+        self.batch_window_sec = batch_window_sec
+        self.batch_max = batch_max
+        self.batches = BatchStats()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._batch: list[tuple[str, float | None]] = []
+        self._batch_timer: asyncio.TimerHandle | None = None
+
+    def submit(self, msg: dict[str, Any]) -> None:
+        """Start rewriting one ``text.committed`` event without waiting for it."""
+        draft = (msg.get("text") or "").strip()
+        if not draft:
+            return
+        if self.cache is not None:
+            fixed = self.cache.get("grammar_guard", self.model, PROMPT, draft)
+            if fixed is not None:
+                self._publish(draft, fixed, msg.get("ts"))
+                return
+        if self.batch_window_sec <= 0:
+            self._spawn(self.handle(draft, msg.get("ts")))
+            return
+        self._batch.append((draft, msg.get("ts")))
+        if len(self._batch) >= self.batch_max:
+            self._flush_batch()
+        elif self._batch_timer is None:
+            loop = asyncio.get_running_loop()
+            self._batch_timer = loop.call_later(self.batch_window_sec, self._flush_batch)
+
+    async def drain(self) -> None:
+        """Send any open batch and wait for every submitted rewrite to finish."""
+        self._flush_batch()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _spawn(self, coro: Coroutine[Any, Any, None]) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _flush_batch(self) -> None:
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        items, self._batch = self._batch, []
+        if items:
+            self._spawn(self.handle_batch(items))
+
+    async def rewrite(self, draft: str) -> str:
+        res = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": PROMPT},
+                {"role": "user", "content": draft},
+            ],
+            timeout=self.timeout_sec,
+        )
+        return (res.choices[0].message.content or "").strip()
+
+    async def rewrite_batch(self, drafts: list[str]) -> list[str]:
+        if len(drafts) == 1:
+            return [await self.rewrite(drafts[0])]
+        res = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": BATCH_PROMPT},
+                {"role": "user", "content": json.dumps({"texts": drafts}, ensure_ascii=False)},
+            ],
+            response_format={"type": "json_object"},
+            timeout=self.timeout_sec,
+        )
+        return parse_batch(res.choices[0].message.content, len(drafts))
+
+    async def handle(self, draft: str, orig_ts: float | None) -> None:
+        async with self._slots:
+            try:
+                fixed = await asyncio.wait_for(self.rewrite(draft), self.timeout_sec)
+            except TimeoutError:
+                log.warning("rewrite timed out after %.1fs: %s", self.timeout_sec, draft[:60])
+                return
+            except Exception:
+                log.exception("openai call failed")
+                return
+        self._finish(draft, fixed, orig_ts)
+
+    async def handle_batch(self, items: list[tuple[str, float | None]]) -> None:
+        start = time.monotonic()
+        async with self._slots:
+            try:
+                fixed = await asyncio.wait_for(
+                    self.rewrite_batch([draft for draft, _ in items]), self.timeout_sec
+                )
+            except TimeoutError:
+                log.warning("batch of %d timed out after %.1fs", len(items), self.timeout_sec)
+                return
+            except ValueError as e:
+                log.warning("unparseable batch reply (%s); retrying %d singly", e, len(items))
+                fixed = None
+            except Exception:
+                log.exception("openai call failed")
+                return
+        if fixed is None:
+            self.batches.fallbacks += 1
+            await asyncio.gather(*(self.handle(draft, ts) for draft, ts in items))
+            return
+        self.batches.record(len(items), time.monotonic() - start)
+        if self.batches.count % 100 == 0:
+            log.info("batching: %s", self.batches.summary())
+        for (draft, orig_ts), text in zip(items, fixed, strict=True):
+            self._finish(draft, text, orig_ts)
+
+    def _finish(self, draft: str, fixed: str, orig_ts: float | None) -> None:
+        # Batched answers are cached under the single-request prompt: they
+        # are the same rewrite, only framed differently on the wire.
+        if self.cache is not None and fixed:
+            self.cache.put("grammar_guard", self.model, PROMPT, draft, fixed)
+        self._publish(draft, fixed, orig_ts)
+
+    def _publish(self, draft: str, fixed: str, orig_ts: float | None) -> None:
+        if fixed and fixed != draft:
+            self.publish({
+                "event": PLUGIN_REWRITE,
+                "text": fixed,
+                "orig_ts": orig_ts,
+                "plugin": "grammar_guard",
+                "ts": time.time(),
+            })
+
+
+async def serve(guard: GrammarGuard) -> None:
+    async for msg in get_client().alisten(TEXT_COMMITTED):
+        if msg.get("event") == TEXT_COMMITTED:
+            guard.submit(msg)
 
 
 def main() -> None:
-    from openai import OpenAI
+    from openai import AsyncOpenAI
 
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s %(levelname)s %(name)s: %(message)s",
     )
+    bus = get_client()
     if not os.getenv("OPENAI_API_KEY"):
         log.warning("OPENAI_API_KEY not set; plugin will idle")
-    client = OpenAI()
+        try:
+            while True:
+                bus.publish(heartbeat("grammar_guard"))
+                time.sleep(HEARTBEAT_SEC)
+        except KeyboardInterrupt:
+            return
+        finally:
+            bus.term()
 
-    ctx = zmq.Context.instance()
-    sub = ctx.socket(zmq.SUB)
-    sub.connect("tcp://localhost:5555")
-    sub.setsockopt_string(zmq.SUBSCRIBE, "")
-    pub = ctx.socket(zmq.PUB)
-    pub.connect("tcp://localhost:5556")
+    async def run() -> None:
+        # Retries are ours to budget: the timeout covers the whole request.
+        client = AsyncOpenAI(max_retries=0)
+        cache = RewriteCache(default_path())
+        guard = GrammarGuard(client, bus.publish, cache=cache)
+        log.info("grammar_guard ready, model=%s in_flight=%d timeout=%.0fs batch=%.0fms/%d",
+                 guard.model, MAX_IN_FLIGHT, guard.timeout_sec,
+                 guard.batch_window_sec * 1000, guard.batch_max)
+        # Beats come from the same loop as the requests, so a wedged loop
+        # shows up as missed heartbeats in the supervisor.
+        beating = asyncio.create_task(beat(bus.publish, "grammar_guard"))
+        try:
+            await serve(guard)
+        finally:
+            beating.cancel()
+            await guard.drain()
+            await client.close()
+            log.info("rewrite cache: %s", cache.stats.summary())
+            if guard.batches.count:
+                log.info("batching: %s", guard.batches.summary())
+            cache.close()
 
-    log.info("grammar_guard ready, model=%s", MODEL)
     try:
-        while True:
-            msg = sub.recv_json()
-            if msg.get("event") != "text.committed":
-                continue
-            draft = (msg.get("text") or "").strip()
-            if not draft:
-                continue
-            try:
-                res = client.chat.completions.create(
-                    model=MODEL,
-                    messages=[
-                        {"role": "system", "content": PROMPT},
-                        {"role": "user", "content": draft},
-                    ],
-                )
-                fixed = (res.choices[0].message.content or "").strip()
-            except Exception:
-                log.exception("openai call failed")
-                continue
-            if fixed and fixed != draft:
-                pub.send_json({
-                    "event": "plugin.rewrite",
-                    "text": fixed,
-                    "orig_ts": msg.get("ts"),
-                    "plugin": "grammar_guard",
-                    "ts": time.time(),
-                })
+        asyncio.run(run())
     except KeyboardInterrupt:
         pass
     finally:
-        sub.close()
-        pub.close()
-        ctx.term()
+        bus.term()
 
 
 if __name__ == "__main__":
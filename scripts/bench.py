@@ -1,197 +1,320 @@
 #!/usr/bin/env python3
+"""GAINS bus replay benchmark.
+
+Replays a synthetic or recorded event stream into the bus and measures,
+per topic, how long each event takes to reach a subscriber — no microphone,
+camera or human in the loop, so it can run in CI and be diffed between
+commits.
+
+* ``replay`` — publish a stream at ``--rate`` (1 = real time, 10 = 10×,
+  ``max`` = as fast as possible).
+* ``sink``   — subscribe and record latency percentiles + throughput.
+* ``run``    — both in one process (optionally with ``--hub`` to start a
+  hub in-process) and write a JSON result file.
+* ``record`` — capture live bus traffic to JSONL for later ``--input``.
+
+Every replayed event is stamped with ``bench_seq`` / ``bench_ns`` (wall
+clock, ns). ``plugin.rewrite`` latency is measured from the replayed
+``text.committed`` it answers (matched on ``orig_ts``), i.e. the full
+plug-in round trip.
+
+    python scripts/bench.py run --hub --rate max --utterances 200
+    python scripts/bench.py run --rate 10 --out results/HEAD.json
+    python scripts/bench.py record --out session.jsonl
+    python scripts/bench.py replay --input session.jsonl --rate 1
 """
-GAINS Latency Benchmarking Script
-Measures speech start → nod commit timing for performance analysis
-"""
+from __future__ import annotations
 
+import argparse
+import contextlib
 import json
 import statistics
+import subprocess
+import sys
+import threading
 import time
-from collections import deque
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
 from datetime import datetime
+from pathlib import Path
+from typing import Any
 
 import zmq
 
-
-class LatencyBenchmark:
-    def __init__(self, sample_size=20):
-        self.sample_size = sample_size
-        self.latencies = deque(maxlen=sample_size)
-        self.speech_start_times = {}
-        self.nod_times = []
-        self.asr_events = []
-
-        # ZMQ setup
-        self.ctx = zmq.Context()
-        self.sub = self.ctx.socket(zmq.SUB)
-        self.sub.connect("tcp://localhost:5555")
-        self.sub.setsockopt_string(zmq.SUBSCRIBE, "")
-
-        # Statistics
-        self.stats = {
-            "total_samples": 0,
-            "completed_samples": 0,
-            "p50_latency": 0,
-            "p95_latency": 0,
-            "p99_latency": 0,
-            "min_latency": float('inf'),
-            "max_latency": 0,
-            "mean_latency": 0
-        }
-
-    def start_listening(self):
-        """Start listening for ZMQ events"""
-        print("🎯 Starting latency benchmark...")
-        print("📊 Collecting samples (speak → nod to measure timing)")
-        print("⏱️  Press Ctrl+C to stop and see results\n")
-
-        try:
-            while True:
-                try:
-                    msg = self.sub.recv_json(zmq.NOBLOCK)
-                    self.process_event(msg)
-                except zmq.Again:
-                    time.sleep(0.01)
-                except KeyboardInterrupt:
-                    break
-        except KeyboardInterrupt:
-            pass
-
-        self.calculate_statistics()
-        self.print_results()
-
-    def process_event(self, msg):
-        """Process ZMQ events and track timing"""
-        event_type = msg.get("event")
-        timestamp = msg.get("ts", time.time())
-
-        if event_type == "asr.partial":
-            # Track speech start
-            text = msg.get("text", "").strip()
-            if text and not self.speech_start_times:
-                self.speech_start_times[timestamp] = {
-                    "text": text,
-                    "start_time": timestamp,
-                    "confidence": msg.get("confidence", 0)
-                }
-                print(f"🗣️  Speech detected: '{text[:50]}...'")
-
-        elif event_type == "gesture.nod":
-            # Calculate latency if we have speech start
-            if self.speech_start_times:
-                speech_start = min(self.speech_start_times.keys())
-                latency = timestamp - speech_start
-
-                if latency > 0 and latency < 10:  # Sanity check: 0-10 seconds
-                    self.latencies.append(latency)
-                    self.stats["completed_samples"] += 1
-
-                    speech_info = self.speech_start_times[speech_start]
-                    print(f"✅ Nod detected! Latency: {latency:.3f}s | Text: '{speech_info['text'][:30]}...'")
-
-                    # Clear speech tracking for next sample
-                    self.speech_start_times.clear()
-
-                    # Check if we have enough samples
-                    if self.stats["completed_samples"] >= self.sample_size:
-                        print(f"\n🎉 Collected {self.sample_size} samples! Calculating statistics...")
-                        self.calculate_statistics()
-                        self.print_results()
-                        return
-
-    def calculate_statistics(self):
-        """Calculate latency statistics"""
-        if not self.latencies:
-            return
-
-        latencies = list(self.latencies)
-        latencies.sort()
-
-        self.stats.update({
-            "total_samples": len(latencies),
-            "p50_latency": statistics.median(latencies),
-            "p95_latency": latencies[int(len(latencies) * 0.95)],
-            "p99_latency": latencies[int(len(latencies) * 0.99)] if len(latencies) > 1 else latencies[0],
-            "min_latency": min(latencies),
-            "max_latency": max(latencies),
-            "mean_latency": statistics.mean(latencies)
-        })
-
-    def print_results(self):
-        """Print benchmark results"""
-        print("\n" + "="*60)
-        print("📊 GAINS LATENCY BENCHMARK RESULTS")
-        print("="*60)
-
-        if self.stats["total_samples"] == 0:
-            print("❌ No samples collected. Make sure services are running.")
-            return
-
-        print(f"📈 Samples collected: {self.stats['total_samples']}")
-        print(f"⏱️  Mean latency: {self.stats['mean_latency']:.3f}s")
-        print(f"📊 P50 latency: {self.stats['p50_latency']:.3f}s")
-        print(f"📊 P95 latency: {self.stats['p95_latency']:.3f}s")
-        print(f"📊 P99 latency: {self.stats['p99_latency']:.3f}s")
-        print(f"📊 Min latency: {self.stats['min_latency']:.3f}s")
-        print(f"📊 Max latency: {self.stats['max_latency']:.3f}s")
-
-        # Performance assessment
-        p95 = self.stats['p95_latency']
-        if p95 < 0.5:
-            rating = "🚀 EXCELLENT"
-        elif p95 < 1.0:
-            rating = "✅ GOOD"
-        elif p95 < 2.0:
-            rating = "⚠️  ACCEPTABLE"
+from services.bus.client import BusClient, get_client
+from services.bus.protocol import (
+    ASR_PARTIAL,
+    GESTURE_NOD,
+    HEARTBEAT,
+    PLUGIN_REWRITE,
+    TEXT_COMMITTED,
+    recv,
+)
+
+# (offset seconds from stream start, message)
+Stream = Iterable[tuple[float, dict[str, Any]]]
+
+REPLAYED = (ASR_PARTIAL, GESTURE_NOD, TEXT_COMMITTED)
+MEASURED = (*REPLAYED, PLUGIN_REWRITE)
+WORDS = ("todo", "call", "bob", "about", "the", "demo", "new", "paragraph", "ship", "it")
+
+
+def synthetic(utterances: int, words: int = 8, word_sec: float = 0.3,
+              pause_sec: float = 1.0) -> Iterator[tuple[float, dict[str, Any]]]:
+    """Speech → nod → commit, ``utterances`` times over."""
+    t = 0.0
+    for u in range(utterances):
+        said = [WORDS[(u + i) % len(WORDS)] for i in range(words)]
+        for i, word in enumerate(said):
+            t += word_sec
+            yield t, {
+                "event": ASR_PARTIAL,
+                "text": f" {word}",
+                "confidence": -0.25,
+                "start": t - word_sec,
+                "end": t,
+                "words": [{"word": f" {word}", "start": t - word_sec, "end": t}],
+            }
+            if i == len(said) - 1:
+                t += pause_sec
+                yield t, {"event": GESTURE_NOD, "pitch_deg": -18.0}
+                t += 0.05
+                yield t, {"event": TEXT_COMMITTED, "text": " ".join(said)}
+
+
+def recorded(path: Path) -> Iterator[tuple[float, dict[str, Any]]]:
+    """Replayable events from a ``record`` JSONL file, timed by their ``ts``."""
+    first: float | None = None
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            msg = json.loads(line)
+            if msg.get("event") not in REPLAYED:
+                continue
+            ts = float(msg.get("ts", 0.0))
+            first = ts if first is None else first
+            yield ts - first, msg
+
+
+def replay(bus: BusClient, stream: Stream, rate: float) -> int:
+    """Publish ``stream`` with offsets divided by ``rate`` (0 = no pacing)."""
+    start = time.monotonic()
+    sent = 0
+    for seq, (offset, msg) in enumerate(stream):
+        if rate:
+            delay = start + offset / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        bus.publish({**msg, "ts": time.time(), "bench_seq": seq, "bench_ns": time.time_ns()})
+        sent += 1
+    return sent
+
+
+def _percentile(values: list[float], q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class Sink:
+    """Per-topic latency and throughput of replayed events."""
+
+    def __init__(self) -> None:
+        self.latencies_ms: dict[str, list[float]] = defaultdict(list)
+        self.first_ns: dict[str, int] = {}
+        self.last_ns: dict[str, int] = {}
+        self._commit_sent: dict[float, int] = {}
+
+    def observe(self, msg: dict[str, Any], now_ns: int) -> None:
+        topic = msg.get("event")
+        if topic == PLUGIN_REWRITE:
+            sent = self._commit_sent.get(msg.get("orig_ts"))
         else:
-            rating = "❌ NEEDS IMPROVEMENT"
-
-        print(f"\n🎯 Performance Rating: {rating}")
-        print(f"📋 Target: P95 < 1.0s (Current: {p95:.3f}s)")
-
-        # Save results
-        self.save_results()
-
-    def save_results(self):
-        """Save benchmark results to file"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"benchmark_results_{timestamp}.json"
-
-        results = {
-            "timestamp": timestamp,
-            "stats": self.stats,
-            "raw_latencies": list(self.latencies)
-        }
-
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
-
-        print(f"\n💾 Results saved to: {filename}")
-
-def main():
-    print("🎯 GAINS Latency Benchmark")
-    print("="*40)
-    print("This script measures speech → nod commit latency")
-    print("Make sure all GAINS services are running:")
-    print("  - python services/bus/hub.py")
-    print("  - python services/asr/server.py")
-    print("  - python services/vision/nod.py")
-    print("  - python services/tts/voice.py")
-    print()
-
-    # Get sample size from user
+            sent = msg.get("bench_ns")
+            if topic == TEXT_COMMITTED and sent is not None:
+                self._commit_sent[msg.get("ts")] = sent
+        if sent is None or topic not in MEASURED:
+            return
+        self.latencies_ms[topic].append((now_ns - sent) / 1e6)
+        self.first_ns.setdefault(topic, now_ns)
+        self.last_ns[topic] = now_ns
+
+    @property
+    def count(self) -> int:
+        return sum(len(v) for v in self.latencies_ms.values())
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        out = {}
+        for topic, values in sorted(self.latencies_ms.items()):
+            values = sorted(values)
+            span = (self.last_ns[topic] - self.first_ns[topic]) / 1e9
+            out[topic] = {
+                "count": len(values),
+                "p50_ms": round(statistics.median(values), 3),
+                "p95_ms": round(_percentile(values, 0.95), 3),
+                "p99_ms": round(_percentile(values, 0.99), 3),
+                "max_ms": round(values[-1], 3),
+                "msgs_per_sec": round(len(values) / span, 1) if span > 0 else 0.0,
+            }
+        return out
+
+    def consume(self, sock: zmq.Socket, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                msg = recv(sock)
+            except zmq.Again:
+                continue
+            self.observe(msg, time.time_ns())
+
+
+def _git_rev() -> str | None:
     try:
-        sample_size = int(input("Enter number of samples to collect (default 20): ") or "20")
-    except ValueError:
-        sample_size = 20
-
-    print(f"\n🎯 Will collect {sample_size} samples")
-    print("🗣️  Speak clearly and nod to commit each phrase")
-    print("⏹️  Press Ctrl+C to stop early\n")
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def _stream(args: argparse.Namespace) -> Stream:
+    if args.input:
+        return recorded(args.input)
+    return synthetic(args.utterances, args.words)
+
+
+def _rate(value: str) -> float:
+    return 0.0 if value == "max" else float(value)
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    bus = get_client()
+    if args.hub:
+        from services.bus.hub import serve
+
+        ready = threading.Event()
+        threading.Thread(target=serve, args=(bus, (), ready), daemon=True).start()
+        ready.wait(5)
+
+    sink = Sink()
+    sub = bus.subscriber(*MEASURED)
+    sub.setsockopt(zmq.RCVTIMEO, 100)
+    stop = threading.Event()
+    consumer = threading.Thread(target=sink.consume, args=(sub, stop), daemon=True)
+    consumer.start()
+    bus.publisher()
+    time.sleep(0.5)  # connect + subscription propagation
+
+    started = time.monotonic()
+    sent = replay(bus, _stream(args), _rate(args.rate))
+    wall = time.monotonic() - started
+    # Wait for stragglers (plug-in rewrites) until the sink goes quiet.
+    seen = -1
+    while seen != sink.count:
+        seen = sink.count
+        time.sleep(args.settle)
+    stop.set()
+    consumer.join()
+
+    return {
+        "meta": {
+            "git_rev": _git_rev(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "rate": args.rate,
+            "source": str(args.input) if args.input else f"synthetic:{args.utterances}x{args.words}",
+            "transport": bus.config.publish_to.split("://", 1)[0],
+            "sent": sent,
+            "received": sink.count,
+            "replay_wall_sec": round(wall, 3),
+        },
+        "topics": sink.summary(),
+    }
+
+
+def print_summary(result: dict[str, Any]) -> None:
+    meta = result["meta"]
+    print(f"sent={meta['sent']} received={meta['received']} rate={meta['rate']} "
+          f"wall={meta['replay_wall_sec']}s transport={meta['transport']}")
+    print(f"{'topic':<16} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'msgs/s':>9}")
+    for topic, st in result["topics"].items():
+        print(f"{topic:<16} {st['count']:>7} {st['p50_ms']:>8.2f} {st['p95_ms']:>8.2f} "
+              f"{st['p99_ms']:>8.2f} {st['max_ms']:>8.2f} {st['msgs_per_sec']:>9.1f}")
+
+
+def write_result(result: dict[str, Any], out: Path | None) -> Path:
+    path = out or Path(f"benchmark_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    return path
+
+
+def record(out: Path, duration: float) -> int:
+    sub = get_client().subscriber()
+    sub.setsockopt(zmq.RCVTIMEO, 200)
+    deadline = time.monotonic() + duration if duration else None
+    n = 0
+    with out.open("w", encoding="utf-8") as f, contextlib.suppress(KeyboardInterrupt):
+        while deadline is None or time.monotonic() < deadline:
+            try:
+                msg = recv(sub)
+            except zmq.Again:
+                continue
+            if msg.get("event") != HEARTBEAT:
+                f.write(json.dumps(msg) + "\n")
+                n += 1
+    return n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GAINS bus replay benchmark")
+    cmds = parser.add_subparsers(dest="cmd", required=True)
+
+    def stream_args(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--input", type=Path, help="JSONL from `record` (default: synthetic)")
+        p.add_argument("--utterances", type=int, default=50)
+        p.add_argument("--words", type=int, default=8)
+        p.add_argument("--rate", default="1", help="1, 10, … or 'max'")
+
+    p_run = cmds.add_parser("run", help="replay + sink, write JSON results")
+    stream_args(p_run)
+    p_run.add_argument("--hub", action="store_true", help="start a hub in this process")
+    p_run.add_argument("--settle", type=float, default=1.0,
+                       help="seconds of quiet before the sink stops")
+    p_run.add_argument("--out", type=Path)
+
+    p_replay = cmds.add_parser("replay", help="publish a stream only")
+    stream_args(p_replay)
+
+    p_sink = cmds.add_parser("sink", help="measure until Ctrl+C")
+    p_sink.add_argument("--out", type=Path)
+
+    p_rec = cmds.add_parser("record", help="capture bus traffic to JSONL")
+    p_rec.add_argument("--out", type=Path, required=True)
+    p_rec.add_argument("--duration", type=float, default=0.0, help="seconds (0 = until Ctrl+C)")
+
+    args = parser.parse_args()
+    if args.cmd == "run":
+        result = run(args)
+        print_summary(result)
+        print(f"results: {write_result(result, args.out)}")
+    elif args.cmd == "replay":
+        bus = get_client()
+        bus.publisher()
+        time.sleep(0.5)
+        print(f"replayed {replay(bus, _stream(args), _rate(args.rate))} events")
+        bus.term()
+    elif args.cmd == "sink":
+        sink = Sink()
+        sub = get_client().subscriber(*MEASURED)
+        sub.setsockopt(zmq.RCVTIMEO, 100)
+        stop = threading.Event()
+        with contextlib.suppress(KeyboardInterrupt):
+            sink.consume(sub, stop)
+        result = {"meta": {"received": sink.count}, "topics": sink.summary()}
+        json.dump(result, sys.stdout, indent=2, sort_keys=True)
+        print()
+        if args.out:
+            write_result(result, args.out)
+    elif args.cmd == "record":
+        print(f"recorded {record(args.out, args.duration)} events to {args.out}")
 
-    # Start benchmark
-    benchmark = LatencyBenchmark(sample_size)
-    benchmark.start_listening()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Offline ASR benchmark: WAV corpus → the service's own pipeline.
+
+Feeds every ``*.wav`` under a directory (or a synthetic tone with
+``--tone``) through :class:`services.asr.server.AsrPipeline` — the same
+gate, queue and streaming decoder as the live service — and reports per
+configuration:
+
+* ``rtf`` — transcription compute time / audio duration (< 1 keeps up);
+* ``ttfp`` p50/p95 — gate-detected speech onset → first ``asr.partial``;
+* ``dropped`` — capture blocks lost to a full audio queue;
+* ``xrt`` — audio seconds transcribed per wall-clock second, summed over
+  streams.
+
+Model size, ``beam_size`` and ``best_of`` default to ``load_config()``;
+repeat ``--model`` / ``--beam-size`` / ``--best-of`` to compare a grid.
+``--speed 0`` (default) pushes audio as fast as the queue accepts it, so
+nothing is dropped and the run is short; ``--speed 1`` replays at real
+time like the microphone does, which is what makes ``dropped`` and
+``ttfp`` meaningful.
+
+``--streams N`` runs every input on N concurrent pipelines sharing one
+model through :class:`~services.asr.multistream.FairScheduler`, as
+``asr_sources`` does in the service (``--workers`` overrides the parallel
+decode count); compare ``xrt`` across N to see how throughput scales.
+
+    python scripts/bench_asr.py corpus/ --model tiny --model base --beam-size 1 --beam-size 5
+    python scripts/bench_asr.py --tone 30 --model tiny --speed 1 --json
+    python scripts/bench_asr.py --tone 30 --model tiny --streams 4
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from services.asr.multistream import FairScheduler, worker_layout
+from services.asr.server import AsrPipeline, load_config, make_transcriber, resolve_model_name
+from services.asr.sources import ToneSource, WavSource
+from services.asr.streaming import Transcriber, Word
+
+
+class TimedTranscriber:
+    """Wraps a transcriber and accumulates its wall time."""
+
+    def __init__(self, transcribe: Transcriber) -> None:
+        self.transcribe = transcribe
+        self.seconds = 0.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, samples: np.ndarray, prompt: str) -> list[Word]:
+        start = time.perf_counter()
+        try:
+            return self.transcribe(samples, prompt)
+        finally:
+            with self._lock:
+                self.seconds += time.perf_counter() - start
+                self.calls += 1
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def run_source(source: WavSource | ToneSource, transcribe: Transcriber,
+               cfg: dict[str, Any]) -> tuple[AsrPipeline, int]:
+    words = [0]
+    pipeline = AsrPipeline(transcribe, cfg, lambda w: words.__setitem__(0, words[0] + len(w)))
+    stop = threading.Event()
+    worker = threading.Thread(target=pipeline.run, args=(stop,), daemon=True)
+    worker.start()
+    # As fast as possible → back-pressure instead of drops; paced → drop like a live callback.
+    source.run(lambda b: pipeline.on_block(b, block=not source.speed), stop)
+    pipeline.drain()
+    stop.set()
+    worker.join()
+    return pipeline, words[0]
+
+
+def run_streams(source: WavSource | ToneSource, transcribe: Transcriber, cfg: dict[str, Any],
+                scheduler: FairScheduler, streams: int) -> list[tuple[AsrPipeline, int]]:
+    """``source`` on ``streams`` concurrent pipelines sharing ``transcribe``."""
+    results: list[tuple[AsrPipeline, int]] = []
+    lock = threading.Lock()
+
+    def one(i: int) -> None:
+        result = run_source(source, scheduler.wrap(f"s{i}", transcribe), cfg)
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=one, args=(i,)) for i in range(streams)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def bench(sources: list[WavSource | ToneSource], model: Any, cfg: dict[str, Any],
+          model_name: str, streams: int = 1, workers: int = 1) -> dict[str, Any]:
+    timed = TimedTranscriber(make_transcriber(model, cfg, model_name))
+    scheduler = FairScheduler(workers)
+    audio_sec = blocks = dropped = words = 0
+    ttfp: list[float] = []
+    started = time.perf_counter()
+    for source in sources:
+        for pipeline, n_words in run_streams(source, timed, cfg, scheduler, streams):
+            audio_sec += source.duration_sec
+            blocks += pipeline.stats.blocks
+            dropped += pipeline.stats.dropped
+            ttfp.extend(pipeline.stats.first_partial_sec)
+            words += n_words
+    wall = time.perf_counter() - started
+    return {
+        "model": model_name,
+        "beam_size": cfg["beam_size"],
+        "best_of": cfg["best_of"],
+        "streams": streams,
+        "workers": workers,
+        "files": len(sources),
+        "audio_sec": round(audio_sec, 2),
+        "decodes": timed.calls,
+        "words": words,
+        "rtf": round(timed.seconds / audio_sec, 3) if audio_sec else None,
+        "wall_sec": round(wall, 2),
+        "xrt": round(audio_sec / wall, 2) if wall else None,
+        "ttfp_p50_ms": round(statistics.median(ttfp) * 1000, 1) if ttfp else None,
+        "ttfp_p95_ms": round(_percentile(ttfp, 0.95) * 1000, 1) if ttfp else None,
+        "blocks": blocks,
+        "dropped": dropped,
+    }
+
+
+def main() -> None:
+    from faster_whisper import WhisperModel
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", type=Path, nargs="?", help="directory of WAV files")
+    parser.add_argument("--tone", type=float, metavar="SEC",
+                        help="synthetic tone bursts instead of a corpus")
+    parser.add_argument("--model", action="append", help="model size (repeatable)")
+    parser.add_argument("--beam-size", type=int, action="append")
+    parser.add_argument("--best-of", type=int, action="append")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="replay speed, multiple of real time (0 = as fast as possible)")
+    parser.add_argument("--streams", type=int, default=1,
+                        help="concurrent pipelines per input, sharing one model")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="parallel decodes on the model (0 = one per stream, up to cores/2)")
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    args = parser.parse_args()
+    if not args.corpus and not args.tone:
+        parser.error("give a corpus directory or --tone SEC")
+
+    base = load_config()
+    rate, block_ms = base["sample_rate"], base["block_ms"]
+    if args.tone:
+        sources = [ToneSource(seconds=args.tone, sample_rate=rate, block_ms=block_ms,
+                              speed=args.speed)]
+    else:
+        sources = [WavSource(p, sample_rate=rate, block_ms=block_ms, speed=args.speed)
+                   for p in sorted(args.corpus.rglob("*.wav"))]
+        if not sources:
+            parser.error(f"no .wav files under {args.corpus}")
+
+    device = "cuda" if os.getenv("DEVICE") == "gpu" else "cpu"
+    compute = "float16" if device == "cuda" else "int8"
+    workers, cpu_threads = worker_layout(args.streams, args.workers)
+    models: dict[str, Any] = {}
+    rows = []
+    grid = itertools.product(
+        args.model or [base["asr_model"]],
+        args.beam_size or [base["beam_size"]],
+        args.best_of or [base["best_of"]],
+    )
+    for size, beam_size, best_of in grid:
+        cfg = {**base, "asr_model": size, "beam_size": beam_size, "best_of": best_of}
+        model_name = resolve_model_name(size, cfg["asr_language"])
+        if model_name not in models:
+            print(f"loading {model_name} ({device}/{compute})", file=sys.stderr)
+            models[model_name] = WhisperModel(model_name, device=device, compute_type=compute,
+                                              num_workers=workers, cpu_threads=cpu_threads)
+        rows.append(bench(sources, models[model_name], cfg, model_name, args.streams, workers))
+
+    if args.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+        return
+    print(f"{'model':<10} {'beam':>4} {'best':>4} {'strm':>4} {'audio s':>8} {'rtf':>6} "
+          f"{'xrt':>6} {'ttfp p50':>9} {'ttfp p95':>9} {'dropped':>8} {'words':>6}")
+    for r in rows:
+        ttfp50 = "-" if r["ttfp_p50_ms"] is None else f"{r['ttfp_p50_ms']:.0f}ms"
+        ttfp95 = "-" if r["ttfp_p95_ms"] is None else f"{r['ttfp_p95_ms']:.0f}ms"
+        print(f"{r['model']:<10} {r['beam_size']:>4} {r['best_of']:>4} {r['streams']:>4} "
+              f"{r['audio_sec']:>8.1f} {r['rtf']:>6.2f} {r['xrt']:>6.2f} {ttfp50:>9} "
+              f"{ttfp95:>9} {r['dropped']:>8} {r['words']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of bus payload codecs.
+
+For every event type in the README table and every codec available in
+this interpreter (see ``services/bus/codec.py``), reports encode and
+decode cost per message and payload size on the wire. ``stdlib`` is the
+previous ``send_json``/``recv_json`` path, for reference.
+
+    python scripts/bench_codec.py [--words 24] [--number 20000] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import timeit
+
+from services.bus.codec import CODECS, Codec
+from services.bus.protocol import encode
+
+
+def sample_events(n_words: int) -> dict[str, dict]:
+    now = time.time()
+    words = [
+        {"word": f" word{i}", "start": round(i * 0.31, 2), "end": round(i * 0.31 + 0.27, 2)}
+        for i in range(n_words)
+    ]
+    return {
+        "heartbeat": {"event": "heartbeat", "ts": now},
+        "asr.partial": {
+            "event": "asr.partial",
+            "text": "".join(w["word"] for w in words),
+            "ts": now,
+            "confidence": -0.2814,
+            "start": words[0]["start"],
+            "end": words[-1]["end"],
+            "words": words,
+        },
+        "gesture.nod": {"event": "gesture.nod", "ts": now, "pitch_deg": -17.25},
+        "text.committed": {"event": "text.committed", "text": "todo call Bob about the demo", "ts": now},
+        "plugin.rewrite": {
+            "event": "plugin.rewrite",
+            "text": "TODO: call Bob about the demo.",
+            "orig_ts": now,
+            "plugin": "grammar_guard",
+            "ts": now,
+        },
+        "tts.play": {"event": "tts.play", "text": "Are you done?", "ts": now},
+    }
+
+
+STDLIB = Codec("stdlib", lambda obj: json.dumps(obj).encode(), json.loads)
+
+
+def bench(number: int, n_words: int) -> list[dict]:
+    rows = []
+    for topic, msg in sample_events(n_words).items():
+        for name, codec in {"stdlib": STDLIB, **CODECS}.items():
+            frames = encode(msg, codec)
+            enc = timeit.timeit(lambda m=msg, c=codec: encode(m, c), number=number)
+            dec = timeit.timeit(lambda f=frames, c=codec: c.loads(f[-1]), number=number)
+            rows.append({
+                "topic": topic,
+                "codec": name,
+                "encode_us": enc / number * 1e6,
+                "decode_us": dec / number * 1e6,
+                "payload_bytes": len(frames[-1]),
+            })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=24, help="words per asr.partial")
+    parser.add_argument("--number", type=int, default=20000, help="iterations per case")
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    args = parser.parse_args()
+
+    rows = bench(args.number, args.words)
+    if args.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+        return
+    print(f"{'topic':<16} {'codec':<8} {'encode µs':>10} {'decode µs':>10} {'bytes':>7}")
+    for r in rows:
+        print(f"{r['topic']:<16} {r['codec']:<8} {r['encode_us']:>10.2f} "
+              f"{r['decode_us']:>10.2f} {r['payload_bytes']:>7}")
+
+
+if __name__ == "__main__":
+    main()
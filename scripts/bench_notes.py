@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Note-session bookkeeping cost as sessions grow.
+
+Replays speak → nod → rewrite cycles into a session of N entries and
+reports µs per event for :class:`services.notes.session.SessionStore`
+and for the previous list-of-dicts logic (backwards scans for every nod
+and rewrite, ``sum(...)`` re-count on every commit), for reference.
+
+    python scripts/bench_notes.py [--sizes 1000 10000 100000] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from typing import Any
+
+from services.notes.session import SessionStore
+
+
+def legacy(n: int) -> None:
+    session: list[dict[str, Any]] = []
+    for i in range(n):
+        ts = float(i)
+        session.append({"type": "speech", "text": f"note {i}", "ts": ts})
+        for entry in reversed(session):
+            if entry["type"] == "speech" and not entry.get("committed"):
+                entry["committed"] = True
+                entry["commit_ts"] = ts
+                break
+        sum(1 for e in session if e.get("committed"))  # _should_flush
+        for entry in reversed(session):
+            if entry["type"] == "speech":
+                entry["original"] = entry["text"]
+                entry["text"] = f"Note {i}."
+                break
+
+
+def store(n: int) -> None:
+    session = SessionStore()
+    for i in range(n):
+        ts = float(i)
+        session.add(f"note {i}", ts)
+        session.commit(ts + 0.5)
+        _ = session.committed  # _should_flush
+        session.rewrite(f"Note {i}.", ts + 0.5, "bench")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--legacy-max", type=int, default=20000,
+                        help="skip the quadratic legacy run above this size")
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    args = parser.parse_args()
+
+    rows = []
+    for n in args.sizes:
+        for name, fn in (("store", store), ("legacy", legacy)):
+            if name == "legacy" and n > args.legacy_max:
+                continue
+            start = time.perf_counter()
+            fn(n)
+            elapsed = time.perf_counter() - start
+            # Three events (speech, commit, rewrite) per entry.
+            rows.append({"impl": name, "entries": n, "total_sec": elapsed,
+                         "us_per_event": elapsed / (3 * n) * 1e6})
+    if args.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+        return
+    print(f"{'impl':<8} {'entries':>9} {'total s':>9} {'µs/event':>9}")
+    for r in rows:
+        print(f"{r['impl']:<8} {r['entries']:>9} {r['total_sec']:>9.3f} {r['us_per_event']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Latency / throughput comparison of the bus transports (tcp, ipc, inproc).
+
+Each run starts a hub (``services.bus.hub.serve``) in a thread of this
+process, then times one publisher → hub → subscriber hop per message:
+
+* latency — one message in flight at a time, p50/p95/p99 in µs;
+* throughput — a burst of messages, received msgs/s.
+
+    python scripts/bench_transport.py [--count 5000] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import zmq
+
+from services.bus.client import TRANSPORTS, BusClient, BusConfig
+from services.bus.hub import serve
+from services.bus.protocol import recv
+
+TOPIC = "bench.ping"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _config(transport: str, runtime_dir: Path) -> BusConfig:
+    cfg = BusConfig.for_transport(transport, runtime_dir)
+    if transport != "tcp":
+        return cfg
+    xsub, xpub = f"tcp://127.0.0.1:{_free_port()}", f"tcp://127.0.0.1:{_free_port()}"
+    return replace(cfg, publish_to=xsub, subscribe_to=xpub, xsub_bind=xsub, xpub_bind=xpub)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def measure(transport: str, count: int, runtime_dir: Path) -> dict:
+    ctx = zmq.Context()
+    bus = BusClient(_config(transport, runtime_dir), ctx, shared=True)
+    ready = threading.Event()
+    threading.Thread(target=serve, args=(bus, (), ready), daemon=True).start()
+    ready.wait(5)
+    sub = bus.subscriber(TOPIC)
+    sub.setsockopt(zmq.RCVTIMEO, 2000)
+    bus.publisher()
+    time.sleep(0.3)  # connect + subscription propagation
+
+    latencies = []
+    for i in range(count):
+        bus.publish({"event": TOPIC, "i": i, "t": time.perf_counter_ns()})
+        msg = recv(sub)
+        latencies.append((time.perf_counter_ns() - msg["t"]) / 1000)
+    latencies.sort()
+
+    start = time.perf_counter()
+    for i in range(count):
+        bus.publish({"event": TOPIC, "i": i, "t": 0})
+    for _ in range(count):
+        recv(sub)
+    elapsed = time.perf_counter() - start
+
+    bus.close()
+    ctx.term()
+    return {
+        "transport": transport,
+        "count": count,
+        "p50_us": statistics.median(latencies),
+        "p95_us": _percentile(latencies, 0.95),
+        "p99_us": _percentile(latencies, 0.99),
+        "msgs_per_sec": count / elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--transport", action="append", choices=TRANSPORTS)
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="gains-bench-") as tmp:
+        rows = [measure(t, args.count, Path(tmp)) for t in args.transport or TRANSPORTS]
+    if args.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+        return
+    print(f"{'transport':<10} {'p50 µs':>9} {'p95 µs':>9} {'p99 µs':>9} {'msgs/s':>10}")
+    for r in rows:
+        print(f"{r['transport']:<10} {r['p50_us']:>9.1f} {r['p95_us']:>9.1f} "
+              f"{r['p99_us']:>9.1f} {r['msgs_per_sec']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
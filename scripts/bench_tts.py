@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""TTS latency: whole-utterance WAV path vs sentence-chunked streaming.
+
+For each input text, reports per path:
+
+* ``ttfs`` — call → first PCM sample handed to the sink (time to first audio);
+* ``total`` — call → last sample handed over, i.e. when playback ends on a
+  real-time sink.
+
+``file`` is the previous path: render the whole utterance, write it to a
+temp WAV, read it back and play it. ``stream`` is
+:func:`services.tts.stream.stream`: synthesize sentence N+1 while
+sentence N plays, PCM straight to the sink.
+
+Synthesis uses Piper when ``piper-tts`` and the voice are available;
+``--fake-rtf`` substitutes a synthesizer that takes ``rtf`` × audio
+duration (+ a fixed per-call overhead) so the pipeline can be measured
+anywhere. The default sink is a real-time null sink (plays nothing, takes
+as long as playback); ``--sink auto`` uses the service's audio sink.
+
+    python scripts/bench_tts.py                      # Piper, or fake synth if missing
+    python scripts/bench_tts.py --fake-rtf 0.3 --json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import wave
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from services.tts.audio import AudioSink, Clip, NullSink, PcmFormat, open_sink
+from services.tts.stream import split_chunks, stream
+from services.tts.voice import load_piper, piper_synth, write_wav
+
+INPUTS = {
+    "short": "Are you done?",
+    "long": (
+        "Okay, here is the summary of today's meeting. We agreed to ship the beta on "
+        "Friday, pending the last round of QA. Bob will follow up with the design team "
+        "about the onboarding screens, and Alice owns the release notes. The pricing "
+        "question is still open; we will revisit it next week. Action items are in the "
+        "shared doc. Let me know if anything is missing."
+    ),
+}
+
+
+class FakeSynth:
+    """Silence at ``chars_per_sec`` speaking rate, costing ``rtf`` × its duration."""
+
+    def __init__(self, rtf: float, overhead_sec: float, chars_per_sec: float = 15.0) -> None:
+        self.rtf = rtf
+        self.overhead_sec = overhead_sec
+        self.chars_per_sec = chars_per_sec
+        self.fmt = PcmFormat(22050)
+
+    def __call__(self, text: str) -> Clip:
+        seconds = len(text) / self.chars_per_sec
+        time.sleep(self.overhead_sec + self.rtf * seconds)
+        return Clip(bytes(int(seconds * self.fmt.sample_rate) * 2), self.fmt)
+
+
+class TimedSink:
+    def __init__(self, sink: AudioSink) -> None:
+        self.sink = sink
+        self.first_write: float | None = None
+        self.audio_sec = 0.0
+
+    def write(self, pcm: bytes, fmt: PcmFormat) -> None:
+        if self.first_write is None:
+            self.first_write = time.perf_counter()
+        self.audio_sec += len(pcm) / fmt.bytes_per_sec
+        self.sink.write(pcm, fmt)
+
+    def abort(self) -> None:
+        self.sink.abort()
+
+    def close(self) -> None:
+        self.sink.close()
+
+
+def file_path(synth: Callable[[str], Clip | None], text: str, sink: TimedSink) -> None:
+    clip = synth(text)
+    fd, name = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    path = Path(name)
+    try:
+        write_wav(clip, path)
+        with wave.open(str(path), "rb") as wf:
+            fmt = PcmFormat(wf.getframerate(), wf.getnchannels(), wf.getsampwidth())
+            sink.write(wf.readframes(wf.getnframes()), fmt)
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def stream_path(synth: Callable[[str], Clip | None], text: str, sink: TimedSink) -> None:
+    stream(synth, split_chunks(text), sink)
+
+
+def measure(run: Callable[..., None], synth: Callable[[str], Clip | None], text: str,
+            sink: AudioSink, repeat: int) -> dict[str, Any]:
+    ttfs, total, audio = [], [], 0.0
+    for _ in range(repeat):
+        timed = TimedSink(sink)
+        start = time.perf_counter()
+        run(synth, text, timed)
+        total.append(time.perf_counter() - start)
+        ttfs.append(timed.first_write - start)
+        audio = timed.audio_sec
+    return {
+        "ttfs_ms": round(statistics.median(ttfs) * 1000, 1),
+        "total_sec": round(statistics.median(total), 3),
+        "audio_sec": round(audio, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--text", action="append", metavar="TEXT",
+                        help="benchmark this text instead of the built-in short/long inputs")
+    parser.add_argument("--fake-rtf", type=float,
+                        help="use a fake synthesizer with this real-time factor")
+    parser.add_argument("--fake-overhead-ms", type=float, default=30.0,
+                        help="fixed per-call cost of the fake synthesizer")
+    parser.add_argument("--sink", choices=("null", "auto"), default="null")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per cell (median reported)")
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    args = parser.parse_args()
+
+    synth: Callable[[str], Clip | None]
+    if args.fake_rtf is None and (voice := load_piper()) is not None:
+        synth, synth_name = (lambda text: piper_synth(voice, text)), "piper"
+    else:
+        rtf = 0.3 if args.fake_rtf is None else args.fake_rtf
+        if args.fake_rtf is None:
+            print("piper unavailable; using --fake-rtf 0.3", file=sys.stderr)
+        synth = FakeSynth(rtf, args.fake_overhead_ms / 1000)
+        synth_name = f"fake(rtf={rtf})"
+    sink = NullSink(realtime=True) if args.sink == "null" else open_sink()
+    if sink is None:
+        parser.error("no audio sink available")
+
+    inputs = {f"text{i}": t for i, t in enumerate(args.text)} if args.text else INPUTS
+    rows = []
+    for name, text in inputs.items():
+        for path_name, run in (("file", file_path), ("stream", stream_path)):
+            rows.append({"input": name, "chars": len(text), "chunks": len(split_chunks(text)),
+                         "path": path_name, "synth": synth_name,
+                         **measure(run, synth, text, sink, args.repeat)})
+    sink.close()
+
+    if args.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+        return
+    print(f"synth: {synth_name}, sink: {args.sink}, median of {args.repeat}")
+    print(f"{'input':<8} {'chars':>5} {'chunks':>6} {'path':<7} {'ttfs':>9} {'total s':>8} "
+          f"{'audio s':>8}")
+    for r in rows:
+        print(f"{r['input']:<8} {r['chars']:>5} {r['chunks']:>6} {r['path']:<7} "
+              f"{r['ttfs_ms']:>7.0f}ms {r['total_sec']:>8.2f} {r['audio_sec']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Multi-stream ASR: one Whisper model serving several audio sources.
+
+A machine with several microphones (meeting rooms) used to need one
+``gains-asr`` process — and one copy of the weights — per microphone. With
+``asr_sources`` listing them, one service captures them all:
+
+* every source gets its own :class:`~services.asr.server.AsrPipeline`
+  (gate, queue, ring buffer, agreement state), and its ``asr.partial``
+  events carry its ``source_id``;
+* all pipelines decode through a single ``WhisperModel`` built with
+  ``num_workers`` = ``decode_workers`` and the cores split between them
+  (:func:`worker_layout`), so that many decodes run in parallel on one
+  copy of the weights;
+* :class:`FairScheduler` hands out those decode slots. When more sources
+  wait than there are slots, the slot goes to the source served least
+  recently, so a room with a backlog cannot starve the others.
+* :class:`CaptureSupervisor` restarts a source whose capture fails, with
+  backoff, while the other rooms keep running; the service only stops
+  once every source has given up.
+
+faster-whisper's batched pipeline batches the segments of *one* audio
+input, not separate streams with their own prompts and word timestamps,
+so streams share the model through parallel workers rather than batches.
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+import numpy as np
+
+from services.asr.streaming import Transcriber, Word
+
+log = logging.getLogger("gains.asr.multistream")
+
+DEFAULT_SOURCE = "mic"
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class SourceSpec:
+    id: str
+    device: int | str | None = None  # sounddevice index or name; None = default input
+
+
+def parse_sources(raw: list[Any] | None) -> list[SourceSpec]:
+    """``asr_sources`` entries — a device, or ``{id, device}`` — as specs.
+
+    An empty list is the single default microphone.
+    """
+    if not raw:
+        return [SourceSpec(DEFAULT_SOURCE)]
+    specs = []
+    for i, entry in enumerate(raw):
+        if isinstance(entry, dict):
+            specs.append(SourceSpec(str(entry.get("id") or f"mic{i}"), entry.get("device")))
+        else:
+            specs.append(SourceSpec(f"mic{i}", entry))
+    ids = [s.id for s in specs]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"duplicate asr_sources ids: {ids}")
+    return specs
+
+
+def worker_layout(streams: int, workers: int = 0, cores: int | None = None) -> tuple[int, int]:
+    """``(num_workers, cpu_threads)`` for the model serving ``streams`` sources.
+
+    ``workers=0`` picks one per stream, up to half the cores. A single
+    stream keeps CTranslate2's default thread count (``cpu_threads=0``).
+    """
+    cores = cores or os.cpu_count() or 1
+    if streams <= 1 and not workers:
+        return 1, 0
+    workers = workers or max(1, min(streams, cores // 2))
+    return workers, max(1, cores // workers)
+
+
+@dataclass
+class SourceStats:
+    decodes: int = 0
+    wait_sec: float = 0.0
+    max_wait_sec: float = 0.0
+    busy_sec: float = 0.0
+
+
+class FairScheduler:
+    """``slots`` concurrent decodes, granted least-recently-served first."""
+
+    def __init__(self, slots: int, *, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.slots = slots
+        self.clock = clock
+        self.stats: dict[str, SourceStats] = {}
+        self._busy = 0
+        self._waiting: list[tuple[int, int, str]] = []  # (last grant, ticket, source)
+        self._last_grant: dict[str, int] = {}
+        self._grants = itertools.count(1)
+        self._tickets = itertools.count()
+        self._cond = threading.Condition()
+
+    def run(self, source_id: str, fn: Callable[..., T], *args: Any) -> T:
+        stats = self.stats.setdefault(source_id, SourceStats())
+        queued = self.clock()
+        with self._cond:
+            entry = (self._last_grant.get(source_id, 0), next(self._tickets), source_id)
+            self._waiting.append(entry)
+            while self._busy >= self.slots or min(self._waiting) != entry:
+                self._cond.wait()
+            self._waiting.remove(entry)
+            self._busy += 1
+            self._last_grant[source_id] = next(self._grants)
+            # Another slot may be free for the next waiter.
+            self._cond.notify_all()
+        started = self.clock()
+        try:
+            return fn(*args)
+        finally:
+            done = self.clock()
+            with self._cond:
+                self._busy -= 1
+                stats.decodes += 1
+                stats.wait_sec += started - queued
+                stats.max_wait_sec = max(stats.max_wait_sec, started - queued)
+                stats.busy_sec += done - started
+                self._cond.notify_all()
+
+    def wrap(self, source_id: str, transcribe: Transcriber) -> Transcriber:
+        def scheduled(samples: np.ndarray, prompt: str) -> list[Word]:
+            return self.run(source_id, transcribe, samples, prompt)
+
+        return scheduled
+
+    def summary(self) -> str:
+        return " ".join(
+            f"{sid}: decodes={s.decodes} busy={s.busy_sec:.1f}s "
+            f"wait avg={s.wait_sec / s.decodes * 1000 if s.decodes else 0:.0f}ms "
+            f"max={s.max_wait_sec * 1000:.0f}ms;"
+            for sid, s in sorted(self.stats.items())
+        ).rstrip(";")
+
+
+class CaptureSupervisor:
+    """Run each source's capture on its own thread, restarting it when it fails.
+
+    A failed source is *down* until its next attempt; after ``max_restarts``
+    failures in a row (a run that lasted ``backoff_max_sec`` resets the
+    count) it has *failed* for good. ``stop`` is set only once every source
+    has failed.
+    """
+
+    def __init__(
+        self,
+        stop: threading.Event,
+        *,
+        max_restarts: int = 5,
+        backoff_sec: float = 0.5,
+        backoff_max_sec: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.stop = stop
+        self.max_restarts = max_restarts
+        self.backoff_sec = backoff_sec
+        self.backoff_max_sec = backoff_max_sec
+        self.clock = clock
+        self.down: set[str] = set()
+        self.failed: set[str] = set()
+        self.restarts: dict[str, int] = {}
+        self._captures: dict[str, Callable[[threading.Event], object]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, source_id: str, capture: Callable[[threading.Event], object]) -> None:
+        """``capture(stop)`` reads the source until ``stop`` is set."""
+        self._captures[source_id] = capture
+        self.restarts[source_id] = 0
+
+    def start(self) -> None:
+        for source_id, capture in self._captures.items():
+            threading.Thread(target=self._supervise, args=(source_id, capture),
+                             name=f"gains-asr-capture-{source_id}", daemon=True).start()
+
+    def _supervise(self, source_id: str, capture: Callable[[threading.Event], object]) -> None:
+        failures = 0
+        while not self.stop.is_set():
+            started = self.clock()
+            try:
+                capture(self.stop)
+            except Exception:
+                log.exception("capture from %s failed", source_id)
+            else:
+                if self.stop.is_set():
+                    return
+                log.warning("capture from %s ended unexpectedly", source_id)
+            if self.clock() - started >= self.backoff_max_sec:
+                failures = 0
+            failures += 1
+            if failures > self.max_restarts:
+                self._give_up(source_id)
+                return
+            delay = min(self.backoff_sec * 2 ** (failures - 1), self.backoff_max_sec)
+            with self._lock:
+                self.down.add(source_id)
+            log.warning("source %s down; restart %d/%d in %.1fs",
+                        source_id, failures, self.max_restarts, delay)
+            if self.stop.wait(delay):
+                return
+            with self._lock:
+                self.down.discard(source_id)
+                self.restarts[source_id] += 1
+
+    def _give_up(self, source_id: str) -> None:
+        with self._lock:
+            self.down.add(source_id)
+            self.failed.add(source_id)
+            all_failed = len(self.failed) == len(self._captures)
+        log.error("source %s failed %d times in a row; giving up on it",
+                  source_id, self.max_restarts + 1)
+        if all_failed:
+            log.error("every audio source has failed; stopping")
+            self.stop.set()
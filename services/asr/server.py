@@ -14,19 +14,63 @@ Bug fixes vs. previous version:
 * Heavy ``model.transcribe`` ran in the audio callback; now in a worker.
 * Publisher now connects to the bus' XSUB side (5556) instead of the
   PUB-bound 5555, which previously dropped every message.
+* The worker used to call ``model.transcribe`` on every 64 ms capture
+  block — a full encoder pass per block, which on CPU overflowed the audio
+  queue. It now feeds a :class:`~services.asr.streaming.StreamingDecoder`
+  that decodes an overlapping window every ``stream_hop_sec`` and publishes
+  each word once, after two consecutive hypotheses agree on it.
+* Silent blocks used to be queued and decoded (Silero VAD only ran inside
+  ``model.transcribe``). An :class:`~services.asr.vad.EnergyGate` in the
+  audio callback now drops them before the queue and marks utterance ends,
+  so the worker idles while the room is quiet.
+* Capture was hard-wired to ``sd.InputStream`` inside ``main()``. The gate,
+  queue and worker now live in :class:`AsrPipeline`, fed by any
+  :mod:`services.asr.sources` source, so ``scripts/bench_asr.py`` can run
+  the same code over WAV files without a microphone.
+* ``WhisperModel`` was built — and the model name resolved against the hub
+  — before the microphone opened, so every (re)start lost several seconds
+  of speech. With ``warm_start`` (default) capture starts at once, the
+  model loads and warms up in the background
+  (:mod:`services.asr.warmstart`), and the audio queued meanwhile is
+  decoded when it is ready. ``asr.ready`` reports the time to ready.
+* Several microphones meant several processes, each with its own copy of
+  the weights. ``asr_sources`` lists them; one model serves every source,
+  each with its own pipeline and a ``source_id`` on its events
+  (:mod:`services.asr.multistream`).
+* One failing microphone used to stop the whole service, taking every
+  room offline. A :class:`~services.asr.multistream.CaptureSupervisor`
+  now restarts it with backoff while the others keep running.
 """
 from __future__ import annotations
 
+import functools
 import logging
 import os
 import queue
 import threading
 import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import yaml
 
+from services.asr.multistream import (
+    DEFAULT_SOURCE,
+    CaptureSupervisor,
+    FairScheduler,
+    parse_sources,
+    worker_layout,
+)
+from services.asr.sources import MicSource
+from services.asr.streaming import StreamingDecoder, Transcriber, Word
+from services.asr.vad import UTTERANCE_END, EnergyGate
+from services.asr.warmstart import ModelLoader, ModelManifest, default_manifest_path
+from services.bus.client import get_client
+from services.bus.protocol import ASR_PARTIAL, ASR_READY, TTS_PLAY
+
 log = logging.getLogger("gains.asr")
 
 CONFIG_PATH = Path(__file__).parent / "config" / "settings.yaml"
@@ -44,6 +88,20 @@ DEFAULTS: dict[str, Any] = {
     "vad_speech_pad_ms": 400,
     "sample_rate": 16000,
     "block_ms": 64,
+    "stream_hop_sec": 1.0,
+    "stream_window_sec": 20.0,
+    "stream_trim_sec": 10.0,
+    "vad_gate": True,
+    "vad_gate_min_db": -50.0,
+    "vad_gate_margin_db": 10.0,
+    "vad_gate_max_speech_sec": 15.0,
+    "vad_gate_steady_db": 3.0,  # a capped run steadier than this re-bases the floor
+    "stats_interval_sec": 60.0,
+    "warm_start": True,
+    "asr_sources": [],  # [{id, device}, ...]; empty = the default microphone
+    "decode_workers": 0,  # parallel decodes on the shared model; 0 = one per source
+    "capture_max_restarts": 5,  # consecutive failures before a source is given up
+    "capture_backoff_sec": 0.5,  # first restart delay, doubling up to 30 s
 }
 
 
@@ -62,12 +120,218 @@ def resolve_model_name(size: str, lang: str) -> str:
     return size
 
 
-def main() -> None:
-    import numpy as np
-    import sounddevice as sd
-    import zmq
-    from faster_whisper import WhisperModel
+def make_transcriber(model: Any, cfg: dict[str, Any], model_name: str) -> Transcriber:
+    """Wrap ``model.transcribe`` as a :data:`~services.asr.streaming.Transcriber`.
+
+    Segments under ``min_avg_logprob`` are dropped; the survivors' words
+    carry the segment's ``avg_logprob`` as their confidence.
+    """
+    min_lp = cfg["min_avg_logprob"]
+    # For .en models we don't pass language; otherwise pass the configured one.
+    explicit_lang = None if model_name.endswith(".en") else cfg["asr_language"]
+
+    def transcribe(samples: Any, prompt: str) -> list[Word]:
+        segments, _info = model.transcribe(
+            samples,
+            language=explicit_lang,
+            initial_prompt=prompt or None,
+            condition_on_previous_text=False,
+            vad_filter=cfg["vad_filter"],
+            vad_parameters={
+                "min_silence_duration_ms": cfg["vad_min_silence_ms"],
+                "speech_pad_ms": cfg["vad_speech_pad_ms"],
+            },
+            beam_size=cfg["beam_size"],
+            best_of=cfg["best_of"],
+            word_timestamps=True,
+        )
+        words: list[Word] = []
+        for seg in segments:
+            if not seg.text.strip() or seg.avg_logprob < min_lp:
+                continue
+            words.extend(
+                Word(w.word, w.start, w.end, seg.avg_logprob) for w in (seg.words or [])
+            )
+        return words
+
+    return transcribe
+
+
+def partial_event(words: list[Word], source_id: str = DEFAULT_SOURCE) -> dict[str, Any]:
+    """Build the ``asr.partial`` payload for a run of newly committed words."""
+    return {
+        "event": ASR_PARTIAL,
+        "source_id": source_id,
+        "text": "".join(w.word for w in words),
+        "ts": time.time(),
+        "confidence": min(w.confidence for w in words),
+        "start": words[0].start,
+        "end": words[-1].end,
+        "words": [{"word": w.word, "start": w.start, "end": w.end} for w in words],
+    }
+
+
+def make_gate(cfg: dict[str, Any]) -> EnergyGate:
+    # The gate's pre-roll / hangover reuse the Silero padding settings.
+    return EnergyGate(
+        sample_rate=cfg["sample_rate"],
+        block_ms=cfg["block_ms"],
+        min_db=cfg["vad_gate_min_db"],
+        margin_db=cfg["vad_gate_margin_db"],
+        preroll_ms=cfg["vad_speech_pad_ms"],
+        hangover_ms=cfg["vad_min_silence_ms"],
+        max_speech_ms=int(cfg["vad_gate_max_speech_sec"] * 1000),
+        steady_db=cfg["vad_gate_steady_db"],
+    )
+
+
+def make_decoder(transcribe: Transcriber, cfg: dict[str, Any]) -> StreamingDecoder:
+    return StreamingDecoder(
+        transcribe,
+        sample_rate=cfg["sample_rate"],
+        hop_sec=cfg["stream_hop_sec"],
+        window_sec=cfg["stream_window_sec"],
+        trim_sec=cfg["stream_trim_sec"],
+    )
+
+
+@dataclass
+class PipelineStats:
+    blocks: int = 0
+    dropped: int = 0
+    # Seconds from the gate passing an utterance's first block to its first words.
+    first_partial_sec: list[float] = field(default_factory=list)
+
+
+class AsrPipeline:
+    """Energy gate → bounded audio queue → streaming decoder.
+
+    :meth:`on_block` is the capture callback (any
+    :class:`~services.asr.sources.AudioSource`); :meth:`run` is the decode
+    worker and hands each run of committed words to ``on_words``.
+    """
+
+    def __init__(
+        self,
+        transcribe: Transcriber,
+        cfg: dict[str, Any],
+        on_words: Callable[[list[Word]], None],
+        *,
+        source_id: str = DEFAULT_SOURCE,
+    ) -> None:
+        self.cfg = cfg
+        self.source_id = source_id
+        self.on_words = on_words
+        self.gate = make_gate(cfg) if cfg["vad_gate"] else None
+        self.decoder = make_decoder(transcribe, cfg)
+        self.stats = PipelineStats()
+        # Sized to hold a whole decode window, so blocks captured while a
+        # decode is running queue up instead of being dropped. Entries are
+        # (enqueue time, samples); ``UTTERANCE_END`` marks a gated utterance end.
+        self.queue: queue.Queue[tuple[float, np.ndarray | None]] = queue.Queue(
+            maxsize=max(8, int(cfg["stream_window_sec"] * 1000 / cfg["block_ms"]))
+        )
+        self._awaiting_speech = True
+        self._speech_since: float | None = None
+
+    def on_block(self, samples: np.ndarray, *, block: bool = False) -> None:
+        """Gate and enqueue one capture block; ``block=True`` waits instead of dropping."""
+        self.stats.blocks += 1
+        now = time.monotonic()
+        for item in (self.gate.process(samples) if self.gate else [samples]):
+            try:
+                self.queue.put((now, item), block=block)
+            except queue.Full:
+                self.stats.dropped += 1
+                log.warning("audio queue full, dropping block")
+
+    def run(self, stop: threading.Event) -> None:
+        self._catch_up()
+        while not stop.is_set():
+            try:
+                enqueued, samples = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._decode(enqueued, samples)
+            finally:
+                self.queue.task_done()
+
+    def _catch_up(self) -> None:
+        # Audio queued before the worker started (a warm start) is decoded one
+        # utterance at a time rather than replayed as one decode per hop.
+        backlog: list[tuple[float, np.ndarray | None]] = []
+        while True:
+            try:
+                backlog.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if not backlog:
+            return
+        run: list[np.ndarray] = []
+        since = 0.0
+        for enqueued, samples in backlog:
+            if samples is not UTTERANCE_END:
+                if not run:
+                    since = enqueued
+                run.append(samples)
+                continue
+            if run:
+                self._decode(since, np.concatenate(run))
+                run = []
+            self._decode(enqueued, UTTERANCE_END)
+        if run:
+            self._decode(since, np.concatenate(run))
+        for _ in backlog:
+            self.queue.task_done()
+
+    @property
+    def queued_sec(self) -> float:
+        """Approximate audio waiting in the queue."""
+        return self.queue.qsize() * self.cfg["block_ms"] / 1000
+
+    def drain(self) -> None:
+        """Close the current utterance and wait until the worker has decoded everything."""
+        self.queue.put((time.monotonic(), UTTERANCE_END))
+        self.queue.join()
+
+    def _decode(self, enqueued: float, samples: np.ndarray | None) -> None:
+        if samples is UTTERANCE_END:
+            self._awaiting_speech = True
+        elif self._awaiting_speech:
+            self._awaiting_speech = False
+            self._speech_since = enqueued
+        try:
+            words = self.decoder.finish() if samples is UTTERANCE_END else self.decoder.feed(samples)
+        except Exception:
+            log.exception("transcription failed")
+            return
+        if not words:
+            return
+        if self._speech_since is not None:
+            self.stats.first_partial_sec.append(time.monotonic() - self._speech_since)
+            self._speech_since = None
+        self.on_words(words)
+
+    def log_stats(self) -> None:
+        if self.gate:
+            st = self.gate.stats
+            log.info("%s: vad gate: passed=%d gated=%d (%.0f%% passed) utterances=%d",
+                     self.source_id, st.passed, st.gated, 100 * st.pass_ratio, st.utterances)
+        if self.stats.dropped:
+            log.info("%s: audio queue: dropped %d of %d blocks",
+                     self.source_id, self.stats.dropped, self.stats.blocks)
 
+
+def warm_up(cfg: dict[str, Any], model_name: str) -> Callable[[Any], object]:
+    """One decode of a second of silence, with the service's decode settings."""
+    silence = np.zeros(cfg["sample_rate"], dtype=np.float32)
+    # Silero would skip silence entirely and leave the encoder cold.
+    warm_cfg = {**cfg, "vad_filter": False}
+    return lambda model: make_transcriber(model, warm_cfg, model_name)(silence, "")
+
+
+def main() -> None:
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s %(levelname)s %(name)s: %(message)s",
@@ -75,101 +339,113 @@ def main() -> None:
     cfg = load_config()
     lang = cfg["asr_language"]
     model_name = resolve_model_name(cfg["asr_model"], lang)
+    sources = parse_sources(cfg["asr_sources"])
+    workers, cpu_threads = worker_layout(len(sources), cfg["decode_workers"])
 
     device = "cuda" if os.getenv("DEVICE") == "gpu" else "cpu"
     compute = "float16" if device == "cuda" else "int8"
-    log.info("loading whisper model=%s device=%s compute=%s", model_name, device, compute)
-    model = WhisperModel(model_name, device=device, compute_type=compute)
+    log.info("loading whisper model=%s device=%s compute=%s workers=%d",
+             model_name, device, compute, workers)
+    loader = ModelLoader(model_name, device=device, compute_type=compute,
+                         manifest=ModelManifest(default_manifest_path()),
+                         warmup=warm_up(cfg, model_name),
+                         options={"num_workers": workers, "cpu_threads": cpu_threads}).start()
+    if not cfg["warm_start"]:
+        loader.wait()
 
-    ctx = zmq.Context.instance()
-    pub = ctx.socket(zmq.PUB)
-    pub.connect("tcp://localhost:5556")
-
-    audio_q: queue.Queue[np.ndarray] = queue.Queue(maxsize=8)
+    bus = get_client()
     stop = threading.Event()
     is_listening = threading.Event()
     last_speech = [time.monotonic()]  # list-as-cell for nonlocal-ish mutation
 
+    def publisher(source_id: str) -> Callable[[list[Word]], None]:
+        def on_words(words: list[Word]) -> None:
+            last_speech[0] = time.monotonic()
+            is_listening.set()
+            bus.publish(partial_event(words, source_id))
+
+        return on_words
+
+    transcribe = make_transcriber(loader, cfg, model_name)
+    scheduler = FairScheduler(workers)
+    pipelines = [
+        AsrPipeline(scheduler.wrap(spec.id, transcribe), cfg, publisher(spec.id),
+                    source_id=spec.id)
+        for spec in sources
+    ]
+
+    def decode_when_ready() -> None:
+        bus.publisher()  # connect while the model loads, so asr.ready isn't lost
+        try:
+            loader.wait()
+        except Exception:
+            log.exception("failed to load whisper model %s", model_name)
+            stop.set()
+            return
+        times = loader.times
+        buffered = sum(p.queued_sec for p in pipelines)
+        log.info("model ready in %.2fs (manifest %s: resolve %.2fs, load %.2fs, "
+                 "warm-up %.2fs); %.1fs of audio buffered",
+                 times.time_to_ready_sec, "hit" if times.manifest_hit else "miss",
+                 times.resolve_sec, times.load_sec, times.warmup_sec, buffered)
+        bus.publish({"event": ASR_READY, "model": model_name, "device": device,
+                     "compute": compute, "sources": [p.source_id for p in pipelines],
+                     **times.as_dict(), "buffered_sec": round(buffered, 2), "ts": time.time()})
+        for pipeline in pipelines:
+            threading.Thread(target=decode, args=(pipeline,),
+                             name=f"gains-asr-decode-{pipeline.source_id}", daemon=True).start()
+
+    def decode(pipeline: AsrPipeline) -> None:
+        bus.publisher()  # connect this thread's PUB socket before its first words
+        pipeline.run(stop)
+
     def silence_watchdog() -> None:
         while not stop.is_set():
             time.sleep(0.5)
             if (is_listening.is_set()
                     and (time.monotonic() - last_speech[0]) > cfg["silence_timeout_sec"]):
-                pub.send_json({"event": "tts.play", "text": "Are you done?", "ts": time.time()})
+                bus.publish({"event": TTS_PLAY, "text": "Are you done?", "ts": time.time()})
                 last_speech[0] = time.monotonic()
 
-    def transcribe_worker() -> None:
-        min_lp = cfg["min_avg_logprob"]
-        # For .en models we don't pass language; otherwise pass the configured one.
-        explicit_lang = None if model_name.endswith(".en") else lang
-        while not stop.is_set():
-            try:
-                samples = audio_q.get(timeout=0.5)
-            except queue.Empty:
-                continue
-            try:
-                segments, _info = model.transcribe(
-                    samples,
-                    language=explicit_lang,
-                    vad_filter=cfg["vad_filter"],
-                    vad_parameters={
-                        "min_silence_duration_ms": cfg["vad_min_silence_ms"],
-                        "speech_pad_ms": cfg["vad_speech_pad_ms"],
-                    },
-                    beam_size=cfg["beam_size"],
-                    best_of=cfg["best_of"],
-                    word_timestamps=True,
-                )
-                for seg in segments:
-                    if not seg.text.strip() or seg.avg_logprob < min_lp:
-                        continue
-                    last_speech[0] = time.monotonic()
-                    is_listening.set()
-                    pub.send_json({
-                        "event": "asr.partial",
-                        "text": seg.text,
-                        "ts": time.time(),
-                        "confidence": seg.avg_logprob,
-                        "start": seg.start,
-                        "end": seg.end,
-                        "words": [
-                            {"word": w.word, "start": w.start, "end": w.end}
-                            for w in (seg.words or [])
-                        ],
-                    })
-            except Exception:
-                log.exception("transcription failed")
-
-    threading.Thread(target=silence_watchdog, daemon=True).start()
-    threading.Thread(target=transcribe_worker, daemon=True).start()
+    def log_stats() -> None:
+        for pipeline in pipelines:
+            pipeline.log_stats()
+        if len(pipelines) > 1:
+            log.info("decode scheduler: %s", scheduler.summary())
 
-    block = int(cfg["sample_rate"] * cfg["block_ms"] / 1000)
+    def stats_logger() -> None:
+        while not stop.wait(cfg["stats_interval_sec"]):
+            log_stats()
 
-    def callback(indata, _frames, _time_info, status) -> None:
-        if status:
-            log.debug("audio status: %s", status)
-        try:
-            audio_q.put_nowait(indata[:, 0].copy())
-        except queue.Full:
-            log.warning("audio queue full, dropping block")
+    threading.Thread(target=silence_watchdog, daemon=True).start()
+    threading.Thread(target=stats_logger, daemon=True).start()
+    threading.Thread(target=decode_when_ready, daemon=True).start()
+    supervisor = CaptureSupervisor(stop, max_restarts=cfg["capture_max_restarts"],
+                                   backoff_sec=cfg["capture_backoff_sec"])
+    for spec, pipeline in zip(sources, pipelines, strict=True):
+        mic = MicSource(sample_rate=cfg["sample_rate"], block_ms=cfg["block_ms"],
+                        device=spec.device)
+        supervisor.add(spec.id, functools.partial(mic.run, pipeline.on_block))
+    supervisor.start()
 
-    log.info("listening: lang=%s model=%s beam=%d", lang, model_name, cfg["beam_size"])
+    log.info(
+        "listening: lang=%s model=%s beam=%d hop=%.2fs sources=%s",
+        lang, model_name, cfg["beam_size"], cfg["stream_hop_sec"],
+        ",".join(spec.id for spec in sources),
+    )
     try:
-        with sd.InputStream(
-            samplerate=cfg["sample_rate"],
-            channels=1,
-            dtype="float32",
-            callback=callback,
-            blocksize=block,
-        ):
-            while not stop.is_set():
-                time.sleep(0.1)
+        while not stop.wait(0.5):
+            pass
+        if loader.ready.is_set():
+            loader.wait()  # re-raise a failed load rather than exit 0
+        if len(supervisor.failed) == len(sources):
+            raise SystemExit("every audio source failed")
     except KeyboardInterrupt:
         log.info("shutting down")
     finally:
         stop.set()
-        pub.close()
-        ctx.term()
+        log_stats()
+        bus.term()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+"""Audio sources for the ASR pipeline: microphone, WAV file, synthetic tone.
+
+Every source pushes mono float32 blocks of ``block_ms`` at ``sample_rate``
+into ``on_block`` until it runs out or ``stop`` is set, so the live
+service and the offline benchmark (``scripts/bench_asr.py``) drive the
+same :class:`~services.asr.server.AsrPipeline`.
+
+File and tone sources replay at ``speed`` × real time; ``speed=0`` pushes
+blocks as fast as ``on_block`` accepts them.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import wave
+from collections.abc import Callable
+from pathlib import Path
+from typing import Protocol
+
+import numpy as np
+
+log = logging.getLogger("gains.asr.sources")
+
+BlockCallback = Callable[[np.ndarray], None]
+
+
+class AudioSource(Protocol):
+    sample_rate: int
+    block_ms: int
+
+    def run(self, on_block: BlockCallback, stop: threading.Event) -> None: ...
+
+
+def _play(samples: np.ndarray, block: int, sample_rate: int, speed: float,
+          on_block: BlockCallback, stop: threading.Event) -> None:
+    start = time.monotonic()
+    for i, offset in enumerate(range(0, len(samples), block)):
+        if stop.is_set():
+            return
+        if speed:
+            delay = start + i * block / sample_rate / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        on_block(samples[offset:offset + block])
+
+
+class MicSource:
+    """An input device via ``sounddevice`` (default: the system's); runs until ``stop``."""
+
+    def __init__(self, *, sample_rate: int = 16000, block_ms: int = 64,
+                 device: int | str | None = None) -> None:
+        self.sample_rate = sample_rate
+        self.block_ms = block_ms
+        self.device = device
+
+    def run(self, on_block: BlockCallback, stop: threading.Event) -> None:
+        import sounddevice as sd
+
+        def callback(indata, _frames, _time_info, status) -> None:
+            if status:
+                log.debug("audio status: %s", status)
+            on_block(indata[:, 0].copy())
+
+        with sd.InputStream(
+            device=self.device,
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype="float32",
+            callback=callback,
+            blocksize=int(self.sample_rate * self.block_ms / 1000),
+        ):
+            while not stop.is_set():
+                time.sleep(0.1)
+
+
+def read_wav(path: Path, sample_rate: int) -> np.ndarray:
+    """PCM WAV as mono float32 in [-1, 1], linearly resampled to ``sample_rate``."""
+    with wave.open(str(path), "rb") as w:
+        width, channels, rate = w.getsampwidth(), w.getnchannels(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    if width == 1:
+        pcm = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width in (2, 4):
+        dtype = np.int16 if width == 2 else np.int32
+        pcm = np.frombuffer(raw, dtype=dtype).astype(np.float32) / np.iinfo(dtype).max
+    else:
+        raise ValueError(f"{path}: unsupported sample width {width * 8} bits")
+    pcm = pcm.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate and len(pcm):
+        n = int(len(pcm) * sample_rate / rate)
+        pcm = np.interp(np.arange(n) * rate / sample_rate, np.arange(len(pcm)), pcm)
+    return pcm.astype(np.float32)
+
+
+class WavSource:
+    """One WAV file, replayed block by block."""
+
+    def __init__(self, path: Path, *, sample_rate: int = 16000, block_ms: int = 64,
+                 speed: float = 0.0) -> None:
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.block_ms = block_ms
+        self.speed = speed
+        self.samples = read_wav(self.path, sample_rate)
+
+    @property
+    def duration_sec(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    def run(self, on_block: BlockCallback, stop: threading.Event) -> None:
+        block = int(self.sample_rate * self.block_ms / 1000)
+        _play(self.samples, block, self.sample_rate, self.speed, on_block, stop)
+
+
+class ToneSource:
+    """Tone bursts separated by silence: exercises the gate and queue without a corpus."""
+
+    def __init__(self, *, seconds: float = 10.0, freq_hz: float = 440.0,
+                 amplitude: float = 0.3, on_sec: float = 1.0, off_sec: float = 1.0,
+                 sample_rate: int = 16000, block_ms: int = 64, speed: float = 0.0) -> None:
+        self.sample_rate = sample_rate
+        self.block_ms = block_ms
+        self.speed = speed
+        t = np.arange(int(seconds * sample_rate)) / sample_rate
+        on = (t % (on_sec + off_sec)) < on_sec
+        self.samples = (amplitude * np.sin(2 * np.pi * freq_hz * t) * on).astype(np.float32)
+
+    @property
+    def duration_sec(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    def run(self, on_block: BlockCallback, stop: threading.Event) -> None:
+        block = int(self.sample_rate * self.block_ms / 1000)
+        _play(self.samples, block, self.sample_rate, self.speed, on_block, stop)
@@ -0,0 +1,207 @@
+"""Streaming decode engine for the ASR service.
+
+Whisper is an offline model: every ``transcribe`` call pads its input to a
+full 30 s window and runs the whole encoder, however little audio it was
+given. Decoding each 64 ms capture block separately therefore pays one
+encoder pass per block and never sees enough context to be accurate.
+
+Instead, capture blocks go into an :class:`AudioRing`, the buffered window
+is decoded every ``hop_sec`` seconds, and :class:`LocalAgreement` only
+commits words that two consecutive hypotheses agree on. Each committed word
+is returned exactly once, so the service can publish it as ``asr.partial``
+without re-sending text it already emitted.
+"""
+from __future__ import annotations
+
+import collections
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+# Words whose normalised text differs only by case / punctuation still agree.
+_STRIP = " \t\n.,!?;:\"'()[]…-"
+# Max n-gram checked when de-duplicating a re-transcribed committed tail.
+_MAX_OVERLAP_WORDS = 5
+
+
+@dataclass(frozen=True, slots=True)
+class Word:
+    """One decoded word. Times are seconds since the start of the stream."""
+
+    word: str
+    start: float
+    end: float
+    confidence: float = 0.0  # avg_logprob of the segment the word came from
+
+
+# (audio, prompt) -> words with times relative to the start of ``audio``.
+Transcriber = Callable[[np.ndarray, str], list[Word]]
+
+
+def _norm(word: str) -> str:
+    return word.strip(_STRIP).lower()
+
+
+class AudioRing:
+    """Fixed-capacity float32 sample buffer addressed by absolute sample index.
+
+    Backed by a preallocated array twice the capacity, so :meth:`view` is
+    always a contiguous slice and the occasional compaction copy amortises
+    to O(1) per sample. Appending past capacity silently drops the oldest
+    samples.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._buf = np.zeros(2 * capacity, dtype=np.float32)
+        self._offset = 0  # index into _buf of the oldest sample held
+        self._len = 0
+        self.start = 0  # absolute index of the oldest sample held
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def end(self) -> int:
+        return self.start + self._len
+
+    def extend(self, samples: np.ndarray) -> None:
+        n = len(samples)
+        if n >= self.capacity:
+            dropped = n - self.capacity
+            self.start = self.end + dropped
+            self._offset, self._len = 0, 0
+            samples = samples[dropped:]
+            n = self.capacity
+        overflow = self._len + n - self.capacity
+        if overflow > 0:
+            self.trim(self.start + overflow)
+        if self._offset + self._len + n > len(self._buf):
+            self._buf[:self._len] = self._buf[self._offset:self._offset + self._len]
+            self._offset = 0
+        tail = self._offset + self._len
+        self._buf[tail:tail + n] = samples
+        self._len += n
+
+    def trim(self, index: int) -> None:
+        """Drop every sample older than absolute sample ``index``."""
+        drop = min(max(index - self.start, 0), self._len)
+        self._offset += drop
+        self._len -= drop
+        self.start += drop
+
+    def view(self) -> np.ndarray:
+        """Buffered samples, oldest first. Valid until the next :meth:`extend`."""
+        return self._buf[self._offset:self._offset + self._len]
+
+
+class LocalAgreement:
+    """Commit the longest prefix two consecutive hypotheses agree on."""
+
+    def __init__(self) -> None:
+        self._pending: list[Word] = []
+        self._tail: collections.deque[Word] = collections.deque(maxlen=_MAX_OVERLAP_WORDS)
+        self.committed_until = 0.0
+
+    def insert(self, hypothesis: list[Word]) -> list[Word]:
+        hyp = [w for w in hypothesis if (w.start + w.end) / 2 > self.committed_until]
+        hyp = self._drop_overlap(hyp)
+        commit: list[Word] = []
+        for prev, cur in zip(self._pending, hyp, strict=False):
+            if _norm(prev.word) != _norm(cur.word):
+                break
+            commit.append(cur)
+        self._pending = hyp[len(commit):]
+        self._remember(commit)
+        return commit
+
+    def flush(self) -> list[Word]:
+        """Commit whatever is still pending (end of utterance / stream)."""
+        rest, self._pending = self._pending, []
+        self._remember(rest)
+        return rest
+
+    def context(self) -> str:
+        """The last few committed words, used to prompt the next decode."""
+        return "".join(w.word for w in self._tail).strip()
+
+    def _remember(self, words: list[Word]) -> None:
+        if words:
+            self._tail.extend(words)
+            self.committed_until = words[-1].end
+
+    def _drop_overlap(self, hyp: list[Word]) -> list[Word]:
+        # Whisper sometimes re-emits the last committed words with timestamps
+        # that shift just past ``committed_until``; skip the repeated n-gram.
+        if not hyp or not self._tail or hyp[0].start - self.committed_until > 1.0:
+            return hyp
+        tail = [_norm(w.word) for w in self._tail]
+        for n in range(min(len(tail), len(hyp)), 0, -1):
+            if tail[-n:] == [_norm(w.word) for w in hyp[:n]]:
+                return hyp[n:]
+        return hyp
+
+
+class StreamingDecoder:
+    """Buffer audio and decode an overlapping window every ``hop_sec``.
+
+    :meth:`feed` is cheap except on the blocks that complete a hop, so the
+    number of encoder passes per second is ``1 / hop_sec`` regardless of the
+    capture block size. Once more than ``trim_sec`` is buffered the ring is
+    trimmed back to the end of the last committed word.
+    """
+
+    def __init__(
+        self,
+        transcribe: Transcriber,
+        *,
+        sample_rate: int,
+        hop_sec: float = 1.0,
+        window_sec: float = 20.0,
+        trim_sec: float = 10.0,
+    ) -> None:
+        self._transcribe = transcribe
+        self.sample_rate = sample_rate
+        self._hop = max(1, int(hop_sec * sample_rate))
+        self._trim = int(trim_sec * sample_rate)
+        self._ring = AudioRing(int(window_sec * sample_rate))
+        self._agreement = LocalAgreement()
+        self._since_decode = 0
+        self.decodes = 0
+
+    @property
+    def buffered_sec(self) -> float:
+        return len(self._ring) / self.sample_rate
+
+    def feed(self, samples: np.ndarray) -> list[Word]:
+        self._ring.extend(samples)
+        self._since_decode += len(samples)
+        if self._since_decode < self._hop:
+            return []
+        return self.decode()
+
+    def decode(self) -> list[Word]:
+        self._since_decode = 0
+        if not len(self._ring):
+            return []
+        offset = self._ring.start / self.sample_rate
+        prompt = self._agreement.context()
+        hypothesis = [
+            Word(w.word, w.start + offset, w.end + offset, w.confidence)
+            for w in self._transcribe(self._ring.view(), prompt)
+        ]
+        self.decodes += 1
+        committed = self._agreement.insert(hypothesis)
+        if len(self._ring) > self._trim:
+            self._ring.trim(int(self._agreement.committed_until * self.sample_rate))
+        return committed
+
+    def finish(self) -> list[Word]:
+        """Decode any trailing audio, commit the rest, and clear the buffer."""
+        committed = self.decode() if self._since_decode else []
+        committed += self._agreement.flush()
+        self._ring.trim(self._ring.end)
+        return committed
@@ -0,0 +1,158 @@
+"""Pre-decode voice activity gate for the ASR service.
+
+Runs in the sounddevice callback, ahead of the audio queue, so silent
+capture blocks are dropped before the decode worker ever sees them. The
+test is a per-block RMS energy check against an adaptive noise floor —
+a few microseconds per block, unlike Silero VAD which runs a neural net
+inside every ``model.transcribe`` call.
+
+:meth:`EnergyGate.process` returns the blocks to enqueue. After
+``hangover_ms`` of silence following speech it emits :data:`UTTERANCE_END`
+so the worker can commit the rest of its hypothesis and go back to sleep.
+
+The noise floor also follows the level during speech, ten times more
+slowly, and a speech run longer than ``max_speech_ms`` is closed. If the
+run's block levels varied by less than ``steady_db`` (standard deviation)
+it was steady noise, not speech, and the floor is re-based on its quietest
+block. A room whose steady background sits above the initial floor
+therefore closes the gate within ``max_speech_ms`` instead of holding it
+open for good, while long continuous dictation — whose level swings far
+more — leaves the floor alone, so quiet speech after it still passes.
+"""
+from __future__ import annotations
+
+import collections
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+
+log = logging.getLogger("gains.asr.vad")
+
+# Queued after the trailing silence of each utterance.
+UTTERANCE_END = None
+
+# Noise floor EMA weight per silent block (~3 s time constant at 64 ms blocks).
+_FLOOR_ALPHA = 0.02
+# ... and per speech block (~30 s), so speech barely moves it but steady noise does.
+_SPEECH_FLOOR_ALPHA = 0.002
+
+
+@dataclass
+class GateStats:
+    passed: int = 0
+    gated: int = 0
+    utterances: int = 0
+
+    @property
+    def pass_ratio(self) -> float:
+        total = self.passed + self.gated
+        return self.passed / total if total else 0.0
+
+
+def block_dbfs(block: np.ndarray) -> float:
+    """RMS level of ``block`` in dB relative to full scale (float32 ±1.0)."""
+    power = float(np.dot(block, block)) / max(len(block), 1)
+    return float(10.0 * np.log10(power + 1e-12))
+
+
+class EnergyGate:
+    """Pass speech blocks (with pre-roll and hangover), drop silence.
+
+    A block counts as speech when it is ``margin_db`` above the running
+    noise floor and above ``min_db``. ``preroll_ms`` of audio preceding the
+    onset is replayed so word onsets aren't clipped, and ``hangover_ms`` of
+    silence is passed after speech before the utterance is closed.
+    """
+
+    def __init__(
+        self,
+        *,
+        sample_rate: int,
+        block_ms: int,
+        min_db: float = -50.0,
+        margin_db: float = 10.0,
+        preroll_ms: int = 400,
+        hangover_ms: int = 500,
+        max_speech_ms: int = 15000,
+        steady_db: float = 3.0,
+    ) -> None:
+        self.min_db = min_db
+        self.margin_db = margin_db
+        self.steady_db = steady_db
+        self._preroll: collections.deque[np.ndarray] = collections.deque(
+            maxlen=max(1, preroll_ms // block_ms)
+        )
+        self._hangover_blocks = max(1, hangover_ms // block_ms)
+        self._max_speech_blocks = max(1, max_speech_ms // block_ms)
+        self._silent_run = 0
+        self._speech_run = 0
+        self._run_min_db = 0.0
+        self._run_levels = 0
+        self._run_sum = 0.0
+        self._run_sumsq = 0.0
+        self.in_speech = False
+        self.noise_floor = min_db - margin_db
+        self.stats = GateStats()
+
+    def is_speech(self, level_db: float) -> bool:
+        return level_db > max(self.min_db, self.noise_floor + self.margin_db)
+
+    def process(self, block: np.ndarray) -> list[np.ndarray | None]:
+        level = block_dbfs(block)
+        if self.is_speech(level):
+            self.noise_floor += _SPEECH_FLOOR_ALPHA * (level - self.noise_floor)
+            self._silent_run = 0
+            out: list[np.ndarray | None] = []
+            if not self.in_speech:
+                self.in_speech = True
+                self._speech_run = 0
+                self._run_min_db = level
+                self._run_levels, self._run_sum, self._run_sumsq = 0, 0.0, 0.0
+                out.extend(self._preroll)
+                self.stats.passed += len(self._preroll)
+                self.stats.gated -= len(self._preroll)
+                self._preroll.clear()
+            self._speech_run += 1
+            self._run_min_db = min(self._run_min_db, level)
+            self._run_levels += 1
+            self._run_sum += level
+            self._run_sumsq += level * level
+            if self._speech_run >= self._max_speech_blocks:
+                # Nobody talks for this long without a pause. A steady level
+                # means the floor is below the room's noise: re-base it.
+                # Speech swings by far more and keeps the floor.
+                if self._run_spread_db() < self.steady_db:
+                    log.debug("steady speech run capped; noise floor %.1f -> %.1f dBFS",
+                              self.noise_floor, self._run_min_db)
+                    self.noise_floor = max(self.noise_floor, self._run_min_db)
+                out.extend(self._close(block))
+                return out
+            out.append(block)
+            self.stats.passed += 1
+            return out
+
+        self.noise_floor += _FLOOR_ALPHA * (level - self.noise_floor)
+        if self.in_speech:
+            self._silent_run += 1
+            self._speech_run += 1
+            if self._silent_run < self._hangover_blocks:
+                self.stats.passed += 1
+                return [block]
+            return self._close(block)
+        self._preroll.append(block)
+        self.stats.gated += 1
+        return []
+
+    def _run_spread_db(self) -> float:
+        """Standard deviation of the current speech run's block levels."""
+        n = self._run_levels
+        mean = self._run_sum / n
+        return float(np.sqrt(max(self._run_sumsq / n - mean * mean, 0.0)))
+
+    def _close(self, block: np.ndarray) -> list[np.ndarray | None]:
+        self.in_speech = False
+        self._silent_run = 0
+        self.stats.passed += 1
+        self.stats.utterances += 1
+        return [block, UTTERANCE_END]
@@ -0,0 +1,198 @@
+"""Warm start for the ASR service: background model load and a model manifest.
+
+``gains-asr`` used to construct ``WhisperModel`` before opening the
+microphone, and every launch re-resolved the model name against the
+Hugging Face hub — several seconds in which speech was simply lost. Now:
+
+* :class:`ModelLoader` resolves, loads and warms the model on a background
+  thread while the service is already capturing; the pipeline queue holds
+  the gated audio until the model is ready.
+* The warm-up runs one inference on a second of silence, so the first real
+  decode doesn't also pay for CTranslate2's first-call kernel selection
+  and allocations.
+* :class:`ModelManifest` records where each model's files live locally
+  (``GAINS_ASR_MANIFEST``, default ``$XDG_CACHE_HOME/gains/asr-models.json``,
+  ``off`` to disable). A manifest hit loads straight from that directory,
+  skipping the hub lookup; if the directory is gone or fails to load, the
+  entry is dropped and the model is resolved as before.
+
+:class:`StartupTimes` is the time-to-ready breakdown the service logs and
+publishes as ``asr.ready``.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+log = logging.getLogger("gains.asr.warmstart")
+
+# File that must exist in a CTranslate2 model directory.
+MODEL_FILE = "model.bin"
+
+
+def default_manifest_path() -> Path | None:
+    """Manifest location from ``GAINS_ASR_MANIFEST``; ``None`` when disabled."""
+    value = os.getenv("GAINS_ASR_MANIFEST")
+    if value == "off":
+        return None
+    if value:
+        return Path(value).expanduser()
+    base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "gains" / "asr-models.json"
+
+
+class ModelManifest:
+    """Model name → local model directory, persisted as JSON."""
+
+    def __init__(self, path: Path | None) -> None:
+        self.path = path
+        self.entries: dict[str, dict[str, Any]] = {}
+        if path is not None and path.exists():
+            try:
+                self.entries = json.loads(path.read_text())["models"]
+            except (OSError, ValueError, KeyError, TypeError):
+                log.warning("ignoring unreadable model manifest %s", path)
+
+    def lookup(self, model_name: str) -> Path | None:
+        entry = self.entries.get(model_name)
+        if entry is None:
+            return None
+        path = Path(entry["path"])
+        return path if (path / MODEL_FILE).exists() else None
+
+    def record(self, model_name: str, path: Path, **info: Any) -> None:
+        self.entries[model_name] = {"path": str(path), **info, "saved": time.time()}
+        self._save()
+
+    def forget(self, model_name: str) -> None:
+        if self.entries.pop(model_name, None) is not None:
+            self._save()
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"models": self.entries}, indent=2))
+            os.replace(tmp, self.path)
+        except OSError:
+            log.warning("could not write model manifest %s", self.path, exc_info=True)
+
+
+@dataclass
+class StartupTimes:
+    manifest_hit: bool = False
+    resolve_sec: float = 0.0
+    load_sec: float = 0.0
+    warmup_sec: float = 0.0
+    time_to_ready_sec: float = 0.0  # loader creation → warm model
+
+    def as_dict(self) -> dict[str, Any]:
+        return {k: round(v, 3) if isinstance(v, float) else v for k, v in asdict(self).items()}
+
+
+def download_model(model_name: str) -> Path:
+    from faster_whisper import download_model
+
+    return Path(download_model(model_name))
+
+
+def whisper_model(path: Path, device: str, compute_type: str, **options: Any) -> Any:
+    from faster_whisper import WhisperModel
+
+    return WhisperModel(str(path), device=device, compute_type=compute_type, **options)
+
+
+class ModelLoader:
+    """Resolve, load and warm a model on a background thread; :meth:`wait` for it."""
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        device: str,
+        compute_type: str,
+        manifest: ModelManifest,
+        warmup: Callable[[Any], object] | None = None,
+        download: Callable[[str], Path] = download_model,
+        factory: Callable[..., Any] = whisper_model,
+        options: dict[str, Any] | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        """``options`` are extra ``WhisperModel`` arguments (``num_workers`` ...)."""
+        self.model_name = model_name
+        self.device = device
+        self.compute_type = compute_type
+        self.manifest = manifest
+        self.warmup = warmup
+        self.download = download
+        self.factory = factory
+        self.options = options or {}
+        self.clock = clock
+        self.times = StartupTimes()
+        self.ready = threading.Event()
+        self._model: Any = None
+        self._error: BaseException | None = None
+        self._started = clock()
+        self._thread = threading.Thread(target=self._run, name="gains-asr-load", daemon=True)
+
+    def start(self) -> ModelLoader:
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: float | None = None) -> Any:
+        """The warm model; re-raises the load error, ``TimeoutError`` on timeout."""
+        if not self.ready.wait(timeout):
+            raise TimeoutError(f"model {self.model_name} not ready after {timeout}s")
+        if self._error is not None:
+            raise self._error
+        return self._model
+
+    def transcribe(self, *args: Any, **kwargs: Any) -> Any:
+        """``model.transcribe``, waiting for the load; lets callers bind it early."""
+        return self.wait().transcribe(*args, **kwargs)
+
+    def _run(self) -> None:
+        try:
+            self._model = self._load()
+            if self.warmup is not None:
+                t0 = self.clock()
+                self.warmup(self._model)
+                self.times.warmup_sec = self.clock() - t0
+            self.times.time_to_ready_sec = self.clock() - self._started
+        except BaseException as e:  # surfaced to whoever waits
+            self._error = e
+        finally:
+            self.ready.set()
+
+    def _load(self) -> Any:
+        times = self.times
+        cached = self.manifest.lookup(self.model_name)
+        if cached is not None:
+            t0 = self.clock()
+            try:
+                model = self.factory(cached, self.device, self.compute_type, **self.options)
+            except Exception:
+                log.warning("cached model %s at %s failed to load; resolving again",
+                            self.model_name, cached, exc_info=True)
+                self.manifest.forget(self.model_name)
+            else:
+                times.manifest_hit = True
+                times.load_sec = self.clock() - t0
+                return model
+        t0 = self.clock()
+        path = self.download(self.model_name)
+        times.resolve_sec = self.clock() - t0
+        t0 = self.clock()
+        model = self.factory(path, self.device, self.compute_type, **self.options)
+        times.load_sec = self.clock() - t0
+        self.manifest.record(self.model_name, path, load_sec=round(times.load_sec, 3))
+        return model
@@ -0,0 +1,246 @@
+"""Shared bus client: one context, tuned sockets, one place for endpoints.
+
+Every service and plugin used to build its own ``zmq.Context``, PUB and SUB
+sockets with hard-coded endpoints and libzmq's default HWM / linger /
+reconnect settings. :func:`get_client` returns a process-wide
+:class:`BusClient` configured from the environment instead:
+
+==============================  ==========================  =====================
+Variable                        Default                     Meaning
+==============================  ==========================  =====================
+``GAINS_BUS_TRANSPORT``         ``tcp``                     tcp / ipc / inproc
+``GAINS_RUNTIME_DIR``           ``$XDG_RUNTIME_DIR/gains``  ipc socket directory
+``GAINS_BUS_PUBLISH_TO``        ``tcp://localhost:5556``    hub XSUB (publish)
+``GAINS_BUS_SUBSCRIBE_TO``      ``tcp://localhost:5555``    hub XPUB (subscribe)
+``GAINS_BUS_XSUB_BIND``         ``tcp://*:5556``            hub bind, publishers
+``GAINS_BUS_XPUB_BIND``         ``tcp://*:5555``            hub bind, subscribers
+``GAINS_BUS_LEGACY_BIND``       off                         hub bind, legacy JSON
+``GAINS_BUS_SNDHWM``            ``10000``                   queued msgs per PUB
+``GAINS_BUS_RCVHWM``            ``10000``                   queued msgs per SUB
+``GAINS_BUS_LINGER_MS``         ``200``                     flush time on close
+``GAINS_BUS_TCP_KEEPALIVE``     ``60``                      idle secs, 0 = off
+``GAINS_BUS_RECONNECT_MAX_MS``  ``5000``                    reconnect backoff cap
+==============================  ==========================  =====================
+
+``GAINS_BUS_TRANSPORT`` picks the default endpoints: ``ipc`` puts the hub
+on Unix sockets under the runtime dir (no loopback TCP stack on a
+single-host deployment) and ``inproc`` is for services running as threads
+of one process (see :mod:`services.launcher`). Explicit endpoint variables
+override the transport defaults. ``GAINS_BUS_LEGACY_BIND`` (e.g.
+``tcp://*:5557``) also serves subscribers that still expect single-frame
+JSON; see :mod:`services.bus.hub`.
+
+ZeroMQ sockets are not thread-safe, so :meth:`BusClient.publisher` hands
+out one PUB socket per thread and reuses it for every publish from that
+thread.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any
+
+import zmq
+
+from services.bus.protocol import publish, recv, subscribe, try_decode
+
+TRANSPORTS = ("tcp", "ipc", "inproc")
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def default_runtime_dir() -> Path:
+    if os.getenv("GAINS_RUNTIME_DIR"):
+        return Path(os.environ["GAINS_RUNTIME_DIR"])
+    return Path(os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()) / "gains"
+
+
+def bind(sock: zmq.Socket, endpoint: str) -> None:
+    """``sock.bind(endpoint)``, creating the directory of an ``ipc://`` path."""
+    if endpoint.startswith("ipc://"):
+        Path(endpoint[len("ipc://"):]).parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    sock.bind(endpoint)
+
+
+@dataclass(frozen=True)
+class BusConfig:
+    publish_to: str = "tcp://localhost:5556"
+    subscribe_to: str = "tcp://localhost:5555"
+    xsub_bind: str = "tcp://*:5556"
+    xpub_bind: str = "tcp://*:5555"
+    legacy_bind: str = ""  # single-frame JSON for old subscribers; "" = off
+    sndhwm: int = 10000
+    rcvhwm: int = 10000
+    linger_ms: int = 200
+    tcp_keepalive_idle: int = 60
+    reconnect_ivl_ms: int = 100
+    reconnect_ivl_max_ms: int = 5000
+
+    @classmethod
+    def for_transport(cls, transport: str, runtime_dir: Path | None = None) -> BusConfig:
+        """Default endpoints for ``tcp``, ``ipc`` or ``inproc``."""
+        if transport == "tcp":
+            return cls()
+        if transport == "ipc":
+            base = runtime_dir or default_runtime_dir()
+            xsub, xpub = f"ipc://{base}/bus-xsub", f"ipc://{base}/bus-xpub"
+        elif transport == "inproc":
+            xsub, xpub = "inproc://gains-bus-xsub", "inproc://gains-bus-xpub"
+        else:
+            raise ValueError(f"unknown bus transport {transport!r} (expected one of {TRANSPORTS})")
+        return cls(publish_to=xsub, subscribe_to=xpub, xsub_bind=xsub, xpub_bind=xpub)
+
+    @classmethod
+    def from_env(cls) -> BusConfig:
+        d = cls.for_transport(os.getenv("GAINS_BUS_TRANSPORT", "tcp"))
+        return replace(
+            d,
+            publish_to=os.getenv("GAINS_BUS_PUBLISH_TO", d.publish_to),
+            subscribe_to=os.getenv("GAINS_BUS_SUBSCRIBE_TO", d.subscribe_to),
+            xsub_bind=os.getenv("GAINS_BUS_XSUB_BIND", d.xsub_bind),
+            xpub_bind=os.getenv("GAINS_BUS_XPUB_BIND", d.xpub_bind),
+            legacy_bind=os.getenv("GAINS_BUS_LEGACY_BIND", d.legacy_bind),
+            sndhwm=_env_int("GAINS_BUS_SNDHWM", d.sndhwm),
+            rcvhwm=_env_int("GAINS_BUS_RCVHWM", d.rcvhwm),
+            linger_ms=_env_int("GAINS_BUS_LINGER_MS", d.linger_ms),
+            tcp_keepalive_idle=_env_int("GAINS_BUS_TCP_KEEPALIVE", d.tcp_keepalive_idle),
+            reconnect_ivl_max_ms=_env_int("GAINS_BUS_RECONNECT_MAX_MS", d.reconnect_ivl_max_ms),
+        )
+
+
+class BusClient:
+    """Socket factory bound to one :class:`BusConfig` and one context.
+
+    With ``shared=True`` several services run as threads of this process
+    (see :mod:`services.launcher`): :meth:`close` and :meth:`term` then
+    only close the calling thread's sockets and leave the context to its
+    owner.
+    """
+
+    def __init__(
+        self,
+        config: BusConfig | None = None,
+        ctx: zmq.Context | None = None,
+        *,
+        shared: bool = False,
+    ) -> None:
+        self.config = config or BusConfig.from_env()
+        self.ctx = ctx or zmq.Context.instance()
+        self.shared = shared
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sockets: dict[int, list[zmq.Socket]] = {}
+
+    def configure(self, sock: zmq.Socket) -> zmq.Socket:
+        """Apply the mesh-wide HWM / linger / keepalive / reconnect options."""
+        cfg = self.config
+        sock.setsockopt(zmq.SNDHWM, cfg.sndhwm)
+        sock.setsockopt(zmq.RCVHWM, cfg.rcvhwm)
+        sock.setsockopt(zmq.LINGER, cfg.linger_ms)
+        sock.setsockopt(zmq.RECONNECT_IVL, cfg.reconnect_ivl_ms)
+        sock.setsockopt(zmq.RECONNECT_IVL_MAX, cfg.reconnect_ivl_max_ms)
+        if cfg.tcp_keepalive_idle > 0:
+            sock.setsockopt(zmq.TCP_KEEPALIVE, 1)
+            sock.setsockopt(zmq.TCP_KEEPALIVE_IDLE, cfg.tcp_keepalive_idle)
+        return sock
+
+    def socket(self, kind: int) -> zmq.Socket:
+        sock = self.configure(self.ctx.socket(kind))
+        with self._lock:
+            self._sockets.setdefault(threading.get_ident(), []).append(sock)
+        return sock
+
+    def publisher(self) -> zmq.Socket:
+        """This thread's PUB socket, connected to the hub's XSUB side."""
+        sock = getattr(self._local, "pub", None)
+        if sock is None or sock.closed:
+            sock = self.socket(zmq.PUB)
+            sock.connect(self.config.publish_to)
+            self._local.pub = sock
+        return sock
+
+    def publish(self, msg: dict[str, Any]) -> None:
+        publish(self.publisher(), msg)
+
+    def subscriber(self, *topics: str) -> zmq.Socket:
+        """A new SUB socket on the hub's XPUB side, subscribed to ``topics``."""
+        sock = self.socket(zmq.SUB)
+        sock.connect(self.config.subscribe_to)
+        subscribe(sock, *topics)
+        return sock
+
+    def listen(self, *topics: str) -> Iterator[dict[str, Any]]:
+        """Yield decoded messages for ``topics`` until the consumer stops."""
+        sock = self.subscriber(*topics)
+        try:
+            while True:
+                yield recv(sock)
+        finally:
+            self._discard(sock)
+
+    async def alisten(self, *topics: str) -> AsyncIterator[dict[str, Any]]:
+        """Async variant of :meth:`listen` for asyncio-based clients."""
+        import zmq.asyncio
+
+        actx = zmq.asyncio.Context.shadow(self.ctx)
+        sock = self.configure(actx.socket(zmq.SUB))
+        sock.connect(self.config.subscribe_to)
+        subscribe(sock, *topics)
+        try:
+            while True:
+                msg = try_decode(await sock.recv_multipart())
+                if msg is not None:
+                    yield msg
+        finally:
+            sock.close()
+
+    def close(self) -> None:
+        """Close the sockets this client created (this thread's, if shared)."""
+        with self._lock:
+            if self.shared:
+                sockets = self._sockets.pop(threading.get_ident(), [])
+            else:
+                sockets = [s for group in self._sockets.values() for s in group]
+                self._sockets.clear()
+        for sock in sockets:
+            sock.close()
+
+    def term(self) -> None:
+        """Close sockets and, unless shared, terminate the context (service shutdown)."""
+        self.close()
+        if not self.shared:
+            self.ctx.term()
+
+    def _discard(self, sock: zmq.Socket) -> None:
+        with self._lock:
+            for group in self._sockets.values():
+                if sock in group:
+                    group.remove(sock)
+        sock.close()
+
+
+_client: BusClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> BusClient:
+    """The process-wide :class:`BusClient`, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = BusClient()
+        return _client
+
+
+def set_client(client: BusClient) -> None:
+    """Install ``client`` as the process-wide client (launchers, tests)."""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,78 @@
+"""Payload codecs for bus messages.
+
+Each message carries its codec name as a frame (see
+:mod:`services.bus.protocol`), so a receiver decodes whatever a sender
+chose and fleets with mixed codecs keep working. Publishers pick their
+codec with ``GAINS_BUS_CODEC``:
+
+* ``json`` (default) — backed by ``orjson`` when installed, stdlib
+  ``json`` otherwise. Same bytes on the wire either way, so the Tauri
+  shell and any non-Python client can read it.
+* ``msgpack`` — smaller and cheaper to encode, but only Python clients
+  with ``msgpack`` installed can read it. Use it when every consumer of a
+  topic is a Python service.
+
+Install the fast paths with ``pip install -e ".[bus-fast]"``.
+"""
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+
+class UnknownCodecError(ValueError):
+    """Raised for a codec tag this process can't decode."""
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+def _json_codec() -> Codec:
+    try:
+        import orjson
+    except ImportError:
+        return Codec(
+            "json",
+            lambda obj: json.dumps(obj, ensure_ascii=False).encode(),
+            json.loads,
+        )
+    return Codec(
+        "json",
+        lambda obj: orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+        orjson.loads,
+    )
+
+
+def _msgpack_codec() -> Codec | None:
+    try:
+        import msgpack
+    except ImportError:
+        return None
+    return Codec(
+        "msgpack",
+        lambda obj: msgpack.packb(obj, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+    )
+
+
+CODECS: dict[str, Codec] = {c.name: c for c in (_json_codec(), _msgpack_codec()) if c}
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise UnknownCodecError(
+            f"bus codec {name!r} unavailable (have: {', '.join(CODECS)})"
+        ) from None
+
+
+def default_codec() -> Codec:
+    return get_codec(os.getenv("GAINS_BUS_CODEC", "json"))
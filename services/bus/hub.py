@@ -2,35 +2,131 @@
 
 Publishers connect to tcp://*:5556 (XSUB-bound).
 Subscribers connect to tcp://*:5555 (XPUB-bound).
+Both are configurable via :class:`~services.bus.client.BusConfig`, and
+``--also-bind`` exposes the hub on a second transport — e.g. run the mesh on
+``GAINS_BUS_TRANSPORT=ipc`` and ``--also-bind tcp`` for the Tauri shell.
 
 This replaces the previous broken design where every service connected its
 PUB socket to a PUB-bound hub on 5555 (PUB→PUB transmits nothing, so the
 Tauri SUB bridge only ever saw heartbeats).
+
+Messages are ``[topic, codec, payload]`` multipart frames (see
+:mod:`services.bus.protocol`). Subscriptions received on the XPUB side are
+forwarded upstream, so publishers drop topics nobody subscribed to. The hub
+itself always subscribes to legacy single-frame JSON and re-frames it, so
+older publishers still reach topic-filtered subscribers.
+
+Older *subscribers* (``SUBSCRIBE ""`` then ``recv_json()``) would read the
+topic frame as their message. For them the hub binds a second XPUB on
+``GAINS_BUS_LEGACY_BIND`` when it is set, and re-emits every message there
+as one JSON frame. Its subscriptions are forwarded upstream as "all
+topics", since a prefix of the JSON text says nothing about the topic.
 """
 from __future__ import annotations
 
+import argparse
 import logging
 import threading
 import time
+from collections.abc import Sequence
 
 import zmq
 
-log = logging.getLogger("gains.bus")
+from services.bus.client import TRANSPORTS, BusClient, BusConfig, bind, get_client
+from services.bus.protocol import HEARTBEAT, LEGACY_PREFIX, reframe, unframe
 
-SUB_ENDPOINT = "tcp://*:5556"  # publishers connect here
-PUB_ENDPOINT = "tcp://*:5555"  # subscribers connect here
+log = logging.getLogger("gains.bus")
 
 
-def heartbeat() -> None:
-    ctx = zmq.Context.instance()
-    sock = ctx.socket(zmq.PUB)
-    sock.connect("tcp://localhost:5556")
+def heartbeat(bus: BusClient | None = None) -> None:
+    bus = bus or get_client()
     try:
         while True:
-            sock.send_json({"event": "heartbeat", "ts": time.time()})
+            bus.publish({"event": HEARTBEAT, "ts": time.time()})
             time.sleep(1)
+    except zmq.ContextTerminated:
+        bus.close()
+
+
+def _forward(
+    src: zmq.Socket, dst: zmq.Socket, legacy: bool, legacy_out: zmq.Socket | None = None
+) -> None:
+    """Move every message queued on ``src`` to ``dst`` (and ``legacy_out``) without blocking."""
+    while True:
+        try:
+            frames = src.recv_multipart(zmq.NOBLOCK)
+        except zmq.Again:
+            return
+        dst.send_multipart(reframe(frames) if legacy else frames)
+        if legacy_out is not None:
+            single = unframe(frames)
+            if single is not None:
+                legacy_out.send(single)
+
+
+def _forward_legacy_subscriptions(legacy: zmq.Socket, xsub: zmq.Socket) -> None:
+    """Turn each (un)subscription on the legacy XPUB into an upstream one for all topics."""
+    while True:
+        try:
+            frame = legacy.recv(zmq.NOBLOCK)
+        except zmq.Again:
+            return
+        if frame[:1] in (b"\x00", b"\x01"):
+            xsub.send(frame[:1])  # XSUB ref-counts, so the last unsubscribe wins
+
+
+def run_proxy(
+    xsub: zmq.Socket,
+    xpub: zmq.Socket,
+    stop: threading.Event | None = None,
+    legacy: zmq.Socket | None = None,
+) -> None:
+    """Forward XSUB→XPUB (re-framing legacy messages) and XPUB→XSUB subscriptions.
+
+    With ``legacy`` (an XPUB) every message is also sent there as one JSON frame.
+    """
+    xsub.send(b"\x01" + LEGACY_PREFIX)
+    poller = zmq.Poller()
+    poller.register(xsub, zmq.POLLIN)
+    poller.register(xpub, zmq.POLLIN)
+    if legacy is not None:
+        poller.register(legacy, zmq.POLLIN)
+    while stop is None or not stop.is_set():
+        events = dict(poller.poll(timeout=100))
+        if xsub in events:
+            _forward(xsub, xpub, legacy=True, legacy_out=legacy)
+        if xpub in events:
+            _forward(xpub, xsub, legacy=False)
+        if legacy is not None and legacy in events:
+            _forward_legacy_subscriptions(legacy, xsub)
+
+
+def serve(
+    bus: BusClient,
+    also_bind: Sequence[BusConfig] = (),
+    ready: threading.Event | None = None,
+) -> None:
+    """Bind the hub on ``bus.config`` (plus ``also_bind``) and proxy until ETERM."""
+    xsub = bus.socket(zmq.XSUB)
+    xpub = bus.socket(zmq.XPUB)
+    for cfg in (bus.config, *also_bind):
+        bind(xsub, cfg.xsub_bind)
+        bind(xpub, cfg.xpub_bind)
+        log.info("bus proxy: publishers→%s, subscribers→%s", cfg.xsub_bind, cfg.xpub_bind)
+    legacy = None
+    if bus.config.legacy_bind:
+        legacy = bus.socket(zmq.XPUB)
+        bind(legacy, bus.config.legacy_bind)
+        log.info("bus proxy: legacy JSON subscribers→%s", bus.config.legacy_bind)
+    threading.Thread(target=heartbeat, args=(bus,), daemon=True).start()
+    if ready is not None:
+        ready.set()
+    try:
+        run_proxy(xsub, xpub, legacy=legacy)
+    except zmq.ContextTerminated:
+        pass
     finally:
-        sock.close()
+        bus.close()
 
 
 def main() -> None:
@@ -38,22 +134,17 @@ def main() -> None:
         level=logging.INFO,
         format="%(asctime)s %(levelname)s %(name)s: %(message)s",
     )
-    ctx = zmq.Context.instance()
-    xsub = ctx.socket(zmq.XSUB)
-    xsub.bind(SUB_ENDPOINT)
-    xpub = ctx.socket(zmq.XPUB)
-    xpub.bind(PUB_ENDPOINT)
-
-    threading.Thread(target=heartbeat, daemon=True).start()
-    log.info("bus proxy: publishers→%s, subscribers→%s", SUB_ENDPOINT, PUB_ENDPOINT)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--also-bind", action="append", default=[], choices=TRANSPORTS,
+                        help="also expose the hub on this transport's default endpoints")
+    args = parser.parse_args()
+    bus = get_client()
     try:
-        zmq.proxy(xsub, xpub)
+        serve(bus, [BusConfig.for_transport(t) for t in args.also_bind])
     except KeyboardInterrupt:
         pass
     finally:
-        xsub.close()
-        xpub.close()
-        ctx.term()
+        bus.term()
 
 
 if __name__ == "__main__":
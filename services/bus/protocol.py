@@ -0,0 +1,123 @@
+"""Bus wire format: topic-prefixed multipart frames.
+
+Every event is sent as ``[topic, codec, payload]`` where ``topic`` is the
+event name (``msg["event"]``), ``codec`` names the payload encoding (see
+:mod:`services.bus.codec`) and ``payload`` is the encoded message. Because
+libzmq matches SUB subscriptions against the first frame, a subscriber that
+asks for ``asr.partial`` never receives — or decodes — heartbeats, and with
+the hub forwarding subscriptions upstream the publisher doesn't even send
+topics nobody wants.
+
+Compatibility: clients that still send a single JSON frame are re-framed
+by the hub (see :func:`reframe`), and :func:`decode` accepts legacy
+single frames and untagged ``[topic, json]`` pairs as well. Subscribers
+that still ``recv_json()`` connect to the hub's opt-in legacy endpoint
+(``GAINS_BUS_LEGACY_BIND``), which re-emits every message as a single
+JSON frame (see :func:`unframe`).
+"""
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+import zmq
+
+from services.bus.codec import Codec, UnknownCodecError, default_codec, get_codec
+
+log = logging.getLogger("gains.bus")
+
+# Event names from the README table.
+HEARTBEAT = "heartbeat"
+ASR_PARTIAL = "asr.partial"
+ASR_READY = "asr.ready"
+GESTURE_NOD = "gesture.nod"
+TEXT_COMMITTED = "text.committed"
+PLUGIN_REWRITE = "plugin.rewrite"
+TTS_PLAY = "tts.play"
+TTS_CANCEL = "tts.cancel"
+TTS_STATUS = "tts.status"
+PLUGINS_STATUS = "plugins.status"
+
+TOPICS = (HEARTBEAT, ASR_PARTIAL, ASR_READY, GESTURE_NOD, TEXT_COMMITTED, PLUGIN_REWRITE, TTS_PLAY,
+          TTS_CANCEL, TTS_STATUS, PLUGINS_STATUS)
+
+# First byte of a legacy single-frame JSON message.
+LEGACY_PREFIX = b"{"
+
+
+# Codec tags already warned about, so a mixed fleet doesn't flood the log.
+_warned: set[bytes] = set()
+
+
+def encode(msg: dict[str, Any], codec: Codec | None = None) -> list[bytes]:
+    codec = codec or default_codec()
+    return [str(msg.get("event", "")).encode(), codec.name.encode(), codec.dumps(msg)]
+
+
+def decode(frames: list[bytes]) -> dict[str, Any]:
+    """Decode a tagged, untagged ``[topic, json]`` or legacy single-frame message.
+
+    Raises :class:`~services.bus.codec.UnknownCodecError` for a codec this
+    process doesn't have.
+    """
+    name = frames[1].decode() if len(frames) >= 3 else "json"
+    return get_codec(name).loads(frames[-1])
+
+
+def publish(sock: zmq.Socket, msg: dict[str, Any], codec: Codec | None = None) -> None:
+    sock.send_multipart(encode(msg, codec))
+
+
+def subscribe(sock: zmq.Socket, *topics: str) -> None:
+    """Subscribe ``sock`` to ``topics`` (all topics if none are given).
+
+    Subscriptions are prefix matches on the topic frame, so ``"asr"`` also
+    matches ``asr.partial``.
+    """
+    for topic in topics or ("",):
+        sock.setsockopt(zmq.SUBSCRIBE, topic.encode())
+
+
+def try_decode(frames: list[bytes]) -> dict[str, Any] | None:
+    """:func:`decode`, returning ``None`` (with a one-time warning) for unknown codecs."""
+    try:
+        return decode(frames)
+    except UnknownCodecError as e:
+        if frames[1] not in _warned:
+            _warned.add(frames[1])
+            log.warning("skipping messages: %s", e)
+        return None
+
+
+def recv(sock: zmq.Socket, flags: int = 0) -> dict[str, Any]:
+    """Receive the next message this process can decode."""
+    while True:
+        msg = try_decode(sock.recv_multipart(flags))
+        if msg is not None:
+            return msg
+
+
+def reframe(frames: list[bytes]) -> list[bytes]:
+    """Give a legacy single-frame JSON message its topic and codec frames.
+
+    Anything else (already framed, or not a JSON object) passes through.
+    """
+    if len(frames) != 1 or not frames[0].startswith(LEGACY_PREFIX):
+        return frames
+    try:
+        msg = json.loads(frames[0])
+    except ValueError:
+        return frames
+    topic = msg.get("event", "") if isinstance(msg, dict) else ""
+    return [str(topic).encode(), b"json", frames[0]]
+
+
+def unframe(frames: list[bytes]) -> bytes | None:
+    """The single JSON frame a legacy subscriber expects; ``None`` if undecodable."""
+    if len(frames) == 1:
+        return frames[0]
+    if len(frames) >= 3 and frames[1] != b"json":
+        msg = try_decode(frames)
+        return None if msg is None else json.dumps(msg).encode()
+    return frames[-1]
@@ -0,0 +1,95 @@
+"""All-in-one launcher: bus, note exporter and plugins as threads of one process.
+
+On a single host the bus hops (publisher → hub → subscriber) don't need to
+leave the process at all. ``gains-mesh`` runs the hub, the note exporter,
+the callback plug-in host and every other plugin's ``main()`` as threads
+sharing one ZeroMQ context, wired over ``inproc://`` — no syscalls or
+loopback TCP per message.
+
+The hub also binds an external transport (``tcp`` by default, or ``ipc``),
+so ASR, vision, TTS and the Tauri shell can keep running as their own
+processes and connect exactly as they would to ``gains-bus``.
+
+Ctrl+C terminates the shared context: every thread's blocking receive
+raises ETERM, the note exporter flushes its open session and closes its
+sockets, and the process exits once all sockets are closed.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import zmq
+
+from services.bus.client import BusClient, BusConfig, set_client
+from services.bus.hub import serve
+from services.notes.exporter import DEFAULT_OUTPUT_DIR, NoteExporter
+from services.plugins.host import PluginHost, is_callback_plugin
+from services.plugins.runner import discover, load
+
+log = logging.getLogger("gains.launcher")
+
+
+def _spawn(name: str, target: Callable[..., Any], *args: Any) -> threading.Thread:
+    def run() -> None:
+        try:
+            target(*args)
+        except zmq.ContextTerminated:
+            pass
+        except Exception:
+            log.exception("%s crashed", name)
+
+    thread = threading.Thread(target=run, name=f"gains-{name}", daemon=True)
+    thread.start()
+    log.info("started %s", name)
+    return thread
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--external", choices=("tcp", "ipc"), default="tcp",
+                        help="transport the hub also binds for out-of-process services")
+    parser.add_argument("--no-plugins", action="store_true")
+    args = parser.parse_args()
+
+    bus = BusClient(BusConfig.for_transport("inproc"), shared=True)
+    set_client(bus)
+
+    ready = threading.Event()
+    _spawn("bus", serve, bus, [BusConfig.for_transport(args.external)], ready)
+    if not ready.wait(timeout=5):
+        raise SystemExit("bus failed to start")
+    _spawn("notes", lambda: NoteExporter(args.output_dir).run())
+    if not args.no_plugins:
+        host = PluginHost(bus)
+        for path in discover():
+            if is_callback_plugin(path):
+                host.add(path.parent.name, load(path))
+            else:
+                _spawn(f"plugin.{path.parent.name}", load(path).main)
+        if host.plugins:
+            _spawn("plugins", host.run)
+        else:
+            host.close()
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        log.info("shutting down")
+    finally:
+        bus.ctx.term()
+
+
+if __name__ == "__main__":
+    main()
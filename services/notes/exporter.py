@@ -4,145 +4,213 @@ Listens on the bus for ``asr.partial`` (text) + ``gesture.nod`` (commit) and
 ``plugin.rewrite`` (rewrites from plug-ins). Flushes a session to disk every
 N commits or every M seconds.
 
+``gains-notes search QUERY`` searches every exported session through the
+full-text index kept next to the exports (:mod:`services.notes.search`);
+``gains-notes reindex`` rebuilds it from the JSON exports.
+
 Bug fixes vs. previous version:
 * Interactive ``input("output dir: ")`` at startup removed — a service
   must start non-interactively. Output dir is now a CLI arg / env var.
 * Subscriber connects to the XPUB side (5555) of the bus as expected.
+* The open session only existed in memory until its flush, so a crash lost
+  up to ``TIME_FLUSH_AFTER_SEC`` of notes. Every event is now appended to a
+  write-ahead journal (:mod:`services.notes.journal`, batched fsync) before
+  it is applied, and replayed on start-up.
+* Every nod and rewrite scanned the session backwards and every commit
+  re-counted committed entries. Session state is now an indexed
+  :class:`~services.notes.session.SessionStore`, and rewrites are matched
+  to their entry by ``orig_ts`` instead of "most recent speech entry".
+* ``_flush`` rendered and wrote three files inside the receive loop, so a
+  slow disk stalled the bus. Closed sessions are now handed to a bounded
+  background :class:`~services.notes.writer.ExportWriter` (atomic
+  temp + rename writes, flush-latency histogram) together with their
+  sealed journal, which is replayed on start-up if the export never
+  finished.
+* The commit that closes a session is always rewritten by the plug-ins
+  *after* the flush, so every session lost one rewrite. A closed session
+  is now held for ``REWRITE_GRACE_SEC`` before export, and late rewrites
+  for it are applied there (and added to its sealed journal).
 """
 from __future__ import annotations
 
 import argparse
-import json
 import logging
 import os
+import sqlite3
+import sys
 import time
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-import zmq
+from services.bus.client import get_client
+from services.bus.protocol import ASR_PARTIAL, GESTURE_NOD, PLUGIN_REWRITE, TEXT_COMMITTED, recv
+from services.notes.journal import Journal, append_sealed, replay
+from services.notes.search import INDEX_NAME, NoteIndex, format_hit
+from services.notes.session import SessionStore
+from services.notes.writer import ExportJob, ExportWriter
 
 log = logging.getLogger("gains.notes")
 
 DEFAULT_OUTPUT_DIR = Path(os.getenv("GAINS_NOTES_DIR", "notes"))
 COMMIT_FLUSH_AFTER = 5
 TIME_FLUSH_AFTER_SEC = 30.0
+# How long a closed session waits for plug-in rewrites of its last commits.
+REWRITE_GRACE_SEC = 5.0
+JOURNAL_NAME = ".session.journal"
+# Journal of a closed session whose exports may not be written yet.
+SEALED_JOURNAL = ".session.{session_id}.journal"
+
+
+def apply_event(session: SessionStore, msg: dict[str, Any]) -> bool:
+    """Update ``session`` from one bus event; ``True`` if it was a commit."""
+    event = msg.get("event")
+    ts = msg["ts"]
+    if event == ASR_PARTIAL:
+        text = (msg.get("text") or "").strip()
+        if text:
+            session.add(text, ts, confidence=msg.get("confidence"),
+                        start=msg.get("start"), end=msg.get("end"))
+    elif event == PLUGIN_REWRITE:
+        if msg.get("text") is not None:
+            session.rewrite(msg["text"], msg.get("orig_ts"), msg.get("plugin"))
+    elif event in (GESTURE_NOD, TEXT_COMMITTED):
+        if not session:
+            return False
+        entry = session.commit(ts)
+        if entry is not None:
+            log.info("committed: %s", entry.text[:60])
+        return True
+    return False
+
+
+def load_journal(path: Path) -> tuple[SessionStore, float | None]:
+    """Rebuild a session from a journal; also returns the last event time."""
+    session, last_ts = SessionStore(), None
+    for msg in replay(path):
+        apply_event(session, msg)
+        last_ts = msg["ts"]
+    return session, last_ts
+
+
+@dataclass
+class ClosingSession:
+    job: ExportJob
+    deadline: float  # time.monotonic()
 
 
 class NoteExporter:
-    def __init__(self, output_dir: Path) -> None:
+    def __init__(self, output_dir: Path, *, index: bool = True) -> None:
         self.output_dir = output_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.current_session: list[dict[str, Any]] = []
-        self.session_start: float | None = None
-        self.ctx = zmq.Context.instance()
-        self.sub = self.ctx.socket(zmq.SUB)
-        self.sub.connect("tcp://localhost:5555")
-        self.sub.setsockopt_string(zmq.SUBSCRIBE, "")
+        self.writer = ExportWriter(
+            self.output_dir, index_path=self.output_dir / INDEX_NAME if index else None
+        )
+        self._last_stamp, self._same_stamp = "", 0
+        self._closing: deque[ClosingSession] = deque()
+        self._recover_sealed()
+        self.session, _ = load_journal(self.output_dir / JOURNAL_NAME)
+        if self.session:
+            log.info("resumed open session: %d entries", len(self.session))
+        self.journal = Journal(self.output_dir / JOURNAL_NAME)
+        self.bus = get_client()
+        self.sub = self.bus.subscriber(ASR_PARTIAL, PLUGIN_REWRITE, GESTURE_NOD, TEXT_COMMITTED)
         log.info("note exporter ready, output=%s", self.output_dir)
 
     def run(self) -> None:
         try:
             while True:
-                msg = self.sub.recv_json()
-                self._handle(msg)
+                if self.sub.poll(timeout=500):
+                    self._handle(recv(self.sub))
+                self._export_due()
         except KeyboardInterrupt:
             pass
         finally:
-            if self.current_session:
-                self._flush()
-            self.sub.close()
-            self.ctx.term()
+            self.close()
+
+    def close(self) -> None:
+        if self.session:
+            self._flush()
+        self._export_due(force=True)
+        self.writer.close()
+        self.journal.close()
+        self.bus.term()
+
+    def _recover_sealed(self) -> None:
+        pattern = SEALED_JOURNAL.format(session_id="*")
+        for path in sorted(self.output_dir.glob(pattern)):
+            session_id = path.name.split(".")[2]
+            session, last_ts = load_journal(path)
+            if not session:
+                path.unlink()
+                continue
+            log.info("re-exporting unfinished session %s", session_id)
+            self.writer.submit(ExportJob(session_id, session, last_ts or time.time(), path))
 
     def _handle(self, msg: dict[str, Any]) -> None:
-        event = msg.get("event")
-        ts = msg.get("ts", time.time())
-        if event == "asr.partial":
-            text = (msg.get("text") or "").strip()
-            if not text:
-                return
-            if self.session_start is None:
-                self.session_start = ts
-            self.current_session.append({
-                "type": "speech",
-                "text": text,
-                "ts": ts,
-                "confidence": msg.get("confidence"),
-                "start": msg.get("start"),
-                "end": msg.get("end"),
-            })
-        elif event == "plugin.rewrite":
-            # Replace the most-recent speech entry's text with the rewrite.
-            for entry in reversed(self.current_session):
-                if entry["type"] == "speech":
-                    entry["original"] = entry["text"]
-                    entry["text"] = msg.get("text", entry["text"])
-                    entry["rewritten_by"] = msg.get("plugin")
-                    break
-        elif event == "gesture.nod" or event == "text.committed":
-            if not self.current_session:
-                return
-            for entry in reversed(self.current_session):
-                if entry["type"] == "speech" and not entry.get("committed"):
-                    entry["committed"] = True
-                    entry["commit_ts"] = ts
-                    log.info("committed: %s", entry["text"][:60])
-                    break
-            if self._should_flush():
-                self._flush()
+        if "ts" not in msg:
+            msg = {**msg, "ts": time.time()}
+        if self._late_rewrite(msg):
+            return
+        self.journal.append(msg)
+        if apply_event(self.session, msg) and self._should_flush():
+            self._flush(grace=REWRITE_GRACE_SEC)
+
+    def _late_rewrite(self, msg: dict[str, Any]) -> bool:
+        """Apply a rewrite meant for a closed, not yet exported session."""
+        orig_ts = msg.get("orig_ts")
+        if (msg.get("event") != PLUGIN_REWRITE or orig_ts is None or msg.get("text") is None
+                or orig_ts in self.session):
+            return False
+        for closing in self._closing:
+            job = closing.job
+            if orig_ts in job.store:
+                if job.journal is not None:
+                    append_sealed(job.journal, msg)
+                job.store.rewrite(msg["text"], orig_ts, msg.get("plugin"))
+                return True
+        return False
+
+    def _export_due(self, force: bool = False) -> None:
+        now = time.monotonic()
+        while self._closing and (force or self._closing[0].deadline <= now):
+            job = self._closing.popleft().job
+            job.submitted = now  # the grace period isn't flush latency
+            self.writer.submit(job)
 
     def _should_flush(self) -> bool:
-        committed = sum(1 for e in self.current_session if e.get("committed"))
-        elapsed = (time.time() - self.session_start) if self.session_start else 0.0
-        return committed >= COMMIT_FLUSH_AFTER or elapsed > TIME_FLUSH_AFTER_SEC
+        start = self.session.start
+        elapsed = (time.time() - start) if start else 0.0
+        return self.session.committed >= COMMIT_FLUSH_AFTER or elapsed > TIME_FLUSH_AFTER_SEC
 
-    def _flush(self) -> None:
-        if not self.current_session:
-            return
+    def _session_id(self) -> str:
         stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        session = {
-            "session_id": stamp,
-            "start_time": self.session_start,
-            "end_time": time.time(),
-            "entries": self.current_session,
-            "total_entries": len(self.current_session),
-            "committed_entries": sum(1 for e in self.current_session if e.get("committed")),
-        }
-        self._write_txt(session, self.output_dir / f"gains_notes_{stamp}.txt")
-        self._write_md(session, self.output_dir / f"gains_notes_{stamp}.md")
-        self._write_json(session, self.output_dir / f"gains_notes_{stamp}.json")
-        log.info("flushed session: %d committed / %d total",
-                 session["committed_entries"], session["total_entries"])
-        self.current_session = []
-        self.session_start = None
-
-    @staticmethod
-    def _write_txt(session: dict[str, Any], path: Path) -> None:
-        with path.open("w", encoding="utf-8") as f:
-            f.write(f"GAINS Notes — Session {session['session_id']}\n")
-            f.write(f"Generated: {datetime.now().isoformat()}\n")
-            f.write("=" * 50 + "\n\n")
-            for entry in session["entries"]:
-                if entry.get("committed"):
-                    f.write(f"{entry['text']}\n\n")
-
-    @staticmethod
-    def _write_md(session: dict[str, Any], path: Path) -> None:
-        with path.open("w", encoding="utf-8") as f:
-            f.write(f"# GAINS Notes — Session {session['session_id']}\n\n")
-            f.write(f"**Generated:** {datetime.now().isoformat()}\n")
-            duration = (session["end_time"] - (session["start_time"] or session["end_time"]))
-            f.write(f"**Duration:** {duration:.1f}s\n")
-            f.write(f"**Entries:** {session['committed_entries']}/{session['total_entries']}\n\n")
-            f.write("---\n\n")
-            for entry in session["entries"]:
-                if entry.get("committed"):
-                    f.write(f"{entry['text']}\n\n")
-
-    @staticmethod
-    def _write_json(session: dict[str, Any], path: Path) -> None:
-        with path.open("w", encoding="utf-8") as f:
-            json.dump(session, f, indent=2, ensure_ascii=False)
+        if stamp != self._last_stamp:
+            self._last_stamp, self._same_stamp = stamp, 1
+            return stamp
+        # Two sessions closed within one second: keep both.
+        self._same_stamp += 1
+        return f"{stamp}_{self._same_stamp}"
+
+    def _flush(self, grace: float = 0.0) -> None:
+        """Close the session: seal its journal and queue it for export (O(1)).
+
+        With ``grace`` the export waits that long for late plug-in rewrites.
+        """
+        if not self.session:
+            return
+        session_id = self._session_id()
+        sealed = self.output_dir / SEALED_JOURNAL.format(session_id=session_id)
+        self.journal.rotate(sealed)
+        job = ExportJob(session_id, self.session, time.time(), sealed)
+        self.session = SessionStore()
+        if grace > 0:
+            self._closing.append(ClosingSession(job, time.monotonic() + grace))
+        else:
+            self._export_due(force=True)  # keep sessions in order
+            self.writer.submit(job)
 
 
 def main() -> None:
@@ -152,8 +220,42 @@ def main() -> None:
     )
     parser = argparse.ArgumentParser()
     parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--no-index", action="store_true",
+                        help="don't add flushed sessions to the search index")
+    cmds = parser.add_subparsers(dest="cmd")
+    p_search = cmds.add_parser("search", help="full-text search over exported notes")
+    p_search.add_argument("query", nargs="+")
+    p_search.add_argument("--limit", type=int, default=20)
+    p_search.add_argument("--all", action="store_true", help="include uncommitted speech")
+    p_search.add_argument("--raw", action="store_true", help="query is FTS5 syntax")
+    cmds.add_parser("reindex", help="rebuild the search index from the JSON exports")
     args = parser.parse_args()
-    NoteExporter(args.output_dir).run()
+
+    if args.cmd is None:
+        NoteExporter(args.output_dir, index=not args.no_index).run()
+        return
+    index = NoteIndex(args.output_dir / INDEX_NAME)
+    try:
+        if args.cmd == "reindex":
+            started = time.perf_counter()
+            sessions, entries = index.reindex(args.output_dir)
+            log.info("indexed %d sessions / %d entries in %.2fs",
+                     sessions, entries, time.perf_counter() - started)
+        else:
+            started = time.perf_counter()
+            try:
+                hits = index.search(" ".join(args.query), limit=args.limit,
+                                    committed_only=not args.all, raw=args.raw)
+            except sqlite3.OperationalError as e:
+                if not args.raw:
+                    raise
+                raise SystemExit(f"invalid FTS5 query: {e}") from None
+            for hit in hits:
+                print(format_hit(hit))
+            print(f"{len(hits)} hit(s) in {(time.perf_counter() - started) * 1000:.1f} ms",
+                  file=sys.stderr)
+    finally:
+        index.close()
 
 
 if __name__ == "__main__":
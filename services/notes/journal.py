@@ -0,0 +1,127 @@
+"""Append-only write-ahead journal for the note exporter.
+
+Every event the exporter acts on is appended as one JSON line before it is
+applied, so the open session survives a crash: on restart the exporter
+replays the journal and carries on where it stopped. Each append is
+flushed to the OS immediately (a process crash loses nothing); ``fsync``
+is batched on a background thread — every ``fsync_every`` records or
+``fsync_interval_sec``, whichever comes first — so power loss costs at
+most that window and the bus loop never waits on the disk.
+
+Appends are O(1) regardless of session length. When a session closes the
+journal is rotated to a sealed file that the export writer
+(:mod:`services.notes.writer`) deletes once the session's exports are on
+disk.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from services.bus.codec import get_codec
+
+log = logging.getLogger("gains.notes.journal")
+
+_JSON = get_codec("json")
+
+
+def replay(path: Path) -> Iterator[dict[str, Any]]:
+    """Records of a journal file, skipping a torn final line."""
+    if not path.exists():
+        return
+    with path.open("rb") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield _JSON.loads(line)
+            except ValueError:
+                log.warning("%s:%d: skipping unreadable journal record", path, lineno)
+
+
+def append_sealed(path: Path, record: dict[str, Any]) -> None:
+    """Add a record to a sealed journal (not fsynced; its consumer does that)."""
+    with path.open("ab") as f:
+        f.write(_JSON.dumps(record) + b"\n")
+
+
+class Journal:
+    def __init__(self, path: Path, *, fsync_every: int = 32,
+                 fsync_interval_sec: float = 1.0) -> None:
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval_sec = fsync_interval_sec
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._drop_torn_tail()
+        self._f = self.path.open("ab")
+        self._lock = threading.Lock()  # file object + counter
+        self._unsynced = 0
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._syncer = threading.Thread(target=self._sync_loop, name="gains-notes-fsync",
+                                        daemon=True)
+        self._syncer.start()
+
+    def _drop_torn_tail(self) -> None:
+        # A crash mid-write leaves a partial last line; appending after it
+        # would corrupt the next record too.
+        if not self.path.exists():
+            return
+        data = self.path.read_bytes()
+        if data and not data.endswith(b"\n"):
+            with self.path.open("r+b") as f:
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def append(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            self._f.write(_JSON.dumps(record) + b"\n")
+            self._f.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every:
+                self._wake.set()
+
+    def sync(self) -> None:
+        with self._lock:
+            if not self._unsynced or self._f.closed:
+                return
+            self._unsynced = 0
+            # A private descriptor: rotate() may close the file meanwhile, and
+            # neither it nor append() waits for a slow fsync.
+            fd = os.dup(self._f.fileno())
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def rotate(self, sealed: Path) -> None:
+        """Move the current records to ``sealed`` and start an empty journal.
+
+        ``sealed`` is not fsynced here; whoever consumes it does that off
+        the receive loop.
+        """
+        with self._lock:
+            self._f.close()
+            os.replace(self.path, sealed)
+            self._f = self.path.open("ab")
+            self._unsynced = 0
+
+    def close(self) -> None:
+        self._closed.set()
+        self._wake.set()
+        self._syncer.join()
+        self.sync()
+        with self._lock:
+            self._f.close()
+
+    def _sync_loop(self) -> None:
+        while not self._closed.is_set():
+            self._wake.wait(self.fsync_interval_sec)
+            self._wake.clear()
+            try:
+                self.sync()
+            except OSError:
+                log.exception("journal fsync failed")
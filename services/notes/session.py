@@ -0,0 +1,128 @@
+"""In-memory note session with O(1) commit, rewrite and flush checks.
+
+The exporter used to keep a list of entry dicts and scan it backwards for
+every nod and every rewrite, and re-count committed entries on every
+commit — quadratic over a long dictation. :class:`SessionStore` keeps:
+
+* a stack of uncommitted entries, so a commit takes the most recent one;
+* a running committed counter;
+* a dict from timestamps to entries, so a ``plugin.rewrite`` lands on the
+  entry its ``orig_ts`` names (the ``text.committed`` / speech ``ts`` the
+  plug-in answered) rather than whichever entry happens to be newest.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+log = logging.getLogger("gains.notes.session")
+
+
+@dataclass(slots=True)
+class Entry:
+    text: str
+    ts: float
+    confidence: float | None = None
+    start: float | None = None
+    end: float | None = None
+    committed: bool = False
+    commit_ts: float | None = None
+    original: str | None = None
+    rewritten_by: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """The export / JSON representation (same keys as before the store)."""
+        d: dict[str, Any] = {
+            "type": "speech",
+            "text": self.text,
+            "ts": self.ts,
+            "confidence": self.confidence,
+            "start": self.start,
+            "end": self.end,
+        }
+        if self.original is not None:
+            d["original"] = self.original
+            d["rewritten_by"] = self.rewritten_by
+        if self.committed:
+            d["committed"] = True
+            d["commit_ts"] = self.commit_ts
+        return d
+
+
+class SessionStore:
+    def __init__(self) -> None:
+        self.entries: list[Entry] = []
+        self.start: float | None = None
+        self.committed = 0
+        self._pending: list[Entry] = []
+        self._by_ts: dict[float, Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __bool__(self) -> bool:
+        return bool(self.entries)
+
+    def __contains__(self, ts: float) -> bool:
+        """Whether a rewrite with this ``orig_ts`` has an entry to land on."""
+        return ts in self._by_ts
+
+    def add(self, text: str, ts: float, *, confidence: float | None = None,
+            start: float | None = None, end: float | None = None) -> Entry:
+        entry = Entry(text, ts, confidence, start, end)
+        if self.start is None:
+            self.start = ts
+        self.entries.append(entry)
+        self._pending.append(entry)
+        self._by_ts[ts] = entry
+        return entry
+
+    def commit(self, ts: float) -> Entry | None:
+        """Commit the most recent uncommitted entry at ``ts``."""
+        if not self._pending:
+            return None
+        entry = self._pending.pop()
+        entry.committed = True
+        entry.commit_ts = ts
+        self.committed += 1
+        self._by_ts.setdefault(ts, entry)
+        return entry
+
+    def rewrite(self, text: str, orig_ts: float | None, plugin: str | None) -> Entry | None:
+        """Apply a plug-in rewrite to the entry ``orig_ts`` refers to.
+
+        Rewrites without an ``orig_ts`` (older plug-ins) go to the newest
+        entry. One whose ``orig_ts`` isn't in this session is dropped rather
+        than applied to an unrelated sentence (the exporter first routes
+        answers to a just-closed session there; see
+        :data:`~services.notes.exporter.REWRITE_GRACE_SEC`).
+        """
+        if orig_ts is None:
+            if not self.entries:
+                return None
+            entry = self.entries[-1]
+        else:
+            entry = self._by_ts.get(orig_ts)
+            if entry is None:
+                log.info("dropping %s rewrite for unknown orig_ts %s", plugin, orig_ts)
+                return None
+        if entry.original is None:
+            entry.original = entry.text
+        entry.text = text
+        entry.rewritten_by = plugin
+        return entry
+
+    def to_dicts(self) -> list[dict[str, Any]]:
+        return [e.to_dict() for e in self.entries]
+
+    def to_export(self, session_id: str, end_time: float) -> dict[str, Any]:
+        """The session document written to ``gains_notes_<id>.json``."""
+        return {
+            "session_id": session_id,
+            "start_time": self.start,
+            "end_time": end_time,
+            "entries": self.to_dicts(),
+            "total_entries": len(self.entries),
+            "committed_entries": self.committed,
+        }
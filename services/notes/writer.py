@@ -0,0 +1,188 @@
+"""Background export writer for the note exporter.
+
+Rendering and writing a session's txt/md/json used to happen inline in the
+bus receive loop, so a slow disk (or a network home directory) backed
+messages up behind the SUB socket's HWM. :class:`ExportWriter` takes
+finished sessions off the loop: the exporter hands over the
+:class:`~services.notes.session.SessionStore` object (O(1)) and a bounded
+queue feeds one writer thread.
+
+Every file is written atomically (temp file, fsync, ``os.replace``), so a
+reader or a crash never sees a half-written export. Once all three files
+are in place the session's sealed journal is deleted; until then it is
+the recovery copy. Hand-off → durable latency goes into a
+:class:`LatencyHistogram` that is logged on shutdown. With an
+``index_path`` the writer also adds each session to the full-text index
+(:mod:`services.notes.search`).
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from services.notes.search import NoteIndex
+from services.notes.session import SessionStore
+
+log = logging.getLogger("gains.notes.writer")
+
+
+def render_txt(session: dict[str, Any]) -> str:
+    lines = [
+        f"GAINS Notes — Session {session['session_id']}\n",
+        f"Generated: {datetime.now().isoformat()}\n",
+        "=" * 50 + "\n\n",
+    ]
+    lines.extend(f"{e['text']}\n\n" for e in session["entries"] if e.get("committed"))
+    return "".join(lines)
+
+
+def render_md(session: dict[str, Any]) -> str:
+    duration = session["end_time"] - (session["start_time"] or session["end_time"])
+    lines = [
+        f"# GAINS Notes — Session {session['session_id']}\n\n",
+        f"**Generated:** {datetime.now().isoformat()}\n",
+        f"**Duration:** {duration:.1f}s\n",
+        f"**Entries:** {session['committed_entries']}/{session['total_entries']}\n\n",
+        "---\n\n",
+    ]
+    lines.extend(f"{e['text']}\n\n" for e in session["entries"] if e.get("committed"))
+    return "".join(lines)
+
+
+def render_json(session: dict[str, Any]) -> str:
+    return json.dumps(session, indent=2, ensure_ascii=False)
+
+
+def atomic_write(path: Path, data: str) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def write_session(session: dict[str, Any], output_dir: Path) -> list[Path]:
+    base = output_dir / f"gains_notes_{session['session_id']}"
+    paths = []
+    for suffix, render in ((".txt", render_txt), (".md", render_md), (".json", render_json)):
+        path = base.with_suffix(suffix)
+        atomic_write(path, render(session))
+        paths.append(path)
+    return paths
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets (ms); percentiles report the bucket's upper bound."""
+
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.total = 0
+        self.max_ms = 0.0
+
+    def record(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.total += 1
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        if not self.total:
+            return 0.0
+        rank, seen = q * self.total, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return float(self.BOUNDS_MS[i]) if i < len(self.BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def summary(self) -> str:
+        return (f"n={self.total} p50≤{self.percentile(0.5):.0f}ms "
+                f"p95≤{self.percentile(0.95):.0f}ms max={self.max_ms:.1f}ms")
+
+
+@dataclass
+class ExportJob:
+    session_id: str
+    store: SessionStore
+    end_time: float
+    journal: Path | None = None
+    submitted: float = field(default_factory=time.monotonic)
+
+
+class ExportWriter:
+    def __init__(self, output_dir: Path, *, max_pending: int = 8,
+                 index_path: Path | None = None) -> None:
+        self.output_dir = output_dir
+        self.index_path = index_path
+        self.latency = LatencyHistogram()
+        self._queue: queue.Queue[ExportJob | None] = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="gains-notes-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, job: ExportJob) -> None:
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            # Never drop notes: block the receive loop rather than lose a session.
+            log.warning("export queue full (%d pending), waiting for the writer",
+                        self._queue.maxsize)
+            self._queue.put(job)
+
+    def close(self, timeout: float | None = 30.0) -> None:
+        """Write everything queued, then stop the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self.latency.total:
+            log.info("export latency: %s", self.latency.summary())
+
+    def _run(self) -> None:
+        index = self._open_index()  # SQLite connections stay on their thread
+        while (job := self._queue.get()) is not None:
+            try:
+                self._write(job, index)
+            except Exception:
+                log.exception("writing session %s failed; journal kept for recovery",
+                              job.session_id)
+        if index is not None:
+            index.close()
+
+    def _open_index(self) -> NoteIndex | None:
+        if self.index_path is None:
+            return None
+        try:
+            return NoteIndex(self.index_path)
+        except sqlite3.Error:
+            log.exception("cannot open search index %s; exporting without it", self.index_path)
+            return None
+
+    def _write(self, job: ExportJob, index: NoteIndex | None = None) -> None:
+        if job.journal is not None:
+            # Make the recovery copy durable before depending on it.
+            with job.journal.open("rb") as f:
+                os.fsync(f.fileno())
+        session = job.store.to_export(job.session_id, job.end_time)
+        write_session(session, self.output_dir)
+        if index is not None:
+            try:
+                index.add_session(session)
+            except sqlite3.Error:
+                log.exception("indexing session %s failed (gains-notes reindex repairs it)",
+                              job.session_id)
+        if job.journal is not None:
+            job.journal.unlink(missing_ok=True)
+        self.latency.record(time.monotonic() - job.submitted)
+        log.info("flushed session %s: %d committed / %d total",
+                 job.session_id, session["committed_entries"], session["total_entries"])
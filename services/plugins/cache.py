@@ -0,0 +1,242 @@
+"""Content-addressed rewrite cache shared by plug-ins.
+
+People repeat themselves ("new paragraph", "todo call Bob"), and an LLM
+plug-in would otherwise pay a full round trip for every repeat. Entries
+are keyed by a SHA-256 of ``(plugin, model, prompt, text)``, so changing
+any of the four misses instead of serving a stale answer.
+
+Two tiers:
+
+* an in-memory LRU (``memory_items``) answering repeats in microseconds;
+* an SQLite file shared across restarts and plug-ins, evicted by age
+  (``ttl_sec``) and by size (``max_entries``, least recently used first).
+
+Disk hits are promoted into memory. Memory hits are batched and written
+to the disk rows' ``accessed`` time before every prune, so the phrases
+repeated most — which never leave the memory tier — are evicted last.
+:class:`CacheStats` counts memory hits, disk hits, misses and evictions.
+
+==================================  =========================================  ===================
+Variable                            Default                                    Meaning
+==================================  =========================================  ===================
+``GAINS_PLUGIN_CACHE``              ``$XDG_CACHE_HOME/gains/rewrites.sqlite``  file, or ``memory``
+``GAINS_PLUGIN_CACHE_TTL_DAYS``     ``30``                                     disk entry lifetime
+``GAINS_PLUGIN_CACHE_MAX_ENTRIES``  ``100000``                                 disk size bound
+==================================  =========================================  ===================
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+log = logging.getLogger("gains.plugins.cache")
+
+
+def default_path() -> Path | None:
+    """Disk tier location from ``GAINS_PLUGIN_CACHE``; ``None`` for memory only."""
+    value = os.getenv("GAINS_PLUGIN_CACHE")
+    if value == "memory":
+        return None
+    if value:
+        return Path(value).expanduser()
+    base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "gains" / "rewrites.sqlite"
+
+
+TTL_SEC = float(os.getenv("GAINS_PLUGIN_CACHE_TTL_DAYS", "30")) * 86400
+MAX_ENTRIES = int(os.getenv("GAINS_PLUGIN_CACHE_MAX_ENTRIES", "100000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rewrites (
+    key      TEXT PRIMARY KEY,
+    value    TEXT NOT NULL,
+    created  REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rewrites_accessed ON rewrites(accessed);
+"""
+
+
+def cache_key(plugin: str, model: str, prompt: str, text: str) -> str:
+    # JSON keeps the fields unambiguous (no separator can be forged by the text).
+    raw = json.dumps([plugin, model, prompt, text], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evicted: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.memory_hits + self.disk_hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.memory_hits + self.disk_hits) / self.lookups if self.lookups else 0.0
+
+    def summary(self) -> str:
+        return (f"lookups={self.lookups} hit_rate={self.hit_rate:.0%} "
+                f"(memory={self.memory_hits} disk={self.disk_hits}) misses={self.misses} "
+                f"stores={self.stores} evicted={self.evicted}")
+
+
+class RewriteCache:
+    """Memory LRU in front of an optional SQLite tier. Thread-safe."""
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        *,
+        memory_items: int = 1024,
+        ttl_sec: float = TTL_SEC,
+        max_entries: int = MAX_ENTRIES,
+        prune_every: int = 256,
+    ) -> None:
+        self.path = path
+        self.memory_items = memory_items
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self.stats = CacheStats()
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()  # key → (value, created)
+        self._lock = threading.Lock()
+        self._since_prune = 0
+        self._touched: dict[str, float] = {}  # memory hits not yet on disk: key → accessed
+        self.db: sqlite3.Connection | None = None
+        if path is not None:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self.db = sqlite3.connect(path, check_same_thread=False)
+                self.db.execute("PRAGMA journal_mode=WAL")
+                self.db.execute("PRAGMA synchronous=NORMAL")
+                self.db.executescript(SCHEMA)
+            except (OSError, sqlite3.Error):
+                log.exception("cannot open rewrite cache %s; caching in memory only", path)
+                self.db = None
+            else:
+                self.prune()
+
+    def close(self) -> None:
+        with self._lock:
+            if self.db is not None:
+                self._write_touched()
+                self.db.close()
+                self.db = None
+
+    def get(self, plugin: str, model: str, prompt: str, text: str) -> str | None:
+        key = cache_key(plugin, model, prompt, text)
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and cached[1] >= time.time() - self.ttl_sec:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                if self.db is not None:
+                    self._touched[key] = time.time()
+                    if len(self._touched) >= self.prune_every:
+                        self._write_touched()
+                return cached[0]
+            row = self._disk_get(key)
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self.stats.disk_hits += 1
+            self._remember(key, *row)
+            return row[0]
+
+    def put(self, plugin: str, model: str, prompt: str, text: str, value: str) -> None:
+        key = cache_key(plugin, model, prompt, text)
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self.stats.stores += 1
+            if self.db is None:
+                return
+            try:
+                with self.db:
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO rewrites(key, value, created, accessed) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, value, now, now),
+                    )
+            except sqlite3.Error:
+                log.exception("rewrite cache write failed")
+                return
+            self._since_prune += 1
+            if self._since_prune >= self.prune_every:
+                self._prune_locked(now)
+
+    def prune(self) -> int:
+        """Drop expired entries and trim the disk tier to ``max_entries``."""
+        with self._lock:
+            return self._prune_locked(time.time())
+
+    def _remember(self, key: str, value: str, created: float) -> None:
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> tuple[str, float] | None:
+        if self.db is None:
+            return None
+        now = time.time()
+        try:
+            row = self.db.execute(
+                "SELECT value, created FROM rewrites WHERE key = ? AND created >= ?",
+                (key, now - self.ttl_sec),
+            ).fetchone()
+            if row is not None:
+                with self.db:
+                    self.db.execute("UPDATE rewrites SET accessed = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            log.exception("rewrite cache read failed")
+            return None
+        return (row[0], row[1]) if row is not None else None
+
+    def _write_touched(self) -> None:
+        """Record batched memory hits as disk accesses."""
+        if not self._touched or self.db is None:
+            return
+        touched, self._touched = self._touched, {}
+        try:
+            with self.db:
+                self.db.executemany(
+                    "UPDATE rewrites SET accessed = max(accessed, ?) WHERE key = ?",
+                    [(accessed, key) for key, accessed in touched.items()],
+                )
+        except sqlite3.Error:
+            log.exception("rewrite cache access update failed")
+
+    def _prune_locked(self, now: float) -> int:
+        self._since_prune = 0
+        if self.db is None:
+            return 0
+        self._write_touched()
+        try:
+            with self.db:
+                expired = self.db.execute(
+                    "DELETE FROM rewrites WHERE created < ?", (now - self.ttl_sec,)
+                ).rowcount
+                over = self.db.execute(
+                    "DELETE FROM rewrites WHERE key IN (SELECT key FROM rewrites "
+                    "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+        except sqlite3.Error:
+            log.exception("rewrite cache prune failed")
+            return 0
+        self.stats.evicted += expired + over
+        return expired + over
@@ -0,0 +1,34 @@
+"""Plug-in liveness beats for the supervisor.
+
+A plug-in opts into liveness checking by publishing a ``heartbeat`` event
+with ``source: "plugin.<name>"`` every ``GAINS_PLUGIN_HEARTBEAT_SEC``
+(default 5). Once the supervisor (:mod:`services.plugins.supervisor`) has
+seen one, it restarts the plug-in when the beats stop. Beat from the loop
+that does the work — an asyncio task next to the request handlers, not a
+side thread — so a wedged loop also stops beating.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections.abc import Callable
+from typing import Any
+
+from services.bus.protocol import HEARTBEAT
+
+HEARTBEAT_SEC = float(os.getenv("GAINS_PLUGIN_HEARTBEAT_SEC", "5"))
+SOURCE_PREFIX = "plugin."
+
+
+def heartbeat(name: str) -> dict[str, Any]:
+    return {"event": HEARTBEAT, "source": SOURCE_PREFIX + name, "pid": os.getpid(),
+            "ts": time.time()}
+
+
+async def beat(publish: Callable[[dict[str, Any]], None], name: str,
+               interval: float = HEARTBEAT_SEC) -> None:
+    """Publish a heartbeat every ``interval`` seconds until cancelled."""
+    while True:
+        publish(heartbeat(name))
+        await asyncio.sleep(interval)
@@ -0,0 +1,185 @@
+"""In-process plug-in host: one subscription, one decode, a worker pool.
+
+A ``main()``-style plug-in is its own interpreter with its own zmq
+context and SUB socket, so every plug-in pays start-up, tens of MB of RSS
+and a full decode of each message it receives. Plug-ins that only map
+events to events can instead define a callback and share one process::
+
+    TOPICS = (TEXT_COMMITTED,)          # optional; this is the default
+
+    def on_event(msg: dict) -> list[dict] | None:
+        ...
+
+:class:`PluginHost` subscribes once to the union of every hosted
+plug-in's ``TOPICS``, decodes each message once, and fans it out to the
+plug-ins on a thread pool (``GAINS_PLUGIN_WORKERS``, default 4). The
+message dict is shared between plug-ins and must be treated as read-only.
+Returned events are published by one publisher thread, with ``plugin``
+and ``ts`` filled in when missing. A callback that raises is logged and
+counted; the other plug-ins keep running.
+
+The runner (:mod:`services.plugins.runner`) hosts every plug-in whose
+``plugin.py`` defines a top-level ``on_event`` and spawns the rest as
+subprocesses, as before. To run callback plug-ins on their own::
+
+    python -m services.plugins.host [name ...]
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import logging
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import zmq
+
+from services.bus.client import BusClient, get_client
+from services.bus.protocol import TEXT_COMMITTED, recv
+
+log = logging.getLogger("gains.plugins.host")
+
+DEFAULT_TOPICS = (TEXT_COMMITTED,)
+WORKERS = int(os.getenv("GAINS_PLUGIN_WORKERS", "4"))
+
+
+def is_callback_plugin(path: Path) -> bool:
+    """Whether ``plugin.py`` defines a top-level ``on_event`` (checked without importing it)."""
+    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    return any(
+        isinstance(node, ast.FunctionDef) and node.name == "on_event" for node in tree.body
+    )
+
+
+@dataclass
+class HostedPlugin:
+    name: str
+    on_event: Callable[[dict[str, Any]], list[dict[str, Any]] | None]
+    topics: tuple[str, ...]
+    calls: int = 0
+    errors: int = 0
+    busy_sec: float = 0.0
+
+    def summary(self) -> str:
+        mean_ms = self.busy_sec / self.calls * 1000 if self.calls else 0.0
+        return f"{self.name}: calls={self.calls} errors={self.errors} mean={mean_ms:.2f}ms"
+
+
+class PluginHost:
+    def __init__(self, bus: BusClient, *, workers: int = WORKERS) -> None:
+        self.bus = bus
+        self.plugins: list[HostedPlugin] = []
+        self._routes: dict[str, list[HostedPlugin]] = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gains-plugin")
+        self._stats_lock = threading.Lock()
+        # Pool threads hand events to one publisher thread, so the host owns
+        # a single PUB socket instead of one per worker.
+        self._out: queue.SimpleQueue[dict[str, Any] | None] = queue.SimpleQueue()
+        self._publisher = threading.Thread(target=self._publish_loop,
+                                           name="gains-plugin-publish", daemon=True)
+        self._publisher.start()
+
+    def add(self, name: str, module: ModuleType) -> HostedPlugin:
+        plugin = HostedPlugin(name, module.on_event,
+                              tuple(getattr(module, "TOPICS", DEFAULT_TOPICS)))
+        self.plugins.append(plugin)
+        for topic in plugin.topics:
+            self._routes.setdefault(topic, []).append(plugin)
+        log.info("hosting plugin %s on %s", name, ", ".join(plugin.topics))
+        return plugin
+
+    @property
+    def topics(self) -> tuple[str, ...]:
+        return tuple(sorted(self._routes))
+
+    def dispatch(self, msg: dict[str, Any]) -> list[Future[None]]:
+        return [
+            self._pool.submit(self._call, plugin, msg)
+            for plugin in self._routes.get(msg.get("event", ""), ())
+        ]
+
+    def run(self) -> None:
+        """Receive and dispatch until the context terminates or Ctrl+C."""
+        sub = self.bus.subscriber(*self.topics)
+        try:
+            while True:
+                self.dispatch(recv(sub))
+        except (zmq.ContextTerminated, KeyboardInterrupt):
+            pass
+        finally:
+            sub.close()
+            self.close()
+
+    def close(self) -> None:
+        """Finish queued callbacks, publish their events and stop the threads."""
+        self._pool.shutdown(wait=True)
+        if self._publisher.is_alive():
+            self._out.put(None)
+            self._publisher.join(timeout=5)
+        for plugin in self.plugins:
+            log.info("plugin %s", plugin.summary())
+
+    def _call(self, plugin: HostedPlugin, msg: dict[str, Any]) -> None:
+        start = time.perf_counter()
+        try:
+            events = plugin.on_event(msg) or []
+        except Exception:
+            log.exception("plugin %s failed on %s", plugin.name, msg.get("event"))
+            events, failed = [], True
+        else:
+            failed = False
+        with self._stats_lock:
+            plugin.calls += 1
+            plugin.errors += failed
+            plugin.busy_sec += time.perf_counter() - start
+        for event in events:
+            event.setdefault("plugin", plugin.name)
+            event.setdefault("ts", time.time())
+            self._out.put(event)
+
+    def _publish_loop(self) -> None:
+        try:
+            # Connect up front: a PUB created on the first event would drop it
+            # while the hub's subscriptions are still in flight.
+            self.bus.publisher()
+            while (event := self._out.get()) is not None:
+                self.bus.publish(event)
+        except zmq.ContextTerminated:
+            pass
+        finally:
+            self.bus.close()
+
+
+def main() -> None:
+    from services.plugins.runner import discover, load
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    parser = argparse.ArgumentParser(description="Host callback plug-ins in this process.")
+    parser.add_argument("names", nargs="*", help="plug-in names (default: every callback plug-in)")
+    args = parser.parse_args()
+
+    host = PluginHost(get_client())
+    for path in discover():
+        name = path.parent.name
+        if (not args.names or name in args.names) and is_callback_plugin(path):
+            host.add(name, load(path))
+    if not host.plugins:
+        host.close()
+        raise SystemExit("no callback plug-ins to host")
+    host.run()
+    get_client().term()
+
+
+if __name__ == "__main__":
+    main()
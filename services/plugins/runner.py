@@ -4,19 +4,37 @@ Previous version imported plugin modules in-process, but every plugin's
 ``plugin.py`` contains an infinite ``while True: sub.recv_json()`` loop, so
 the import blocked forever on the first plugin. Now each plugin runs in its
 own process and the runner manages their lifecycles.
+
+Plug-ins that define a top-level ``on_event`` callback instead of
+``main()`` are imported into the runner and share one subscription and
+worker pool (:mod:`services.plugins.host`). Subprocess plug-ins are
+restarted with backoff, health-checked and resource-limited by
+:mod:`services.plugins.supervisor`; the runner publishes its
+``plugins.status`` event.
 """
 from __future__ import annotations
 
+import importlib.util
 import logging
+import os
 import signal
-import subprocess
 import sys
+import threading
 import time
 from pathlib import Path
+from types import ModuleType
+
+import zmq
+
+from services.bus.client import BusClient, set_client
+from services.bus.protocol import HEARTBEAT
+from services.plugins.host import PluginHost, is_callback_plugin
+from services.plugins.supervisor import STATUS_SEC, Supervisor
 
 log = logging.getLogger("gains.plugins")
 
-PLUGINS_DIR = Path(__file__).resolve().parents[2] / "plugins"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PLUGINS_DIR = REPO_ROOT / "plugins"
 
 
 def discover() -> list[Path]:
@@ -29,6 +47,18 @@ def discover() -> list[Path]:
     )
 
 
+def load(path: Path) -> ModuleType:
+    """Import ``plugins/<name>/plugin.py`` as ``plugins.<name>.plugin``."""
+    name = f"plugins.{path.parent.name}.plugin"
+    spec = importlib.util.spec_from_file_location(name, path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"cannot load plugin from {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
 def main() -> None:
     logging.basicConfig(
         level=logging.INFO,
@@ -39,35 +69,61 @@ def main() -> None:
         log.warning("no plugins found under %s", PLUGINS_DIR)
         return
 
-    procs: list[tuple[str, subprocess.Popen]] = []
-    for path in plugins:
-        name = path.parent.name
-        log.info("starting plugin %s", name)
-        procs.append((name, subprocess.Popen([sys.executable, str(path)])))
+    # Plugins import ``services.bus`` helpers; make them resolvable from a
+    # source checkout as well as an installed package.
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+
+    # Shared: the host and heartbeat threads close their own sockets on ETERM.
+    bus = BusClient(shared=True)
+    set_client(bus)
+
+    hosted = [p for p in plugins if is_callback_plugin(p)]
+    host = None
+    if hosted:
+        host = PluginHost(bus)
+        for path in hosted:
+            host.add(path.parent.name, load(path))
+        threading.Thread(target=host.run, name="gains-plugin-host", daemon=True).start()
+
+    supervisor = Supervisor([p for p in plugins if p not in hosted], env=env)
+    supervisor.start_all()
+    threading.Thread(target=_watch_heartbeats, args=(bus, supervisor),
+                     name="gains-plugin-heartbeats", daemon=True).start()
 
     def shutdown(*_args: object) -> None:
-        for name, p in procs:
-            log.info("stopping plugin %s", name)
-            p.terminate()
-        for name, p in procs:
-            try:
-                p.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                log.warning("plugin %s did not exit cleanly, killing", name)
-                p.kill()
+        supervisor.stop_all()
+        bus.close()
+        bus.ctx.term()  # stops the host (draining its workers) and the heartbeat watcher
         sys.exit(0)
 
     signal.signal(signal.SIGINT, shutdown)
     signal.signal(signal.SIGTERM, shutdown)
+    next_status = 0.0
     try:
         while True:
             time.sleep(1)
-            for name, p in procs:
-                if p.poll() is not None:
-                    log.warning("plugin %s exited with code %s", name, p.returncode)
+            supervisor.tick()
+            if time.monotonic() >= next_status:
+                status = supervisor.status()
+                if host is not None:
+                    status["hosted"] = [
+                        {"name": p.name, "calls": p.calls, "errors": p.errors}
+                        for p in host.plugins
+                    ]
+                bus.publish(status)
+                next_status = time.monotonic() + STATUS_SEC
     except KeyboardInterrupt:
         shutdown()
 
 
+def _watch_heartbeats(bus: BusClient, supervisor: Supervisor) -> None:
+    try:
+        for msg in bus.listen(HEARTBEAT):
+            supervisor.observe(msg)
+    except zmq.ContextTerminated:
+        pass
+
+
 if __name__ == "__main__":
     main()
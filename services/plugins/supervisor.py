@@ -0,0 +1,245 @@
+"""Plug-in supervisor: restarts, liveness and resource limits.
+
+The runner used to log "plugin exited" once a second forever and never
+restart anything, and had no way to notice a plug-in that was alive but
+wedged or leaking. :class:`Supervisor` owns every ``main()``-style
+plug-in subprocess and, on each :meth:`~Supervisor.tick`:
+
+* restarts exited plug-ins after an exponential backoff
+  (``backoff_initial_sec`` doubling up to ``backoff_max_sec``; the delay
+  resets once a plug-in has stayed up for ``backoff_reset_sec``);
+* samples each child's RSS and CPU from ``/proc/<pid>/stat`` and kills
+  it when RSS exceeds ``max_rss_mb`` or CPU stays above ``max_cpu_pct``
+  for ``cpu_grace`` consecutive samples;
+* kills a plug-in whose heartbeats (:mod:`services.plugins.heartbeat`)
+  are older than ``heartbeat_timeout_sec``. Only plug-ins that have beaten
+  at least once are checked, so plug-ins that never beat are never
+  declared dead.
+
+:meth:`~Supervisor.status` is the ``plugins.status`` event the runner
+publishes every ``GAINS_PLUGIN_STATUS_SEC``.
+
+==========================================  =======  ============================
+Variable                                    Default  Meaning
+==========================================  =======  ============================
+``GAINS_PLUGIN_MAX_RSS_MB``                 ``0``    kill above this RSS, 0 = off
+``GAINS_PLUGIN_MAX_CPU_PCT``                ``0``    sustained CPU limit, 0 = off
+``GAINS_PLUGIN_HEARTBEAT_TIMEOUT_SEC``      ``20``   stale heartbeat, 0 = off
+``GAINS_PLUGIN_BACKOFF_MAX_SEC``            ``60``   restart delay cap
+``GAINS_PLUGIN_STATUS_SEC``                 ``5``    ``plugins.status`` interval
+==========================================  =======  ============================
+"""
+from __future__ import annotations
+
+import logging
+import os
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from services.bus.protocol import PLUGINS_STATUS
+from services.plugins.heartbeat import SOURCE_PREFIX
+
+log = logging.getLogger("gains.plugins.supervisor")
+
+STATUS_SEC = float(os.getenv("GAINS_PLUGIN_STATUS_SEC", "5"))
+
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@dataclass(frozen=True)
+class Limits:
+    max_rss_mb: float = 0.0
+    max_cpu_pct: float = 0.0
+    cpu_grace: int = 3
+    heartbeat_timeout_sec: float = 20.0
+    backoff_initial_sec: float = 1.0
+    backoff_max_sec: float = 60.0
+    backoff_reset_sec: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> Limits:
+        return cls(
+            max_rss_mb=float(os.getenv("GAINS_PLUGIN_MAX_RSS_MB", "0")),
+            max_cpu_pct=float(os.getenv("GAINS_PLUGIN_MAX_CPU_PCT", "0")),
+            heartbeat_timeout_sec=float(os.getenv("GAINS_PLUGIN_HEARTBEAT_TIMEOUT_SEC", "20")),
+            backoff_max_sec=float(os.getenv("GAINS_PLUGIN_BACKOFF_MAX_SEC", "60")),
+        )
+
+
+def read_proc(pid: int) -> tuple[int, float] | None:
+    """(RSS bytes, CPU seconds) of ``pid`` from ``/proc``; ``None`` if unavailable."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # comm (field 2) may contain spaces; the fields we need follow its ')'.
+    fields = stat[stat.rindex(")") + 2:].split()
+    utime, stime, rss_pages = int(fields[11]), int(fields[12]), int(fields[21])
+    return rss_pages * PAGE_SIZE, (utime + stime) / CLK_TCK
+
+
+@dataclass
+class Child:
+    name: str
+    path: Path
+    proc: subprocess.Popen | None = None
+    state: str = "starting"
+    restarts: int = 0
+    started: float = 0.0
+    next_start: float = 0.0
+    delay: float = 0.0
+    last_beat: float | None = None
+    rss_mb: float = 0.0
+    cpu_pct: float = 0.0
+    cpu_over: int = 0
+    last_exit: str | None = None
+    _cpu: tuple[float, float] | None = field(default=None, repr=False)
+
+    @property
+    def pid(self) -> int | None:
+        return self.proc.pid if self.proc is not None else None
+
+
+def spawn_plugin(path: Path, env: dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, str(path)], env=env)
+
+
+class Supervisor:
+    def __init__(
+        self,
+        plugins: list[Path],
+        *,
+        env: dict[str, str] | None = None,
+        limits: Limits | None = None,
+        spawn: Callable[[Path, dict[str, str]], subprocess.Popen] = spawn_plugin,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.env = dict(os.environ if env is None else env)
+        self.limits = limits or Limits.from_env()
+        self.spawn = spawn
+        self.clock = clock
+        self.children = {p.parent.name: Child(p.parent.name, p) for p in plugins}
+
+    def start_all(self) -> None:
+        for child in self.children.values():
+            self._start(child, self.clock())
+
+    def observe(self, msg: dict[str, Any]) -> None:
+        """Feed a ``heartbeat`` event; beats from other sources are ignored."""
+        source = msg.get("source") or ""
+        child = self.children.get(source[len(SOURCE_PREFIX):]) if source.startswith(
+            SOURCE_PREFIX) else None
+        if child is not None and child.state == "running" and msg.get("pid") in (None, child.pid):
+            child.last_beat = self.clock()
+
+    def tick(self) -> None:
+        now = self.clock()
+        for child in self.children.values():
+            if child.state == "backoff":
+                if now >= child.next_start:
+                    self._start(child, now)
+                continue
+            if child.state != "running" or child.proc is None:
+                continue
+            code = child.proc.poll()
+            if code is not None:
+                self._exited(child, now, f"exited with code {code}")
+                continue
+            reason = self._check(child, now)
+            if reason is not None:
+                self._kill(child)
+                self._exited(child, now, reason)
+
+    def stop_all(self, timeout: float = 5.0) -> None:
+        running = [c for c in self.children.values() if c.proc is not None and c.state == "running"]
+        for child in running:
+            log.info("stopping plugin %s", child.name)
+            child.proc.terminate()
+        for child in running:
+            try:
+                child.proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                log.warning("plugin %s did not exit cleanly, killing", child.name)
+                child.proc.kill()
+            child.state = "stopped"
+
+    def status(self) -> dict[str, Any]:
+        now = self.clock()
+        return {
+            "event": PLUGINS_STATUS,
+            "plugins": [
+                {
+                    "name": c.name,
+                    "state": c.state,
+                    "pid": c.pid if c.state == "running" else None,
+                    "restarts": c.restarts,
+                    "uptime_sec": round(now - c.started, 1) if c.state == "running" else 0.0,
+                    "rss_mb": round(c.rss_mb, 1),
+                    "cpu_pct": round(c.cpu_pct, 1),
+                    "heartbeat_age_sec": (round(now - c.last_beat, 1)
+                                          if c.last_beat is not None else None),
+                    "restart_in_sec": (round(max(0.0, c.next_start - now), 1)
+                                       if c.state == "backoff" else None),
+                    "last_exit": c.last_exit,
+                }
+                for c in self.children.values()
+            ],
+            "ts": time.time(),
+        }
+
+    def _start(self, child: Child, now: float) -> None:
+        log.info("starting plugin %s", child.name)
+        child.proc = self.spawn(child.path, self.env)
+        child.state = "running"
+        child.started = now
+        child.last_beat = None
+        child.cpu_over = 0
+        child._cpu = None
+
+    def _check(self, child: Child, now: float) -> str | None:
+        limits = self.limits
+        sample = read_proc(child.proc.pid)
+        if sample is not None:
+            rss, cpu_sec = sample
+            child.rss_mb = rss / 2**20
+            if child._cpu is not None and now > child._cpu[1]:
+                child.cpu_pct = (cpu_sec - child._cpu[0]) / (now - child._cpu[1]) * 100
+            child._cpu = (cpu_sec, now)
+            if limits.max_rss_mb and child.rss_mb > limits.max_rss_mb:
+                return f"RSS {child.rss_mb:.0f} MB over limit {limits.max_rss_mb:.0f} MB"
+            if limits.max_cpu_pct and child.cpu_pct > limits.max_cpu_pct:
+                child.cpu_over += 1
+                if child.cpu_over >= limits.cpu_grace:
+                    return f"CPU {child.cpu_pct:.0f}% over limit {limits.max_cpu_pct:.0f}%"
+            else:
+                child.cpu_over = 0
+        timeout = limits.heartbeat_timeout_sec
+        if timeout and child.last_beat is not None and now - child.last_beat > timeout:
+            return f"missed heartbeats for {now - child.last_beat:.0f}s"
+        return None
+
+    def _kill(self, child: Child) -> None:
+        child.proc.kill()
+        try:
+            child.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            log.error("plugin %s (pid %d) did not die", child.name, child.proc.pid)
+
+    def _exited(self, child: Child, now: float, reason: str) -> None:
+        limits = self.limits
+        if now - child.started >= limits.backoff_reset_sec:
+            child.delay = 0.0
+        child.delay = min(limits.backoff_max_sec,
+                          child.delay * 2 if child.delay else limits.backoff_initial_sec)
+        child.state = "backoff"
+        child.next_start = now + child.delay
+        child.restarts += 1
+        child.last_exit = reason
+        child.rss_mb = child.cpu_pct = 0.0
+        log.warning("plugin %s %s; restarting in %.0fs", child.name, reason, child.delay)
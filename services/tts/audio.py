@@ -0,0 +1,214 @@
+"""Raw PCM clips and long-lived audio sinks for the TTS service.
+
+Speaking used to mean: synthesize into a temp WAV, fork ``aplay`` /
+``paplay`` / ``afplay`` on it, wait, delete it — a process spawn and a
+device open per utterance. A sink here is opened once and fed raw PCM:
+
+* :class:`SoundDeviceSink` — a PortAudio output stream (``sounddevice``),
+  in-process, any platform;
+* :class:`PipeSink` — one ``aplay`` / ``paplay`` process reading raw PCM on
+  stdin, restarted only if it dies or the sample format changes;
+* :class:`NullSink` — discards (optionally in real time); tests and
+  benchmarks.
+
+:func:`open_sink` picks the first that works (``GAINS_TTS_SINK`` forces one:
+``sounddevice``, ``aplay``, ``paplay`` or ``null``).
+
+:func:`play` writes a clip in short blocks so playback can be stopped
+mid-utterance; the sink's ``abort`` then drops whatever the device has
+buffered.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+log = logging.getLogger("gains.tts.audio")
+
+
+@dataclass(frozen=True, slots=True)
+class PcmFormat:
+    sample_rate: int
+    channels: int = 1
+    sample_width: int = 2  # bytes; signed 16-bit little-endian
+
+    @property
+    def bytes_per_sec(self) -> int:
+        return self.sample_rate * self.channels * self.sample_width
+
+
+@dataclass(frozen=True, slots=True)
+class Clip:
+    pcm: bytes
+    fmt: PcmFormat
+
+    @property
+    def duration_sec(self) -> float:
+        return len(self.pcm) / self.fmt.bytes_per_sec
+
+
+class AudioSink(Protocol):
+    def write(self, pcm: bytes, fmt: PcmFormat) -> None:
+        """Queue ``pcm`` for playback; blocks while the device buffer is full."""
+        ...
+
+    def abort(self) -> None:
+        """Silence now: drop audio already handed to the device."""
+        ...
+
+    def close(self) -> None: ...
+
+
+class SoundDeviceSink:
+    def __init__(self) -> None:
+        import sounddevice  # noqa: F401  (fail here, not on the first utterance)
+
+        self._stream: Any = None
+        self._fmt: PcmFormat | None = None
+
+    def write(self, pcm: bytes, fmt: PcmFormat) -> None:
+        if self._stream is None or fmt != self._fmt:
+            self._open(fmt)
+        self._stream.write(pcm)
+
+    def abort(self) -> None:
+        if self._stream is not None:
+            self._stream.abort()
+            self._stream.close()
+            self._stream = None
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def _open(self, fmt: PcmFormat) -> None:
+        import sounddevice as sd
+
+        self.close()
+        self._stream = sd.RawOutputStream(samplerate=fmt.sample_rate, channels=fmt.channels,
+                                          dtype=f"int{8 * fmt.sample_width}")
+        self._stream.start()
+        self._fmt = fmt
+
+
+def aplay_command(fmt: PcmFormat) -> list[str]:
+    return ["aplay", "-q", "-t", "raw", "-f", f"S{8 * fmt.sample_width}_LE",
+            "-c", str(fmt.channels), "-r", str(fmt.sample_rate), "-"]
+
+
+def paplay_command(fmt: PcmFormat) -> list[str]:
+    return ["paplay", "--raw", f"--format=s{8 * fmt.sample_width}le",
+            f"--channels={fmt.channels}", f"--rate={fmt.sample_rate}"]
+
+
+class PipeSink:
+    """One player process fed raw PCM on stdin for the life of the service."""
+
+    def __init__(self, command: Callable[[PcmFormat], list[str]]) -> None:
+        self.command = command
+        self.proc: subprocess.Popen | None = None
+        self._fmt: PcmFormat | None = None
+
+    def write(self, pcm: bytes, fmt: PcmFormat) -> None:
+        for attempt in (1, 2):
+            if self.proc is None or self.proc.poll() is not None or fmt != self._fmt:
+                self._open(fmt)
+            try:
+                self.proc.stdin.write(pcm)
+                self.proc.stdin.flush()
+                return
+            except BrokenPipeError:
+                log.warning("audio player exited; restarting (attempt %d)", attempt)
+                self.proc = None
+
+    def abort(self) -> None:
+        # The player holds ~0.5 s in its own buffer; killing it is the only
+        # way to cut that short. The next write starts a new one.
+        if self.proc is not None:
+            self.proc.kill()
+            self.proc.wait()
+            self.proc = None
+
+    def close(self) -> None:
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=5)
+        except (BrokenPipeError, subprocess.TimeoutExpired):
+            self.proc.kill()
+        self.proc = None
+
+    def _open(self, fmt: PcmFormat) -> None:
+        self.close()
+        self.proc = subprocess.Popen(self.command(fmt), stdin=subprocess.PIPE)
+        self._fmt = fmt
+
+
+class NullSink:
+    """Discards audio; with ``realtime`` it takes as long as playback would."""
+
+    def __init__(self, *, realtime: bool = False) -> None:
+        self.realtime = realtime
+        self.bytes_written = 0
+        self.aborts = 0
+        self.first_write: float | None = None
+        self._lock = threading.Lock()
+
+    def write(self, pcm: bytes, fmt: PcmFormat) -> None:
+        with self._lock:
+            if self.first_write is None:
+                self.first_write = time.perf_counter()
+            self.bytes_written += len(pcm)
+        if self.realtime:
+            time.sleep(len(pcm) / fmt.bytes_per_sec)
+
+    def abort(self) -> None:
+        self.aborts += 1
+
+    def close(self) -> None:
+        pass
+
+
+def play(sink: AudioSink, clip: Clip, stop: threading.Event | None = None, *,
+         block_sec: float = 0.05) -> bool:
+    """Write ``clip`` in ``block_sec`` blocks; ``False`` (and silence) if ``stop`` is set."""
+    if stop is None:
+        sink.write(clip.pcm, clip.fmt)
+        return True
+    frame = clip.fmt.channels * clip.fmt.sample_width
+    step = max(frame, int(clip.fmt.bytes_per_sec * block_sec) // frame * frame)
+    view = memoryview(clip.pcm)
+    for offset in range(0, len(view), step):
+        if stop.is_set():
+            sink.abort()
+            return False
+        sink.write(view[offset:offset + step], clip.fmt)
+    return True
+
+
+def open_sink(kind: str | None = None) -> AudioSink | None:
+    """The first working sink (or ``kind``); ``None`` if none is available."""
+    kind = kind or os.getenv("GAINS_TTS_SINK", "auto")
+    if kind == "null":
+        return NullSink()
+    if kind in ("auto", "sounddevice"):
+        try:
+            return SoundDeviceSink()
+        except Exception as e:  # ImportError, or PortAudio missing (OSError)
+            if kind == "sounddevice":
+                raise
+            log.debug("sounddevice unavailable: %s", e)
+    for name, command in (("aplay", aplay_command), ("paplay", paplay_command)):
+        if kind in ("auto", name) and shutil.which(name):
+            return PipeSink(command)
+    return None
@@ -0,0 +1,63 @@
+"""Synthesized-audio cache for the TTS service.
+
+The ASR silence watchdog asks "Are you done?" over and over, and each time
+paid a full Piper inference. :class:`PcmCache` keeps synthesized
+:class:`~services.tts.audio.Clip` objects keyed by ``(voice, text)`` in an
+LRU bounded by total PCM bytes (``GAINS_TTS_CACHE_MB``, default 32 — about
+12 minutes of 22.05 kHz mono), so a repeated prompt goes straight to the
+sink.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+
+from services.tts.audio import Clip
+
+MAX_BYTES = int(float(os.getenv("GAINS_TTS_CACHE_MB", "32")) * 2**20)
+
+
+class PcmCache:
+    def __init__(self, max_bytes: int = MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._clips: OrderedDict[tuple[str, str], Clip] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._clips)
+
+    def get(self, voice: str, text: str) -> Clip | None:
+        with self._lock:
+            clip = self._clips.get((voice, text))
+            if clip is None:
+                self.misses += 1
+                return None
+            self._clips.move_to_end((voice, text))
+            self.hits += 1
+            return clip
+
+    def put(self, voice: str, text: str, clip: Clip) -> None:
+        if len(clip.pcm) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._clips.pop((voice, text), None)
+            if old is not None:
+                self.bytes -= len(old.pcm)
+            self._clips[(voice, text)] = clip
+            self.bytes += len(clip.pcm)
+            while self.bytes > self.max_bytes:
+                _, dropped = self._clips.popitem(last=False)
+                self.bytes -= len(dropped.pcm)
+                self.evicted += 1
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (f"clips={len(self)} {self.bytes / 2**20:.1f}/{self.max_bytes / 2**20:.0f} MB "
+                f"hits={self.hits} misses={self.misses} hit_rate={rate:.0%} "
+                f"evicted={self.evicted}")
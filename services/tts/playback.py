@@ -0,0 +1,221 @@
+"""Non-blocking TTS playback queue: priorities, coalescing, cancel, barge-in.
+
+The service used to call ``speak`` inline in its bus loop, so a long
+utterance blocked every ``tts.play`` behind it, repeated watchdog prompts
+piled up and played back to back, and nothing could stop a prompt once it
+had started. :class:`PlaybackQueue` decouples the two: the bus loop calls
+:meth:`~PlaybackQueue.submit` and moves on, one worker thread plays.
+
+* Higher ``priority`` plays first (FIFO within a priority); a submission
+  that outranks the utterance playing interrupts it.
+* A text already queued or playing is coalesced rather than queued again
+  (a queued duplicate takes the higher of the two priorities).
+* At most ``max_depth`` utterances wait. When full, the oldest of the
+  lowest priority is dropped — or the new one, if it ranks lowest.
+  Utterances that waited longer than ``max_age_sec`` are expired unplayed.
+* :meth:`~PlaybackQueue.cancel` (``tts.cancel``) stops the current
+  utterance within one playback block and clears the queue;
+  :meth:`~PlaybackQueue.barge_in` (``asr.partial``) does the same unless
+  the recognized words are all in the utterance playing — the microphone
+  hearing the prompt itself.
+
+:meth:`~PlaybackQueue.status` is the ``tts.status`` event: queue depth plus
+the counters in :class:`QueueStats`.
+
+==============================  =======  ==================================
+Variable                        Default  Meaning
+==============================  =======  ==================================
+``GAINS_TTS_QUEUE_MAX``         ``8``    utterances waiting to play
+``GAINS_TTS_QUEUE_MAX_AGE_SEC`` ``15``   expire unplayed after this
+``GAINS_TTS_BARGE_IN``          ``1``    ``asr.partial`` interrupts, 0 = off
+``GAINS_TTS_STATUS_SEC``        ``10``   ``tts.status`` interval
+==============================  =======  ==================================
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from services.bus.protocol import TTS_STATUS
+
+log = logging.getLogger("gains.tts.playback")
+
+MAX_DEPTH = int(os.getenv("GAINS_TTS_QUEUE_MAX", "8"))
+MAX_AGE_SEC = float(os.getenv("GAINS_TTS_QUEUE_MAX_AGE_SEC", "15"))
+BARGE_IN = os.getenv("GAINS_TTS_BARGE_IN", "1") != "0"
+STATUS_SEC = float(os.getenv("GAINS_TTS_STATUS_SEC", "10"))
+
+WORD = re.compile(r"[\w']+")
+
+
+@dataclass
+class Utterance:
+    text: str
+    priority: int
+    seq: int
+    enqueued: float
+
+    @property
+    def rank(self) -> tuple[int, int]:
+        """Smaller plays first: higher priority, then earlier submission."""
+        return -self.priority, self.seq
+
+
+@dataclass
+class QueueStats:
+    submitted: int = 0
+    played: int = 0
+    coalesced: int = 0
+    dropped: int = 0
+    expired: int = 0
+    cancelled: int = 0  # utterances stopped or cleared by cancel / barge-in
+    preempted: int = 0
+    barge_ins: int = 0
+    peak_depth: int = 0
+
+    def summary(self) -> str:
+        return " ".join(f"{k}={v}" for k, v in asdict(self).items())
+
+
+def is_echo(heard: str, playing: str) -> bool:
+    """True if every word recognized also occurs in the utterance playing."""
+    words = WORD.findall(heard.lower())
+    return bool(words) and set(words) <= set(WORD.findall(playing.lower()))
+
+
+class PlaybackQueue:
+    def __init__(
+        self,
+        speak: Callable[[str, threading.Event], object],
+        *,
+        max_depth: int = MAX_DEPTH,
+        max_age_sec: float = MAX_AGE_SEC,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """``speak(text, stop)`` plays one utterance, returning early once ``stop`` is set."""
+        self.speak = speak
+        self.max_depth = max_depth
+        self.max_age_sec = max_age_sec
+        self.clock = clock
+        self.stats = QueueStats()
+        self._pending: list[Utterance] = []
+        self._current: Utterance | None = None
+        self._halt = threading.Event()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    @property
+    def playing(self) -> str | None:
+        current = self._current
+        return current.text if current is not None else None
+
+    def submit(self, text: str, priority: int = 0) -> bool:
+        """Queue ``text``; ``False`` if it was coalesced or dropped instead."""
+        with self._cond:
+            self.stats.submitted += 1
+            current = self._current
+            if current is not None and current.text == text and not self._halt.is_set():
+                self.stats.coalesced += 1
+                return False
+            for queued in self._pending:
+                if queued.text == text:
+                    queued.priority = max(queued.priority, priority)
+                    self.stats.coalesced += 1
+                    return False
+            item = Utterance(text, priority, next(self._seq), self.clock())
+            if len(self._pending) >= self.max_depth:
+                victim = min(self._pending, key=lambda u: (u.priority, u.seq))
+                if victim.priority > priority:
+                    self.stats.dropped += 1
+                    log.warning("playback queue full; dropping %r", text[:40])
+                    return False
+                self._pending.remove(victim)
+                self.stats.dropped += 1
+                log.warning("playback queue full; dropping %r", victim.text[:40])
+            self._pending.append(item)
+            self.stats.peak_depth = max(self.stats.peak_depth, len(self._pending))
+            if current is not None and priority > current.priority and not self._halt.is_set():
+                self.stats.preempted += 1
+                self._halt.set()
+            self._cond.notify()
+            return True
+
+    def cancel(self) -> int:
+        """Stop the current utterance and clear the queue; the number stopped."""
+        with self._cond:
+            stopped = len(self._pending)
+            self._pending.clear()
+            if self._current is not None and not self._halt.is_set():
+                self._halt.set()
+                stopped += 1
+            self.stats.cancelled += stopped
+            return stopped
+
+    def barge_in(self, heard: str) -> bool:
+        """:meth:`cancel` for new speech, unless ``heard`` is the prompt's own echo."""
+        playing = self.playing
+        if playing is None and not self._pending:
+            return False
+        if playing is not None and is_echo(heard, playing):
+            return False
+        if self.cancel():
+            self.stats.barge_ins += 1
+            log.info("barge-in: %r", heard[:40])
+            return True
+        return False
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "event": TTS_STATUS,
+            "depth": self.depth,
+            "playing": self.playing,
+            **asdict(self.stats),
+            "ts": time.time(),
+        }
+
+    def run(self, stop: threading.Event) -> None:
+        """Worker loop: play utterances until ``stop`` is set."""
+        while not stop.is_set():
+            with self._cond:
+                item = self._next()
+                if item is None:
+                    self._cond.wait(0.5)
+                    continue
+                self._current = item
+                self._halt = halt = threading.Event()
+            try:
+                self.speak(item.text, halt)
+            except Exception:
+                log.exception("playback failed: %r", item.text[:40])
+            with self._cond:
+                self._current = None
+                if not halt.is_set():
+                    self.stats.played += 1
+
+    def close(self) -> None:
+        """Stop the current utterance; the worker exits once ``stop`` is set."""
+        with self._cond:
+            self._halt.set()
+            self._cond.notify_all()
+
+    def _next(self) -> Utterance | None:
+        now = self.clock()
+        while self._pending:
+            item = min(self._pending, key=lambda u: u.rank)
+            self._pending.remove(item)
+            if now - item.enqueued <= self.max_age_sec:
+                return item
+            self.stats.expired += 1
+            log.info("expired unplayed after %.0fs: %r", now - item.enqueued, item.text[:40])
+        return None
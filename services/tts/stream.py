@@ -0,0 +1,114 @@
+"""Sentence-chunked streaming synthesis with playback overlap.
+
+Rendering a whole utterance before playing it makes time-to-first-audio
+grow with text length. :func:`stream` splits the text into sentences (and
+long sentences into phrases, see :func:`split_chunks`), synthesizes chunk
+N+1 on a worker thread while chunk N plays, and hands raw PCM straight to
+the sink — no temp files. A bounded queue (``depth`` chunks) keeps
+synthesis from running arbitrarily far ahead of playback. Setting ``stop``
+silences the sink within one playback block and abandons the chunks not
+yet played.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import re
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from services.tts.audio import AudioSink, Clip, play
+
+log = logging.getLogger("gains.tts.stream")
+
+SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+PHRASE_BREAK = re.compile(r"(?<=[,:—])\s+|\s+(?=-\s)")
+
+
+def _phrases(sentence: str, max_chars: int) -> list[str]:
+    if len(sentence) <= max_chars:
+        return [sentence]
+    out: list[str] = []
+    for part in PHRASE_BREAK.split(sentence):
+        if out and len(out[-1]) + 1 + len(part) <= max_chars:
+            out[-1] += " " + part
+        else:
+            out.append(part)
+    return out
+
+
+def split_chunks(text: str, *, max_chars: int = 160, first_max_chars: int = 60) -> list[str]:
+    """Sentences, with long ones split at phrase breaks.
+
+    The first chunk is held to ``first_max_chars`` where a phrase break
+    allows, since its synthesis time is the time to first audio.
+    """
+    chunks: list[str] = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        if sentence:
+            chunks.extend(_phrases(sentence, first_max_chars if not chunks else max_chars))
+    return chunks
+
+
+@dataclass
+class StreamStats:
+    chunks: int = 0
+    first_audio_sec: float | None = None
+    total_sec: float = 0.0
+    synth_sec: float = 0.0
+    stopped: bool = False
+
+
+def stream(
+    synth: Callable[[str], Clip | None],
+    chunks: list[str],
+    sink: AudioSink,
+    *,
+    depth: int = 2,
+    stop: threading.Event | None = None,
+) -> StreamStats:
+    """Synthesize ``chunks`` ahead of playback and write each to ``sink`` in order."""
+    stats = StreamStats()
+    start = time.perf_counter()
+    ready: queue.Queue[Clip | None] = queue.Queue(maxsize=depth)
+    done = threading.Event()
+
+    def hand_over(item: Clip | None) -> bool:
+        # Give up once the consumer has stopped (sink error), never block on it.
+        while not done.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for chunk in chunks:
+                t0 = time.perf_counter()
+                clip = synth(chunk)
+                stats.synth_sec += time.perf_counter() - t0
+                if clip is not None and not hand_over(clip):
+                    return
+        except Exception:
+            log.exception("chunk synthesis failed")
+        hand_over(None)
+
+    worker = threading.Thread(target=produce, name="gains-tts-synth", daemon=True)
+    worker.start()
+    try:
+        while (clip := ready.get()) is not None:
+            if stats.first_audio_sec is None:
+                stats.first_audio_sec = time.perf_counter() - start
+            if not play(sink, clip, stop):
+                stats.stopped = True
+                break
+            stats.chunks += 1
+    finally:
+        done.set()
+        worker.join(timeout=5)
+    stats.total_sec = time.perf_counter() - start
+    return stats
@@ -4,35 +4,77 @@ Subscribes to ``tts.play`` events on the bus and speaks them. Auto-downloads
 a default Piper voice (en_US-amy-medium) to ``~/.gains_models/piper`` on
 first run.
 
+Synthesized PCM is kept in an LRU (:mod:`services.tts.cache`) keyed by
+voice and text, and ``GAINS_TTS_PREWARM`` prompts are synthesized at
+start-up, so the ASR watchdog's "Are you done?" plays without an
+inference. Audio goes to one long-lived sink (:mod:`services.tts.audio`)
+rather than a temp WAV and a player process per utterance. Multi-sentence
+text is streamed (:mod:`services.tts.stream`): sentence N+1 is
+synthesized while sentence N plays (``GAINS_TTS_STREAM=0`` renders whole
+utterances instead).
+
+Requests go through a :class:`~services.tts.playback.PlaybackQueue`
+played on its own thread: ``tts.play`` takes an optional integer
+``priority``, duplicates are coalesced, ``tts.cancel`` stops the current
+utterance and new speech (``asr.partial``) barges in. Queue depth and
+drop counts are logged and published as ``tts.status``.
+
 Bug fixes vs. previous version:
 * The Piper branch unconditionally raised ImportError, so the service
   always silently fell back to ``say``/``espeak``. Now actually loads Piper
   via ``piper-tts`` and only falls back on real failure.
 * Subscriber was reading raw JSON instead of filtering for the right event.
 * Windows fallback added.
+* ``voice.synthesize(text, wav_file)`` is the pre-1.3 piper-tts call; with
+  the pinned ``piper-tts>=1.4`` it returns audio chunks. Uses the chunk
+  API and keeps PCM in memory.
+* Every utterance re-ran Piper and spawned a player on a temp WAV; PCM is
+  cached and streamed to a persistent sink.
+* Playback waited for the whole utterance to render; long text now starts
+  after its first sentence.
+* ``speak`` ran inline in the bus loop: prompts queued up unbounded in the
+  SUB socket, repeats played back to back and nothing could interrupt
+  one. Playback is a bounded priority queue on its own thread.
+* A ``tts.play`` with a non-numeric ``priority`` raised ``ValueError`` and
+  killed the service; it now plays at priority 0, and a malformed event is
+  logged and dropped instead of ending the receive loop.
 """
 from __future__ import annotations
 
+import functools
 import logging
+import os
 import shutil
 import subprocess
 import sys
 import tempfile
+import threading
+import time
 import urllib.request
 import wave
+from collections.abc import Callable
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-import zmq
+from services.bus.client import get_client
+from services.bus.protocol import ASR_PARTIAL, TTS_CANCEL, TTS_PLAY, recv
+from services.tts.audio import AudioSink, Clip, PcmFormat, open_sink, play
+from services.tts.cache import PcmCache
+from services.tts.playback import BARGE_IN, STATUS_SEC, PlaybackQueue
+from services.tts.stream import split_chunks, stream
 
 if TYPE_CHECKING:
-    from piper.voice import PiperVoice  # noqa: F401
+    from piper.voice import PiperVoice
 
 log = logging.getLogger("gains.tts")
 
 VOICE_DIR = Path.home() / ".gains_models" / "piper"
 VOICE_NAME = "en_US-amy-medium"
 VOICE_BASE = "https://huggingface.co/rhasspy/piper-voices/resolve/main/en/en_US/amy/medium"
+# Prompts synthesized into the PCM cache at start-up, "|"-separated.
+PREWARM = [t.strip() for t in os.getenv("GAINS_TTS_PREWARM", "Are you done?").split("|")
+           if t.strip()]
+STREAM = os.getenv("GAINS_TTS_STREAM", "1") != "0"
 
 
 def ensure_voice() -> tuple[Path, Path] | None:
@@ -51,76 +93,180 @@ def ensure_voice() -> tuple[Path, Path] | None:
         return None
 
 
-_piper_voice = None
-
-
-def piper_synth(text: str) -> Path | None:
-    """Synthesize via piper-tts; cache the loaded voice for reuse."""
-    global _piper_voice
+def load_piper() -> PiperVoice | None:
     try:
         from piper.voice import PiperVoice
     except ImportError:
         return None
-    if _piper_voice is None:
-        paths = ensure_voice()
-        if not paths:
-            return None
-        onnx_path, _ = paths
-        try:
-            _piper_voice = PiperVoice.load(str(onnx_path))
-        except Exception:
-            log.exception("failed to load piper voice")
-            return None
-    fd, name = tempfile.mkstemp(suffix=".wav")
-    Path(name).touch()  # ensure file exists before piper opens it
+    paths = ensure_voice()
+    if not paths:
+        return None
+    onnx_path, _ = paths
     try:
-        with wave.open(name, "wb") as wf:
-            _piper_voice.synthesize(text, wf)
-        return Path(name)
-    finally:
-        import os
-        os.close(fd)
+        return PiperVoice.load(str(onnx_path))
+    except Exception:
+        log.exception("failed to load piper voice")
+        return None
+
+
+def piper_synth(voice: PiperVoice, text: str) -> Clip | None:
+    """Synthesize ``text`` to raw PCM in memory (piper-tts >= 1.3 chunk API)."""
+    chunks = list(voice.synthesize(text))
+    if not chunks:
+        return None
+    first = chunks[0]
+    fmt = PcmFormat(first.sample_rate, first.sample_channels, first.sample_width)
+    return Clip(b"".join(c.audio_int16_bytes for c in chunks), fmt)
+
+
+def run_interruptible(command: list[str], stop: threading.Event | None) -> bool:
+    """Run ``command`` to completion, or kill it once ``stop`` is set."""
+    proc = subprocess.Popen(command)
+    while True:
+        try:
+            proc.wait(timeout=0.05)
+            return True
+        except subprocess.TimeoutExpired:
+            if stop is not None and stop.is_set():
+                proc.kill()
+                proc.wait()
+                return False
 
 
-def platform_speak(text: str) -> None:
+def platform_speak(text: str, stop: threading.Event | None = None) -> bool:
     if sys.platform == "darwin":
-        subprocess.run(["say", text], check=False)
-    elif sys.platform.startswith("linux"):
+        return run_interruptible(["say", text], stop)
+    if sys.platform.startswith("linux"):
         if shutil.which("espeak-ng"):
-            subprocess.run(["espeak-ng", text], check=False)
-        elif shutil.which("espeak"):
-            subprocess.run(["espeak", text], check=False)
-        else:
-            log.warning("no platform TTS available (install espeak-ng)")
+            return run_interruptible(["espeak-ng", text], stop)
+        if shutil.which("espeak"):
+            return run_interruptible(["espeak", text], stop)
+        log.warning("no platform TTS available (install espeak-ng)")
     elif sys.platform == "win32":
         ps = (
             "Add-Type -AssemblyName System.Speech; "
             f'(New-Object System.Speech.Synthesis.SpeechSynthesizer).Speak("{text}")'
         )
-        subprocess.run(["powershell", "-Command", ps], check=False)
+        return run_interruptible(["powershell", "-Command", ps], stop)
+    return True
 
 
-def play_wav(path: Path) -> None:
+def play_wav(path: Path, stop: threading.Event | None = None) -> bool:
     if sys.platform == "darwin":
-        subprocess.run(["afplay", str(path)], check=False)
-    elif shutil.which("aplay"):
-        subprocess.run(["aplay", "-q", str(path)], check=False)
-    elif shutil.which("paplay"):
-        subprocess.run(["paplay", str(path)], check=False)
-    elif sys.platform == "win32":
+        return run_interruptible(["afplay", str(path)], stop)
+    if shutil.which("aplay"):
+        return run_interruptible(["aplay", "-q", str(path)], stop)
+    if shutil.which("paplay"):
+        return run_interruptible(["paplay", str(path)], stop)
+    if sys.platform == "win32":
         ps = f'(New-Object Media.SoundPlayer "{path}").PlaySync()'
-        subprocess.run(["powershell", "-Command", ps], check=False)
+        return run_interruptible(["powershell", "-Command", ps], stop)
+    return True
+
+
+def write_wav(clip: Clip, path: Path) -> None:
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(clip.fmt.channels)
+        wf.setsampwidth(clip.fmt.sample_width)
+        wf.setframerate(clip.fmt.sample_rate)
+        wf.writeframes(clip.pcm)
+
+
+class Speaker:
+    """PCM cache → synthesizer → long-lived sink; the platform voice is the last resort."""
 
+    def __init__(
+        self,
+        synth: Callable[[str], Clip | None] | None,
+        sink: AudioSink | None,
+        *,
+        cache: PcmCache | None = None,
+        voice: str = VOICE_NAME,
+        streaming: bool = STREAM,
+    ) -> None:
+        self.synth = synth
+        self.sink = sink
+        self.cache = cache if cache is not None else PcmCache()
+        self.voice = voice
+        self.streaming = streaming
+        self._synth_lock = threading.Lock()  # prewarm runs beside the bus loop
 
-def speak(text: str) -> None:
-    wav = piper_synth(text)
-    if wav is not None:
+    def clip(self, text: str) -> Clip | None:
+        if self.synth is None:
+            return None
+        clip = self.cache.get(self.voice, text)
+        if clip is None:
+            with self._synth_lock:
+                clip = self.synth(text)
+            if clip is not None:
+                self.cache.put(self.voice, text, clip)
+        return clip
+
+    def prewarm(self, texts: list[str]) -> None:
+        start = time.perf_counter()
+        for text in texts:
+            self.clip(text)
+        if texts and self.synth is not None:
+            log.info("prewarmed %d prompts in %.2fs", len(texts), time.perf_counter() - start)
+
+    def speak(self, text: str, stop: threading.Event | None = None) -> bool:
+        """Play ``text``; ``False`` if ``stop`` was set before it finished."""
+        if self.streaming and self.synth is not None and self.sink is not None:
+            chunks = split_chunks(text)
+            if len(chunks) > 1:
+                stats = stream(self.clip, chunks, self.sink, stop=stop)
+                if stats.stopped:
+                    return False
+                if stats.chunks:
+                    log.debug("streamed %d chunks: first audio %.0fms, total %.2fs",
+                              stats.chunks, stats.first_audio_sec * 1000, stats.total_sec)
+                    return True
+        clip = self.clip(text)
+        if stop is not None and stop.is_set():
+            return False
+        if clip is None:
+            return platform_speak(text, stop)
+        if self.sink is not None:
+            return play(self.sink, clip, stop)
+        # No raw PCM sink on this host: play through a temp WAV as before.
+        fd, name = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        path = Path(name)
         try:
-            play_wav(wav)
+            write_wav(clip, path)
+            return play_wav(path, stop)
         finally:
-            wav.unlink(missing_ok=True)
-        return
-    platform_speak(text)
+            path.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        if self.sink is not None:
+            self.sink.close()
+        log.info("pcm cache: %s", self.cache.summary())
+
+
+def event_priority(msg: dict[str, Any]) -> int:
+    """``msg["priority"]`` as an int; anything unusable is 0, with a warning."""
+    raw = msg.get("priority")
+    if raw is None or isinstance(raw, bool):
+        return 0
+    try:
+        return int(raw)
+    except (TypeError, ValueError, OverflowError):
+        log.warning("ignoring tts.play priority %r; using 0", raw)
+        return 0
+
+
+def handle_event(playback: PlaybackQueue, msg: dict[str, Any]) -> None:
+    event = msg.get("event")
+    if event == TTS_PLAY:
+        text = str(msg.get("text") or "").strip()
+        if text:
+            log.info("queueing: %s", text[:60])
+            playback.submit(text, event_priority(msg))
+    elif event == TTS_CANCEL:
+        log.info("cancel: %d stopped", playback.cancel())
+    elif event == ASR_PARTIAL:
+        playback.barge_in(str(msg.get("text") or ""))
 
 
 def main() -> None:
@@ -128,26 +274,39 @@ def main() -> None:
         level=logging.INFO,
         format="%(asctime)s %(levelname)s %(name)s: %(message)s",
     )
-    ctx = zmq.Context.instance()
-    sub = ctx.socket(zmq.SUB)
-    sub.connect("tcp://localhost:5555")
-    sub.setsockopt_string(zmq.SUBSCRIBE, "")
-    log.info("tts service ready")
+    bus = get_client()
+    sub = bus.subscriber(TTS_PLAY, TTS_CANCEL, *([ASR_PARTIAL] if BARGE_IN else []))
+    voice = load_piper()
+    speaker = Speaker(functools.partial(piper_synth, voice) if voice else None, open_sink())
+    playback = PlaybackQueue(speaker.speak)
+    stop = threading.Event()
+
+    def report_status() -> None:
+        while not stop.wait(STATUS_SEC):
+            bus.publish(playback.status())
+            log.info("playback: depth=%d %s", playback.depth, playback.stats.summary())
+
+    threading.Thread(target=speaker.prewarm, args=(PREWARM,), name="gains-tts-prewarm",
+                     daemon=True).start()
+    threading.Thread(target=playback.run, args=(stop,), name="gains-tts-playback",
+                     daemon=True).start()
+    threading.Thread(target=report_status, name="gains-tts-status", daemon=True).start()
+    log.info("tts service ready (sink=%s)", type(speaker.sink).__name__)
     try:
         while True:
-            msg = sub.recv_json()
-            if msg.get("event") != "tts.play":
-                continue
-            text = (msg.get("text") or "").strip()
-            if not text:
-                continue
-            log.info("speaking: %s", text[:60])
-            speak(text)
+            msg = recv(sub)
+            try:
+                handle_event(playback, msg)
+            except Exception:
+                log.exception("dropping malformed event %.200r", msg)
     except KeyboardInterrupt:
         pass
     finally:
-        sub.close()
-        ctx.term()
+        stop.set()
+        playback.close()
+        log.info("playback: %s", playback.stats.summary())
+        speaker.close()
+        bus.term()
 
 
 if __name__ == "__main__":
@@ -11,17 +11,42 @@ Bug fixes vs. previous version:
   with no head-size normalisation — sensitive to camera distance. Now uses
   the facial-transformation matrix.
 * Publisher now connects to the XSUB side of the bus (5556).
+* Smoothing recomputed ``np.mean`` over a deque and copied the
+  transformation matrix into a new array every frame. Detection now lives
+  in :class:`NodDetector` (preallocated ring buffer, O(1) running mean),
+  usable outside ``main()``, with a vectorised :meth:`NodDetector.detect`
+  for replaying whole pitch traces.
+* ``cap.read()``, colour conversion, inference and ``cv2.waitKey`` ran in
+  series, so slow inference let frames queue in the camera buffer and lag
+  grew without bound. Capture now runs on its own thread into a
+  latest-frame slot (:mod:`services.vision.pipeline`) and inference always
+  takes the newest frame; per-stage timings are logged. ``--video`` reads
+  a file instead of the webcam for benchmarking.
+* Every full-resolution frame went through inference even with the head
+  still. An :class:`~services.vision.scheduler.AdaptiveScheduler` now
+  crops to the face, downscales, and lowers the inference rate while
+  pitch motion stays under ``motion_threshold_deg``; processed / skipped
+  frame counts are logged (``--no-adaptive`` restores every frame). When
+  motion resumes, the frames skipped just before it are inferred late, so
+  lowering the rate doesn't cost nods.
 """
 from __future__ import annotations
 
-import collections
+import argparse
+import contextlib
 import logging
+import threading
 import time
 import urllib.request
 from pathlib import Path
 
 import numpy as np
 
+from services.bus.client import get_client
+from services.bus.protocol import GESTURE_NOD
+from services.vision.pipeline import FrameSlot, StageTimes, capture_frames
+from services.vision.scheduler import AdaptiveScheduler
+
 log = logging.getLogger("gains.vision")
 
 MODEL_URL = (
@@ -35,6 +60,11 @@ CONFIG = {
     "motion_smoothing": 5,
     "cooldown_sec": 1.0,
     "motion_threshold_deg": 2.0,
+    "stats_interval_sec": 60.0,
+    # Adaptive scheduler (services/vision/scheduler.py).
+    "max_inference_interval": 6,
+    "calm_frames": 10,
+    "inference_max_width": 640,
 }
 
 
@@ -59,10 +89,90 @@ def pitch_from_matrix(matrix: np.ndarray) -> float:
     return float(np.degrees(pitch_rad))
 
 
+class NodDetector:
+    """Smoothed-pitch nod detector.
+
+    A nod fires when the mean of the last ``motion_smoothing`` pitch samples
+    drops by more than ``motion_threshold_deg`` since the previous frame
+    while being below ``nod_threshold_deg``, at most once per
+    ``cooldown_sec``. :meth:`update` is the per-frame API; :meth:`detect`
+    runs the same rule over a whole recorded trace at once.
+    """
+
+    def __init__(
+        self,
+        *,
+        nod_threshold_deg: float = CONFIG["nod_threshold_deg"],
+        motion_smoothing: int = CONFIG["motion_smoothing"],
+        cooldown_sec: float = CONFIG["cooldown_sec"],
+        motion_threshold_deg: float = CONFIG["motion_threshold_deg"],
+    ) -> None:
+        self.nod_threshold_deg = nod_threshold_deg
+        self.motion_smoothing = motion_smoothing
+        self.cooldown_sec = cooldown_sec
+        self.motion_threshold_deg = motion_threshold_deg
+        self._ring = np.zeros(motion_smoothing)
+        self.reset()
+
+    def reset(self) -> None:
+        self._ring.fill(0.0)
+        self._next = 0
+        self._count = 0
+        self._sum = 0.0
+        self.smoothed: float | None = None
+        self._last_nod = float("-inf")
+
+    def update(self, pitch: float, now: float) -> float | None:
+        """Add one pitch sample; return the smoothed pitch if it completes a nod."""
+        n = self.motion_smoothing
+        self._sum += pitch - self._ring[self._next]
+        self._ring[self._next] = pitch
+        self._next = (self._next + 1) % n
+        if self._next == 0:
+            self._sum = float(self._ring.sum())  # shed accumulated rounding once per wrap
+        if self._count < n:
+            self._count += 1
+            if self._count < n:
+                return None
+
+        smoothed = self._sum / n
+        last, self.smoothed = self.smoothed, smoothed
+        if (last is not None
+                and now - self._last_nod >= self.cooldown_sec
+                and last - smoothed > self.motion_threshold_deg
+                and smoothed < self.nod_threshold_deg):
+            self._last_nod = now
+            return smoothed
+        return None
+
+    def detect(self, pitch: np.ndarray, ts: np.ndarray) -> np.ndarray:
+        """Indices of the samples in a trace at which :meth:`update` would fire.
+
+        Stateless: smoothing and the motion test are vectorised; only the
+        (sparse) candidate frames are walked to apply the cooldown.
+        """
+        pitch = np.asarray(pitch, dtype=np.float64)
+        ts = np.asarray(ts, dtype=np.float64)
+        n = self.motion_smoothing
+        if len(pitch) <= n:
+            return np.empty(0, dtype=np.intp)
+        smoothed = np.lib.stride_tricks.sliding_window_view(pitch, n).mean(axis=1)
+        candidates = np.flatnonzero(
+            (smoothed[:-1] - smoothed[1:] > self.motion_threshold_deg)
+            & (smoothed[1:] < self.nod_threshold_deg)
+        ) + n  # smoothed[k + 1] belongs to sample k + n
+        fired = []
+        last_nod = float("-inf")
+        for i in candidates:
+            if ts[i] - last_nod >= self.cooldown_sec:
+                fired.append(i)
+                last_nod = ts[i]
+        return np.asarray(fired, dtype=np.intp)
+
+
 def main() -> None:
     import cv2
     import mediapipe as mp
-    import zmq
     from mediapipe.tasks import python as mp_tasks
     from mediapipe.tasks.python import vision as mp_vision
 
@@ -70,77 +180,136 @@ def main() -> None:
         level=logging.INFO,
         format="%(asctime)s %(levelname)s %(name)s: %(message)s",
     )
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--camera", type=int, default=0, help="camera index")
+    parser.add_argument("--video", type=str, help="read frames from a video file instead")
+    parser.add_argument("--video-speed", type=float, default=1.0,
+                        help="video replay speed, multiple of its fps (0 = unpaced)")
+    parser.add_argument("--no-adaptive", action="store_true",
+                        help="run inference on every full frame")
+    args = parser.parse_args()
     model_path = ensure_model()
 
-    options = mp_vision.FaceLandmarkerOptions(
-        base_options=mp_tasks.BaseOptions(model_asset_path=str(model_path)),
-        running_mode=mp_vision.RunningMode.VIDEO,
-        output_face_blendshapes=False,
-        output_facial_transformation_matrixes=True,
-        num_faces=1,
-    )
+    def landmarker_options(mode: mp_vision.RunningMode) -> mp_vision.FaceLandmarkerOptions:
+        return mp_vision.FaceLandmarkerOptions(
+            base_options=mp_tasks.BaseOptions(model_asset_path=str(model_path)),
+            running_mode=mode,
+            output_face_blendshapes=False,
+            output_facial_transformation_matrixes=True,
+            num_faces=1,
+        )
 
-    ctx = zmq.Context.instance()
-    pub = ctx.socket(zmq.PUB)
-    pub.connect("tcp://localhost:5556")
+    bus = get_client()
 
-    cap = cv2.VideoCapture(0)
-    pitch_hist: collections.deque[float] = collections.deque(maxlen=CONFIG["motion_smoothing"])
-    last_nod = 0.0
-    last_pitch: float | None = None
+    cap = cv2.VideoCapture(args.video if args.video else args.camera)
+    if not cap.isOpened():
+        raise SystemExit(f"cannot open {args.video or f'camera {args.camera}'}")
+    pace_fps = (cap.get(cv2.CAP_PROP_FPS) or 30.0) * args.video_speed if args.video else 0.0
+    detector = NodDetector()
+    scheduler = None if args.no_adaptive else AdaptiveScheduler(
+        motion_threshold_deg=CONFIG["motion_threshold_deg"],
+        max_interval=CONFIG["max_inference_interval"],
+        calm_frames=CONFIG["calm_frames"],
+        max_width=CONFIG["inference_max_width"],
+    )
+    slot = FrameSlot()
+    times = StageTimes()
+    stop = threading.Event()
+    capture = threading.Thread(
+        target=capture_frames, args=(cap, slot, stop, times), kwargs={"pace_fps": pace_fps},
+        name="vision-capture", daemon=True,
+    )
 
     log.info(
         "vision service started: nod_threshold=%.1f° smoothing=%d frames",
         CONFIG["nod_threshold_deg"], CONFIG["motion_smoothing"],
     )
 
-    try:
-        with mp_vision.FaceLandmarker.create_from_options(options) as landmarker:
-            while cap.isOpened():
-                ok, frame = cap.read()
-                if not ok:
-                    break
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
-                ts_ms = int(time.monotonic() * 1000)
-                result = landmarker.detect_for_video(mp_image, ts_ms)
+    def log_stats() -> None:
+        times.log()
+        log.info("stale frames skipped: %d", slot.overwritten)
+        if scheduler:
+            st = scheduler.stats
+            log.info("scheduler: processed=%d skipped=%d (%.0f%%) backfilled=%d interval=%d",
+                     st.processed, st.skipped, 100 * st.skip_ratio, st.backfilled,
+                     scheduler.interval)
 
-                if not result.facial_transformation_matrixes:
-                    if cv2.waitKey(1) == 27:
+    def to_image(frame: np.ndarray, region: tuple[int, int, int, int]) -> mp.Image:
+        x0, y0, x1, y1 = region
+        roi = frame[y0:y1, x0:x1]
+        scale = scheduler.scale(x1 - x0) if scheduler else 1.0
+        if scale < 1.0:
+            roi = cv2.resize(roi, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return mp.Image(image_format=mp.ImageFormat.SRGB,
+                        data=cv2.cvtColor(roi, cv2.COLOR_BGR2RGB))
+
+    def on_pitch(pitch: float, captured: float) -> None:
+        nod = detector.update(pitch, captured)
+        if nod is not None:
+            bus.publish({"event": GESTURE_NOD, "ts": time.time(), "pitch_deg": nod})
+            log.info("nod detected, pitch=%.1f°", nod)
+
+    last_ts_ms = -1
+    next_stats = time.monotonic() + CONFIG["stats_interval_sec"]
+    try:
+        with contextlib.ExitStack() as stack:
+            landmarker = stack.enter_context(mp_vision.FaceLandmarker.create_from_options(
+                landmarker_options(mp_vision.RunningMode.VIDEO)))
+            # Frames held by the scheduler are older than the last VIDEO-mode
+            # timestamp, so they go through a stateless IMAGE-mode landmarker.
+            backfill = stack.enter_context(mp_vision.FaceLandmarker.create_from_options(
+                landmarker_options(mp_vision.RunningMode.IMAGE))) if scheduler else None
+            capture.start()
+            while True:
+                item = slot.get(timeout=0.5)
+                if item is None:
+                    if slot.closed:
                         break
                     continue
-                matrix = np.array(result.facial_transformation_matrixes[0])
-                pitch = pitch_from_matrix(matrix)
-                pitch_hist.append(pitch)
-                if len(pitch_hist) < CONFIG["motion_smoothing"]:
-                    if cv2.waitKey(1) == 27:
-                        break
+                frame, captured = item
+                if scheduler and not scheduler.should_process(item):
                     continue
+                times.record("age", time.monotonic() - captured)
+                height, width = frame.shape[:2]
+                region = scheduler.region(width, height) if scheduler else (0, 0, width, height)
+                with times.time("convert"):
+                    mp_image = to_image(frame, region)
+                # VIDEO mode needs strictly increasing timestamps.
+                ts_ms = last_ts_ms = max(int(captured * 1000), last_ts_ms + 1)
+                with times.time("inference"):
+                    result = landmarker.detect_for_video(mp_image, ts_ms)
+                times.record("latency", time.monotonic() - captured)
 
-                smoothed = float(np.mean(pitch_hist))
-                now = time.monotonic()
-                if now - last_nod >= CONFIG["cooldown_sec"] and last_pitch is not None:
-                    motion = last_pitch - smoothed
-                    if (motion > CONFIG["motion_threshold_deg"]
-                            and smoothed < CONFIG["nod_threshold_deg"]):
-                        last_nod = now
-                        pub.send_json({
-                            "event": "gesture.nod",
-                            "ts": time.time(),
-                            "pitch_deg": smoothed,
-                        })
-                        log.info("nod detected, pitch=%.1f°", smoothed)
-                last_pitch = smoothed
-
-                if cv2.waitKey(1) == 27:
-                    break
+                if time.monotonic() >= next_stats:
+                    log_stats()
+                    next_stats += CONFIG["stats_interval_sec"]
+                if not result.facial_transformation_matrixes:
+                    if scheduler:
+                        scheduler.observe(None)
+                    continue
+                pitch = pitch_from_matrix(np.asarray(result.facial_transformation_matrixes[0]))
+                if scheduler:
+                    landmarks = result.face_landmarks[0]
+                    scheduler.update_box(np.array([p.x for p in landmarks]),
+                                         np.array([p.y for p in landmarks]), region)
+                    # Motion after a calm stretch: infer the frames skipped
+                    # before it so the detector sees the nod at full rate.
+                    for held, held_captured in scheduler.observe(pitch):
+                        with times.time("backfill"):
+                            held_result = backfill.detect(to_image(held, region))
+                        if held_result.facial_transformation_matrixes:
+                            on_pitch(pitch_from_matrix(np.asarray(
+                                held_result.facial_transformation_matrixes[0])), held_captured)
+                on_pitch(pitch, captured)
     except KeyboardInterrupt:
         pass
     finally:
+        stop.set()
+        if capture.is_alive():
+            capture.join(timeout=1.0)
         cap.release()
-        cv2.destroyAllWindows()
-        pub.close()
-        ctx.term()
+        log_stats()
+        bus.term()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+"""Capture / inference decoupling for the vision service.
+
+The camera thread writes every frame into a :class:`FrameSlot` that only
+ever holds the newest one; the inference loop takes whatever is newest when
+it is ready for more. A slow ``detect_for_video`` therefore skips stale
+frames instead of letting them pile up in the camera buffer, and the age
+of the frame behind a nod stays bounded by one inference interval.
+
+:class:`StageTimes` keeps per-stage timing (capture, convert, inference,
+end-to-end latency) so the service can log where the frame budget goes.
+"""
+from __future__ import annotations
+
+import collections
+import logging
+import statistics
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Protocol
+
+import numpy as np
+
+log = logging.getLogger("gains.vision.pipeline")
+
+
+class Capture(Protocol):
+    """The part of ``cv2.VideoCapture`` the capture thread uses."""
+
+    def read(self) -> tuple[bool, Any]: ...
+
+
+class FrameSlot:
+    """Single-slot, latest-wins frame hand-off between two threads."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._frame: np.ndarray | None = None
+        self._captured = 0.0
+        self._seq = 0
+        self._taken = 0
+        self.overwritten = 0
+        self.closed = False
+
+    def put(self, frame: np.ndarray, captured: float) -> None:
+        with self._cond:
+            if self._seq != self._taken:
+                self.overwritten += 1
+            self._frame, self._captured = frame, captured
+            self._seq += 1
+            self._cond.notify()
+
+    def get(self, timeout: float | None = None) -> tuple[np.ndarray, float] | None:
+        """The newest frame not yet taken and its capture time, or ``None``
+        on timeout / once the slot is closed and drained."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq != self._taken or self.closed, timeout):
+                return None
+            if self._seq == self._taken:
+                return None
+            self._taken = self._seq
+            return self._frame, self._captured
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class StageTimes:
+    """Per-stage durations: running count/total/max plus a recent window for percentiles."""
+
+    def __init__(self, window: int = 1000) -> None:
+        self._lock = threading.Lock()
+        self._recent: dict[str, collections.deque[float]] = collections.defaultdict(
+            lambda: collections.deque(maxlen=window)
+        )
+        self._count: dict[str, int] = collections.defaultdict(int)
+        self._max: dict[str, float] = collections.defaultdict(float)
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._recent[stage].append(seconds)
+            self._count[stage] += 1
+            self._max[stage] = max(self._max[stage], seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def count(self, stage: str) -> int:
+        return self._count.get(stage, 0)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            out = {}
+            for stage, recent in self._recent.items():
+                values = sorted(recent)
+                out[stage] = {
+                    "count": self._count[stage],
+                    "p50_ms": statistics.median(values) * 1000,
+                    "p95_ms": values[min(len(values) - 1, int(len(values) * 0.95))] * 1000,
+                    "max_ms": self._max[stage] * 1000,
+                }
+            return out
+
+    def log(self) -> None:
+        for stage, st in self.summary().items():
+            log.info("%-9s n=%d p50=%.1fms p95=%.1fms max=%.1fms",
+                     stage, st["count"], st["p50_ms"], st["p95_ms"], st["max_ms"])
+
+
+def capture_frames(cap: Capture, slot: FrameSlot, stop: threading.Event, times: StageTimes,
+                   *, pace_fps: float = 0.0) -> None:
+    """Read frames into ``slot`` until the source ends or ``stop`` is set.
+
+    ``pace_fps`` replays a video file at that frame rate, as a camera would
+    deliver it; 0 reads as fast as the source allows (a live camera paces
+    itself).
+    """
+    start = time.monotonic()
+    n = 0
+    try:
+        while not stop.is_set():
+            if pace_fps:
+                delay = start + n / pace_fps - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            with times.time("capture"):
+                ok, frame = cap.read()
+            if not ok:
+                break
+            slot.put(frame, time.monotonic())
+            n += 1
+    finally:
+        slot.close()
@@ -0,0 +1,146 @@
+"""Adaptive inference scheduling for the vision service.
+
+Most of the time the head is still, yet every full-resolution frame went
+through ``FaceLandmarker.detect_for_video``. :class:`AdaptiveScheduler`
+cuts that work two ways:
+
+* **Rate** — while successive pitch readings move less than
+  ``motion_threshold_deg``, the inference interval doubles every
+  ``calm_frames`` inferences up to ``max_interval`` (every Nth frame). Any
+  reading above the threshold, or losing the face, drops straight back to
+  every frame, so a nod is tracked at full rate from its first movement.
+  The frames skipped just before that movement are held, and
+  :meth:`AdaptiveScheduler.observe` hands them back for inference, so the
+  nod detector sees the whole nod at full rate — a nod shorter than the
+  interval would otherwise be sampled once or twice and missed.
+* **Size** — frames are cropped to the last face box plus ``roi_margin``
+  and downscaled to at most ``max_width`` pixels wide. Without a face box
+  (start-up, face lost) the whole frame is used.
+
+The crop box only moves once the face drifts by more than ``roi_drift`` of
+its size, so FaceLandmarker's frame-to-frame tracking sees a stable image
+and pitch readings stay comparable; nods are detected from relative pitch
+motion anyway.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+# (x0, y0, x1, y1) in frame pixels.
+Box = tuple[int, int, int, int]
+
+
+@dataclass
+class SchedulerStats:
+    processed: int = 0
+    skipped: int = 0
+    backfilled: int = 0  # skipped frames inferred late, when motion resumed
+
+    @property
+    def skip_ratio(self) -> float:
+        total = self.processed + self.skipped
+        return self.skipped / total if total else 0.0
+
+
+class AdaptiveScheduler:
+    def __init__(
+        self,
+        *,
+        motion_threshold_deg: float = 2.0,
+        max_interval: int = 6,
+        calm_frames: int = 10,
+        max_width: int = 640,
+        roi_margin: float = 0.5,
+        roi_drift: float = 0.15,
+        min_roi: int = 128,
+    ) -> None:
+        self.motion_threshold_deg = motion_threshold_deg
+        self.max_interval = max_interval
+        self.calm_frames = calm_frames
+        self.max_width = max_width
+        self.roi_margin = roi_margin
+        self.roi_drift = roi_drift
+        self.min_roi = min_roi
+        self.interval = 1
+        self.box: Box | None = None
+        self.stats = SchedulerStats()
+        self._since = 0
+        self._calm = 0
+        self._last_pitch: float | None = None
+        self._held: deque[Any] = deque(maxlen=max_interval)
+        self._gap: list[Any] = []
+
+    def should_process(self, frame: Any = None) -> bool:
+        """Call once per captured frame; ``False`` means skip it (``frame`` is held)."""
+        self._since += 1
+        if self._since >= self.interval:
+            self._since = 0
+            self.stats.processed += 1
+            self._gap = list(self._held)
+            self._held.clear()
+            return True
+        self.stats.skipped += 1
+        if frame is not None:
+            self._held.append(frame)
+        return False
+
+    def observe(self, pitch: float | None) -> list[Any]:
+        """Feed the pitch of a processed frame (``None`` = no face found).
+
+        Returns the frames skipped before this one if it ends a calm stretch
+        (motion at a longer interval); infer them, oldest first, before
+        passing this frame's pitch on.
+        """
+        gap, self._gap = self._gap, []
+        if pitch is None:
+            self.interval, self._calm, self._last_pitch, self.box = 1, 0, None, None
+            return []
+        moved = (self._last_pitch is not None
+                 and abs(pitch - self._last_pitch) >= self.motion_threshold_deg)
+        if moved:
+            self.interval, self._calm = 1, 0
+        else:
+            self._calm += 1
+            if self._calm >= self.calm_frames and self.interval < self.max_interval:
+                self.interval = min(self.interval * 2, self.max_interval)
+                self._calm = 0
+        self._last_pitch = pitch
+        if not moved:
+            return []
+        self.stats.backfilled += len(gap)
+        return gap
+
+    def region(self, width: int, height: int) -> Box:
+        """Crop for the next inference: last face box plus margin, or the whole frame."""
+        if self.box is None:
+            return 0, 0, width, height
+        x0, y0, x1, y1 = self.box
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        half = max(x1 - x0, y1 - y0, self.min_roi) * (1 + self.roi_margin) / 2
+        return (max(0, int(cx - half)), max(0, int(cy - half)),
+                min(width, int(cx + half)), min(height, int(cy + half)))
+
+    def scale(self, width: int) -> float:
+        """Downscale factor (≤ 1) for a crop ``width`` pixels wide."""
+        return min(1.0, self.max_width / width) if width else 1.0
+
+    def update_box(self, xs: np.ndarray, ys: np.ndarray, region: Box) -> None:
+        """Track the face from landmarks normalised to the inferred ``region``."""
+        x0, y0, x1, y1 = region
+        w, h = x1 - x0, y1 - y0
+        face = (int(x0 + xs.min() * w), int(y0 + ys.min() * h),
+                int(x0 + xs.max() * w), int(y0 + ys.max() * h))
+        if self.box is None or self._drifted(face):
+            self.box = face
+
+    def _drifted(self, face: Box) -> bool:
+        bx0, by0, bx1, by1 = self.box
+        fx0, fy0, fx1, fy1 = face
+        size = max(bx1 - bx0, by1 - by0, 1)
+        shift = max(abs((fx0 + fx1) - (bx0 + bx1)), abs((fy0 + fy1) - (by0 + by1))) / 2
+        resize = abs(max(fx1 - fx0, fy1 - fy0) - size)
+        return max(shift, resize) > self.roi_drift * size
@@ -4,6 +4,10 @@
 //!   payload to the frontend via [`AppHandle::emit("bus-message", _)`].
 //! * PUB connects to the bus' XSUB side (5556) and is used by Tauri
 //!   commands (e.g. `commit_text`) that need to publish events.
+//!
+//! Messages are `[topic, codec, payload]` multipart frames; the topic is
+//! the event name and the payload is always the last frame. Only the
+//! `json` codec is understood here — other codecs are skipped.
 
 use std::sync::Mutex;
 
@@ -34,9 +38,10 @@ impl BusPublisher {
     }
 
     pub fn send(&self, value: &Value) -> Result<()> {
+        let topic = value.get("event").and_then(Value::as_str).unwrap_or("");
         let payload = serde_json::to_string(value)?;
         let socket = self.socket.lock().expect("bus PUB mutex poisoned");
-        socket.send(payload.as_bytes(), 0)?;
+        socket.send_multipart([topic.as_bytes(), b"json", payload.as_bytes()], 0)?;
         Ok(())
     }
 }
@@ -62,11 +67,15 @@ fn run_subscriber(app: &AppHandle, ctx: &zmq::Context) -> Result<()> {
     tracing::info!(endpoint = BUS_SUB_ENDPOINT, "bus subscriber connected");
 
     loop {
-        let raw = sub
-            .recv_string(0)
-            .context("recv from bus")?
-            .map_err(|_| anyhow::anyhow!("non-utf8 bus message"))?;
-        match serde_json::from_str::<Value>(&raw) {
+        let frames = sub.recv_multipart(0).context("recv from bus")?;
+        if frames.len() >= 3 && frames[1] != b"json" {
+            tracing::debug!("skip non-json bus message");
+            continue;
+        }
+        let Some(payload) = frames.last() else {
+            continue;
+        };
+        match serde_json::from_slice::<Value>(payload) {
             Ok(value) => {
                 if let Err(e) = app.emit("bus-message", value) {
                     tracing::warn!(error = %e, "emit failed");
@@ -0,0 +1,176 @@
+"""Multi-stream ASR: source config, worker layout, fair decode scheduling."""
+from __future__ import annotations
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from services.asr.multistream import (
+    DEFAULT_SOURCE,
+    CaptureSupervisor,
+    FairScheduler,
+    SourceSpec,
+    parse_sources,
+    worker_layout,
+)
+from services.asr.server import DEFAULTS, AsrPipeline, partial_event
+from services.asr.sources import ToneSource
+from services.asr.streaming import Word
+
+SR = 16000
+
+
+def test_parse_sources() -> None:
+    assert parse_sources([]) == [SourceSpec(DEFAULT_SOURCE)]
+    assert parse_sources([{"id": "room-a", "device": 2}, "USB Mic"]) == [
+        SourceSpec("room-a", 2), SourceSpec("mic1", "USB Mic"),
+    ]
+    with pytest.raises(ValueError, match="duplicate"):
+        parse_sources([{"id": "a"}, {"id": "a"}])
+
+
+def test_worker_layout_splits_cores_between_streams() -> None:
+    assert worker_layout(1, cores=8) == (1, 0)
+    assert worker_layout(3, cores=8) == (3, 2)
+    assert worker_layout(8, cores=8) == (4, 2)
+    assert worker_layout(4, workers=2, cores=8) == (2, 4)
+    assert worker_layout(4, cores=1) == (1, 1)
+
+
+def test_scheduler_limits_concurrency_to_its_slots() -> None:
+    scheduler = FairScheduler(2)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def decode() -> None:
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+
+    threads = [threading.Thread(target=lambda i=i: [scheduler.run(f"s{i}", decode)
+                                                    for _ in range(5)]) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert peak[0] == 2
+    assert sorted(scheduler.stats) == ["s0", "s1", "s2", "s3"]
+    assert all(s.decodes == 5 for s in scheduler.stats.values())
+
+
+def test_scheduler_round_robins_a_busy_source_with_the_others() -> None:
+    scheduler = FairScheduler(1)
+    order: list[str] = []
+    stop = threading.Event()
+
+    def stream(source: str) -> None:
+        while not stop.is_set():
+            scheduler.run(source, lambda: (order.append(source), time.sleep(0.005)))
+
+    threads = [threading.Thread(target=stream, args=(s,)) for s in ("busy", "a", "b")]
+    for t in threads:
+        t.start()
+    time.sleep(0.3)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    counts = [order.count(s) for s in ("busy", "a", "b")]
+    assert min(counts) > 5 and max(counts) - min(counts) <= 1
+    assert "decodes=" in scheduler.summary()
+
+
+def test_pipelines_share_one_transcriber_and_tag_their_source() -> None:
+    calls: list[int] = []
+
+    def transcribe(audio: np.ndarray, _prompt: str) -> list[Word]:
+        calls.append(len(audio))
+        return [Word(f" w{i}", float(i), i + 0.5) for i in range(len(audio) // SR)]
+
+    scheduler = FairScheduler(2)
+    events: list[dict] = []
+    lock = threading.Lock()
+
+    def on_words(source_id: str):
+        def publish(words: list[Word]) -> None:
+            with lock:
+                events.append(partial_event(words, source_id))
+        return publish
+
+    pipelines = [AsrPipeline(scheduler.wrap(sid, transcribe), dict(DEFAULTS), on_words(sid),
+                             source_id=sid) for sid in ("room-a", "room-b")]
+    stop = threading.Event()
+    workers = [threading.Thread(target=p.run, args=(stop,), daemon=True) for p in pipelines]
+    for w in workers:
+        w.start()
+
+    def feed(pipeline: AsrPipeline) -> None:
+        source = ToneSource(seconds=6.0, on_sec=2.0, off_sec=1.0, sample_rate=SR)
+        source.run(lambda b: pipeline.on_block(b, block=True), stop)
+        pipeline.drain()
+
+    feeders = [threading.Thread(target=feed, args=(p,)) for p in pipelines]
+    for f in feeders:
+        f.start()
+    for f in feeders:
+        f.join()
+    stop.set()
+    for w in workers:
+        w.join()
+
+    assert {e["source_id"] for e in events} == {"room-a", "room-b"}
+    assert len(calls) == sum(s.decodes for s in scheduler.stats.values())
+    assert all(p.stats.dropped == 0 for p in pipelines)
+
+
+def _wait(predicate, timeout: float = 3.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_failing_source_restarts_without_stopping_the_others() -> None:
+    stop = threading.Event()
+    supervisor = CaptureSupervisor(stop, max_restarts=2, backoff_sec=0.01)
+    attempts = {"healthy": 0, "flaky": 0, "dead": 0}
+
+    def capture(source_id: str, fail_times: int):
+        def run(ev: threading.Event) -> None:
+            attempts[source_id] += 1
+            if attempts[source_id] <= fail_times:
+                raise OSError(f"{source_id} unplugged")
+            ev.wait()
+
+        return run
+
+    supervisor.add("healthy", capture("healthy", 0))
+    supervisor.add("flaky", capture("flaky", 2))
+    supervisor.add("dead", capture("dead", 99))
+    supervisor.start()
+    _wait(lambda: supervisor.failed == {"dead"} and attempts["flaky"] == 3)
+
+    assert not stop.is_set()
+    assert supervisor.down == {"dead"} and supervisor.restarts["flaky"] == 2
+    assert attempts == {"healthy": 1, "flaky": 3, "dead": 3}
+    stop.set()
+
+
+def test_service_stops_once_every_source_has_failed() -> None:
+    stop = threading.Event()
+    supervisor = CaptureSupervisor(stop, max_restarts=1, backoff_sec=0.01)
+
+    def broken(_ev: threading.Event) -> None:
+        raise OSError("no such device")
+
+    supervisor.add("a", broken)
+    supervisor.add("b", broken)
+    supervisor.start()
+    assert stop.wait(2)
+    assert supervisor.failed == {"a", "b"}
@@ -0,0 +1,174 @@
+"""Tests for the streaming ASR engine (ring buffer, local agreement, VAD gate, pipeline).
+
+The Whisper model is replaced by a scripted transcriber, so these run
+without faster-whisper or an audio device.
+"""
+from __future__ import annotations
+
+import threading
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from services.asr.server import DEFAULTS, AsrPipeline
+from services.asr.sources import ToneSource, WavSource
+from services.asr.streaming import AudioRing, LocalAgreement, StreamingDecoder, Word
+from services.asr.vad import UTTERANCE_END, EnergyGate
+
+SR = 16000
+BLOCK = SR * 64 // 1000
+
+
+def _words(*spec: tuple[str, float, float]) -> list[Word]:
+    return [Word(w, s, e) for w, s, e in spec]
+
+
+def test_ring_keeps_latest_samples_contiguous() -> None:
+    ring = AudioRing(10)
+    for i in range(7):
+        ring.extend(np.arange(i * 3, i * 3 + 3, dtype=np.float32))
+    assert len(ring) == 10
+    assert ring.start == 11
+    assert ring.view().tolist() == list(range(11, 21))
+
+    ring.trim(15)
+    assert ring.start == 15
+    assert ring.view().tolist() == list(range(15, 21))
+
+    ring.extend(np.arange(100, 125, dtype=np.float32))  # larger than capacity
+    assert ring.end == 21 + 25
+    assert ring.view().tolist() == list(range(115, 125))
+
+
+def test_local_agreement_commits_stable_prefix_once() -> None:
+    la = LocalAgreement()
+    assert la.insert(_words((" hello", 0.0, 0.4), (" word", 0.5, 0.8))) == []
+    first = la.insert(_words((" Hello,", 0.0, 0.4), (" world", 0.5, 0.9), (" again", 1.0, 1.3)))
+    assert [w.word for w in first] == [" Hello,"]
+    second = la.insert(_words((" world", 0.5, 0.9), (" again", 1.0, 1.3)))
+    assert [w.word for w in second] == [" world", " again"]
+    # Already-committed words re-emitted with shifted times are not repeated.
+    assert la.insert(_words((" again", 1.35, 1.6), (" done", 1.7, 2.0))) == []
+    assert [w.word for w in la.flush()] == [" done"]
+
+
+def test_decoder_runs_one_encoder_pass_per_hop() -> None:
+    calls: list[int] = []
+
+    def transcribe(audio: np.ndarray, _prompt: str) -> list[Word]:
+        calls.append(len(audio))
+        # The stream "says" one word per second of audio.
+        return [Word(f" w{i}", float(i), i + 0.5) for i in range(len(audio) // SR)]
+
+    decoder = StreamingDecoder(
+        transcribe, sample_rate=SR, hop_sec=1.0, window_sec=20.0, trim_sec=10.0
+    )
+    published: list[str] = []
+    blocks = 10 * SR // BLOCK
+    for _ in range(blocks):
+        published += [w.word for w in decoder.feed(np.zeros(BLOCK, dtype=np.float32))]
+    published += [w.word for w in decoder.finish()]
+
+    # ~156 capture blocks, but only ~10 encoder passes.
+    assert blocks / decoder.decodes > 10
+    assert len(calls) == decoder.decodes
+    assert published == [f" w{i}" for i in range(len(published))]
+    assert len(published) == len(set(published))
+
+
+def test_energy_gate_drops_silence_and_marks_utterance_end() -> None:
+    rng = np.random.default_rng(0)
+    gate = EnergyGate(sample_rate=SR, block_ms=64, preroll_ms=128, hangover_ms=256)
+    silence = [(rng.standard_normal(BLOCK) * 1e-4).astype(np.float32) for _ in range(50)]
+    speech = [(rng.standard_normal(BLOCK) * 0.1).astype(np.float32) for _ in range(10)]
+
+    out: list[np.ndarray | None] = []
+    for block in silence + speech + silence:
+        out.extend(gate.process(block))
+
+    assert out[-1] is UTTERANCE_END
+    assert sum(item is UTTERANCE_END for item in out) == 1
+    # 2 pre-roll + 10 speech + 4 hangover blocks pass; the rest is gated.
+    assert gate.stats.passed == len(out) - 1 == 16
+    assert gate.stats.gated == 100 - 6
+    assert gate.stats.utterances == 1
+
+
+def test_energy_gate_closes_on_steady_noise_above_min_db() -> None:
+    rng = np.random.default_rng(0)
+    # ~-44 dBFS, above min_db (-50) and the initial floor (-60).
+    noise = [(rng.standard_normal(BLOCK) * 10 ** (-44 / 20)).astype(np.float32)
+             for _ in range(2000)]
+    gate = EnergyGate(sample_rate=SR, block_ms=64, max_speech_ms=15000)
+
+    out: list[np.ndarray | None] = []
+    for block in noise:
+        out.extend(gate.process(block))
+
+    assert not gate.in_speech
+    assert any(item is UTTERANCE_END for item in out)
+    assert gate.stats.passed <= 15000 // 64 + 2
+    assert gate.noise_floor > -46.0
+    # The floor learned the room: the tail of the run is gated.
+    assert gate.process(noise[0]) == []
+
+
+def test_long_dictation_does_not_gate_the_next_quiet_utterance() -> None:
+    rng = np.random.default_rng(0)
+
+    def at(db: float) -> np.ndarray:
+        return (rng.standard_normal(BLOCK) * 10 ** (db / 20)).astype(np.float32)
+
+    gate = EnergyGate(sample_rate=SR, block_ms=64, max_speech_ms=15000)
+    # 20 s of dictation: syllables and soft consonants between -20 and -40 dBFS.
+    for level in rng.uniform(-40.0, -20.0, 20000 // 64):
+        gate.process(at(level))
+    for _ in range(1000 // 64):  # a second of quiet room
+        gate.process(at(-70.0))
+    floor = gate.noise_floor
+
+    out = gate.process(at(-38.0))  # quiet speech
+    assert out and gate.in_speech
+    assert floor < -45.0
+
+
+def test_pipeline_decodes_tone_bursts_from_a_source() -> None:
+    def transcribe(audio: np.ndarray, _prompt: str) -> list[Word]:
+        return [Word(f" w{i}", float(i), i + 0.5) for i in range(len(audio) // SR)]
+
+    committed: list[str] = []
+    pipeline = AsrPipeline(transcribe, dict(DEFAULTS),
+                           lambda words: committed.extend(w.word for w in words))
+    stop = threading.Event()
+    worker = threading.Thread(target=pipeline.run, args=(stop,), daemon=True)
+    worker.start()
+    source = ToneSource(seconds=9.0, on_sec=2.0, off_sec=1.0, sample_rate=SR, block_ms=64)
+    source.run(lambda b: pipeline.on_block(b, block=True), stop)
+    pipeline.drain()
+    stop.set()
+    worker.join()
+
+    assert committed
+    assert pipeline.stats.dropped == 0
+    assert pipeline.gate is not None and pipeline.gate.stats.utterances == 3
+    # One onset → first-words latency per utterance that produced words.
+    assert 1 <= len(pipeline.stats.first_partial_sec) <= 3
+
+
+def test_wav_source_converts_to_mono_float_at_target_rate(tmp_path: Path) -> None:
+    path = tmp_path / "stereo.wav"
+    pcm = (np.sin(np.linspace(0, 100, 8000)) * 16000).astype(np.int16)
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(np.repeat(pcm, 2).tobytes())
+
+    source = WavSource(path, sample_rate=SR, block_ms=64)
+    assert source.samples.dtype == np.float32
+    assert source.duration_sec == 1.0
+    blocks: list[np.ndarray] = []
+    source.run(blocks.append, threading.Event())
+    assert sum(len(b) for b in blocks) == SR
+    assert np.abs(source.samples).max() <= 0.5
@@ -0,0 +1,127 @@
+"""ASR warm start: model manifest, background loader, start-up backlog."""
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from services.asr.server import DEFAULTS, AsrPipeline
+from services.asr.streaming import Word
+from services.asr.warmstart import ModelLoader, ModelManifest, default_manifest_path
+
+SR = 16000
+
+
+class Hub:
+    """Fake ``download_model`` / ``WhisperModel`` pair writing model dirs under ``root``."""
+
+    def __init__(self, root: Path, load_sec: float = 0.0) -> None:
+        self.root = root
+        self.load_sec = load_sec
+        self.downloads: list[str] = []
+        self.loads: list[Path] = []
+        self.broken: set[Path] = set()
+
+    def download(self, name: str) -> Path:
+        self.downloads.append(name)
+        path = self.root / name
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "model.bin").write_bytes(b"weights")
+        return path
+
+    def factory(self, path: Path, device: str, compute_type: str) -> object:
+        self.loads.append(path)
+        if path in self.broken:
+            raise RuntimeError("corrupt model.bin")
+        time.sleep(self.load_sec)
+        return object()
+
+    def loader(self, manifest: ModelManifest, **kwargs) -> ModelLoader:
+        return ModelLoader("small.en", device="cpu", compute_type="int8", manifest=manifest,
+                           download=self.download, factory=self.factory, **kwargs).start()
+
+
+def test_manifest_skips_resolution_on_the_next_start(tmp_path: Path) -> None:
+    hub, path = Hub(tmp_path / "hub"), tmp_path / "manifest.json"
+    warmed: list[object] = []
+
+    first = hub.loader(ModelManifest(path), warmup=warmed.append)
+    model = first.wait(timeout=5)
+    assert warmed == [model] and not first.times.manifest_hit
+    assert hub.downloads == ["small.en"]
+
+    second = hub.loader(ModelManifest(path))
+    second.wait(timeout=5)
+    assert second.times.manifest_hit and second.times.resolve_sec == 0.0
+    assert hub.downloads == ["small.en"]
+    assert hub.loads == [tmp_path / "hub" / "small.en"] * 2
+
+
+def test_stale_manifest_entry_falls_back_to_resolution(tmp_path: Path) -> None:
+    hub, path = Hub(tmp_path / "hub"), tmp_path / "manifest.json"
+    hub.loader(ModelManifest(path)).wait(timeout=5)
+    hub.broken.add(tmp_path / "hub" / "small.en")
+
+    with pytest.raises(RuntimeError, match="corrupt"):
+        hub.loader(ModelManifest(path)).wait(timeout=5)
+    assert hub.downloads == ["small.en", "small.en"]
+
+    manifest = ModelManifest(path)
+    manifest.record("base.en", tmp_path / "gone")
+    assert manifest.lookup("base.en") is None
+    path.write_text("not json")
+    assert ModelManifest(path).entries == {}
+
+
+def test_loader_reports_time_to_ready(tmp_path: Path) -> None:
+    hub = Hub(tmp_path / "hub", load_sec=0.1)
+    loader = hub.loader(ModelManifest(None), warmup=lambda model: time.sleep(0.05))
+    with pytest.raises(TimeoutError):
+        loader.wait(timeout=0.01)
+    loader.wait(timeout=5)
+
+    times = loader.times
+    assert times.load_sec >= 0.1 and times.warmup_sec >= 0.05
+    assert times.time_to_ready_sec >= times.load_sec + times.warmup_sec
+    assert set(times.as_dict()) == {"manifest_hit", "resolve_sec", "load_sec", "warmup_sec",
+                                    "time_to_ready_sec"}
+
+
+def test_default_manifest_path(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.delenv("GAINS_ASR_MANIFEST", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert default_manifest_path() == tmp_path / "gains" / "asr-models.json"
+    monkeypatch.setenv("GAINS_ASR_MANIFEST", "off")
+    assert default_manifest_path() is None
+
+
+def test_audio_buffered_before_the_model_is_ready_is_decoded_once_per_utterance() -> None:
+    calls: list[int] = []
+
+    def transcribe(audio: np.ndarray, _prompt: str) -> list[Word]:
+        calls.append(len(audio))
+        return [Word(f" w{i}", float(i), i + 0.5) for i in range(len(audio) // SR)]
+
+    committed: list[str] = []
+    cfg = {**DEFAULTS, "vad_gate": False}
+    pipeline = AsrPipeline(transcribe, cfg, lambda words: committed.extend(w.word for w in words))
+    block = np.zeros(SR * cfg["block_ms"] // 1000, dtype=np.float32)
+    for _ in range(5 * SR // len(block)):  # ~5 s captured while "loading"
+        pipeline.on_block(block)
+    assert pipeline.queued_sec == pytest.approx(5.0, abs=0.1)
+    pipeline.queue.put((time.monotonic(), None))  # utterance end
+
+    stop = threading.Event()
+    worker = threading.Thread(target=pipeline.run, args=(stop,), daemon=True)
+    worker.start()
+    pipeline.queue.join()
+    stop.set()
+    worker.join()
+
+    # One decode for the backlog instead of one per 1 s hop; the end flushes it.
+    assert len(calls) == 1 and calls[0] >= 4.9 * SR
+    assert committed == [f" w{i}" for i in range(4)]
+    assert pipeline.stats.dropped == 0
@@ -0,0 +1,28 @@
+"""Replay harness (scripts/bench.py): synthetic stream shape and sink stats."""
+from __future__ import annotations
+
+from scripts.bench import Sink, synthetic
+
+
+def test_synthetic_stream_is_ordered_speech_nod_commit() -> None:
+    events = list(synthetic(utterances=3, words=4))
+    topics = [msg["event"] for _, msg in events]
+    assert topics == (["asr.partial"] * 4 + ["gesture.nod", "text.committed"]) * 3
+    offsets = [t for t, _ in events]
+    assert offsets == sorted(offsets)
+
+
+def test_sink_measures_topics_and_rewrite_round_trip() -> None:
+    sink = Sink()
+    sink.observe({"event": "asr.partial", "bench_ns": 1_000_000}, now_ns=3_000_000)
+    sink.observe({"event": "text.committed", "ts": 42.0, "bench_ns": 5_000_000}, now_ns=6_000_000)
+    sink.observe({"event": "plugin.rewrite", "orig_ts": 42.0}, now_ns=25_000_000)
+    # Not replayed by us: no send stamp, nothing to measure.
+    sink.observe({"event": "plugin.rewrite", "orig_ts": 7.0}, now_ns=30_000_000)
+    sink.observe({"event": "gesture.nod"}, now_ns=30_000_000)
+
+    summary = sink.summary()
+    assert sink.count == 3
+    assert summary["asr.partial"]["p50_ms"] == 2.0
+    assert summary["text.committed"]["p50_ms"] == 1.0
+    assert summary["plugin.rewrite"]["p50_ms"] == 20.0
@@ -0,0 +1,61 @@
+"""Wire-format tests for services/bus/protocol.py and services/bus/codec.py."""
+from __future__ import annotations
+
+import json
+
+import pytest
+import zmq
+
+from services.bus.codec import CODECS, UnknownCodecError, get_codec
+from services.bus.protocol import decode, encode, recv, reframe, unframe
+
+MSG = {
+    "event": "asr.partial",
+    "text": " hello world",
+    "ts": 1700000000.25,
+    "confidence": -0.31,
+    "start": 0.0,
+    "end": 0.9,
+    "words": [{"word": " hello", "start": 0.0, "end": 0.4},
+              {"word": " world", "start": 0.5, "end": 0.9}],
+}
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_codec_round_trip(name: str) -> None:
+    frames = encode(MSG, get_codec(name))
+    assert frames[:2] == [b"asr.partial", name.encode()]
+    assert decode(frames) == MSG
+
+
+def test_decode_accepts_untagged_and_legacy_frames() -> None:
+    payload = json.dumps(MSG).encode()
+    assert decode([b"asr.partial", payload]) == MSG
+    assert decode([payload]) == MSG
+    assert reframe([payload]) == [b"asr.partial", b"json", payload]
+    assert reframe([b"asr.partial", b"json", payload]) == [b"asr.partial", b"json", payload]
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_unframe_gives_legacy_subscribers_one_json_frame(name: str) -> None:
+    assert json.loads(unframe(encode(MSG, get_codec(name)))) == MSG
+    payload = json.dumps(MSG).encode()
+    assert unframe([payload]) == payload
+
+
+def test_recv_skips_unknown_codec() -> None:
+    with pytest.raises(UnknownCodecError):
+        decode([b"asr.partial", b"cbor", b"\xa0"])
+
+    ctx = zmq.Context.instance()
+    a, b = ctx.socket(zmq.PAIR), ctx.socket(zmq.PAIR)
+    a.bind("inproc://test-recv-skips")
+    b.connect("inproc://test-recv-skips")
+    try:
+        a.send_multipart([b"asr.partial", b"cbor", b"\xa0"])
+        a.send_multipart(encode(MSG))
+        b.setsockopt(zmq.RCVTIMEO, 1000)
+        assert recv(b) == MSG
+    finally:
+        a.close()
+        b.close()
@@ -6,6 +6,7 @@ exercises the architectural fix in services/bus/hub.py.
 """
 from __future__ import annotations
 
+import json
 import threading
 import time
 
@@ -65,6 +66,174 @@ def test_proxy_round_trip(free_port: int) -> None:
         t.join(timeout=2)
 
 
+def test_hub_filters_topics_and_reframes_legacy(free_port: int) -> None:
+    from services.bus.hub import run_proxy
+    from services.bus.protocol import publish, recv, subscribe
+
+    pub_port, sub_port = free_port, free_port + 1
+    ctx = zmq.Context.instance()
+    xsub = ctx.socket(zmq.XSUB)
+    xsub.bind(f"tcp://127.0.0.1:{sub_port}")
+    xpub = ctx.socket(zmq.XPUB)
+    xpub.bind(f"tcp://127.0.0.1:{pub_port}")
+    stop = threading.Event()
+    t = threading.Thread(target=run_proxy, args=(xsub, xpub, stop), daemon=True)
+    t.start()
+    try:
+        pub = ctx.socket(zmq.PUB)
+        pub.connect(f"tcp://127.0.0.1:{sub_port}")
+        legacy = ctx.socket(zmq.PUB)
+        legacy.connect(f"tcp://127.0.0.1:{sub_port}")
+        sub = ctx.socket(zmq.SUB)
+        sub.connect(f"tcp://127.0.0.1:{pub_port}")
+        subscribe(sub, "text.committed")
+        sub.setsockopt(zmq.RCVTIMEO, 2000)
+        time.sleep(0.3)  # subscription propagation
+
+        publish(pub, {"event": "heartbeat", "ts": 0})
+        publish(pub, {"event": "text.committed", "text": "framed"})
+        legacy.send_json({"event": "asr.partial", "text": "nope"})
+        legacy.send_json({"event": "text.committed", "text": "legacy"})
+
+        first = sub.recv_multipart()
+        assert first[0] == b"text.committed"
+        texts = {recv(sub)["text"], json.loads(first[-1])["text"]}
+        assert texts == {"framed", "legacy"}
+        with pytest.raises(zmq.Again):
+            sub.recv_multipart(zmq.NOBLOCK)
+
+        for s in (pub, legacy, sub):
+            s.close()
+    finally:
+        stop.set()
+        t.join(timeout=2)
+        xsub.close()
+        xpub.close()
+
+
+def test_legacy_endpoint_serves_recv_json_subscribers(free_port: int) -> None:
+    from services.bus.hub import run_proxy
+    from services.bus.protocol import publish, recv, subscribe
+
+    pub_port, sub_port, legacy_port = free_port, free_port + 1, free_port + 2
+    ctx = zmq.Context.instance()
+    xsub = ctx.socket(zmq.XSUB)
+    xsub.bind(f"tcp://127.0.0.1:{sub_port}")
+    xpub = ctx.socket(zmq.XPUB)
+    xpub.bind(f"tcp://127.0.0.1:{pub_port}")
+    legacy_xpub = ctx.socket(zmq.XPUB)
+    legacy_xpub.bind(f"tcp://127.0.0.1:{legacy_port}")
+    stop = threading.Event()
+    t = threading.Thread(target=run_proxy, args=(xsub, xpub, stop, legacy_xpub), daemon=True)
+    t.start()
+    try:
+        pub = ctx.socket(zmq.PUB)
+        pub.connect(f"tcp://127.0.0.1:{sub_port}")
+        legacy_pub = ctx.socket(zmq.PUB)
+        legacy_pub.connect(f"tcp://127.0.0.1:{sub_port}")
+        old = ctx.socket(zmq.SUB)
+        old.connect(f"tcp://127.0.0.1:{legacy_port}")
+        old.setsockopt_string(zmq.SUBSCRIBE, "")
+        old.setsockopt(zmq.RCVTIMEO, 2000)
+        sub = ctx.socket(zmq.SUB)
+        sub.connect(f"tcp://127.0.0.1:{pub_port}")
+        subscribe(sub, "text.committed")
+        sub.setsockopt(zmq.RCVTIMEO, 2000)
+        time.sleep(0.3)  # subscription propagation
+
+        publish(pub, {"event": "asr.partial", "text": "framed"})
+        legacy_pub.send_json({"event": "text.committed", "text": "legacy"})
+
+        received = [old.recv_json() for _ in range(2)]
+        assert {m["text"] for m in received} == {"framed", "legacy"}
+        # The topic-filtered subscriber still only sees its topic, framed.
+        assert recv(sub)["text"] == "legacy"
+        with pytest.raises(zmq.Again):
+            sub.recv_multipart(zmq.NOBLOCK)
+
+        for s in (pub, legacy_pub, old, sub):
+            s.close()
+    finally:
+        stop.set()
+        t.join(timeout=2)
+        xsub.close()
+        xpub.close()
+        legacy_xpub.close()
+
+
+def test_bus_client_round_trip_sync_and_async(free_port: int) -> None:
+    import asyncio
+
+    from services.bus.client import BusClient, BusConfig
+    from services.bus.hub import run_proxy
+    from services.bus.protocol import recv
+
+    cfg = BusConfig(
+        publish_to=f"tcp://127.0.0.1:{free_port + 1}",
+        subscribe_to=f"tcp://127.0.0.1:{free_port}",
+        xsub_bind=f"tcp://127.0.0.1:{free_port + 1}",
+        xpub_bind=f"tcp://127.0.0.1:{free_port}",
+    )
+    bus = BusClient(cfg, zmq.Context())
+    xsub = bus.socket(zmq.XSUB)
+    xsub.bind(cfg.xsub_bind)
+    xpub = bus.socket(zmq.XPUB)
+    xpub.bind(cfg.xpub_bind)
+    stop = threading.Event()
+    t = threading.Thread(target=run_proxy, args=(xsub, xpub, stop), daemon=True)
+    t.start()
+    try:
+        sub = bus.subscriber("gesture.nod")
+        sub.setsockopt(zmq.RCVTIMEO, 2000)
+        bus.publisher()  # connect before the first publish (slow joiner)
+        time.sleep(0.3)
+        for i in range(3):
+            bus.publish({"event": "gesture.nod", "i": i})
+        assert [recv(sub)["i"] for _ in range(3)] == [0, 1, 2]
+
+        async def first_async() -> dict:
+            it = bus.alisten("tts.play")
+            task = asyncio.ensure_future(it.__anext__())
+            await asyncio.sleep(0.3)
+            bus.publish({"event": "tts.play", "text": "hi"})
+            try:
+                return await asyncio.wait_for(task, 2)
+            finally:
+                await it.aclose()
+
+        assert asyncio.run(first_async())["text"] == "hi"
+    finally:
+        stop.set()
+        t.join(timeout=2)
+        bus.term()
+
+
+@pytest.mark.parametrize("transport", ["ipc", "inproc"])
+def test_hub_serves_local_transports(transport: str, tmp_path) -> None:
+    from services.bus.client import BusClient, BusConfig
+    from services.bus.hub import serve
+    from services.bus.protocol import recv
+
+    ctx = zmq.Context()
+    bus = BusClient(BusConfig.for_transport(transport, tmp_path), ctx, shared=True)
+    ready = threading.Event()
+    t = threading.Thread(target=serve, args=(bus, (), ready), daemon=True)
+    t.start()
+    assert ready.wait(2)
+    sub = bus.subscriber("text.committed")
+    sub.setsockopt(zmq.RCVTIMEO, 2000)
+    bus.publisher()
+    time.sleep(0.2)
+    bus.publish({"event": "text.committed", "text": transport})
+    assert recv(sub)["text"] == transport
+
+    # Terminating the shared context stops the hub thread cleanly.
+    bus.close()
+    ctx.term()
+    t.join(timeout=2)
+    assert not t.is_alive()
+
+
 def test_runner_discover_finds_plugins() -> None:
     from services.plugins.runner import discover
 
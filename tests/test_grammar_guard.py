@@ -0,0 +1,154 @@
+"""grammar_guard against a local OpenAI-compatible stub with injected latency."""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from plugins.grammar_guard.plugin import BatchStats, GrammarGuard, parse_batch  # noqa: E402
+from services.plugins.cache import RewriteCache  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """``POST /v1/chat/completions``: sleeps ``latency`` (or ``slow`` for texts
+    containing "slow") and answers with the user text capitalised. JSON-mode
+    batch requests get ``{"rewrites": [...]}`` back, or garbage if any text
+    contains "garble"."""
+
+    latency = 0.2
+    slow = 5.0
+    requests = 0
+
+    def do_POST(self) -> None:
+        type(self).requests += 1
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        text = body["messages"][-1]["content"]
+        time.sleep(self.slow if "slow" in text else self.latency)
+        if "response_format" in body:
+            texts = json.loads(text)["texts"]
+            content = "not json" if any("garble" in t for t in texts) else json.dumps(
+                {"rewrites": [t.capitalize() + "." for t in texts]})
+        else:
+            content = text.capitalize() + "."
+        payload = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *_args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_url() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+
+
+def _run(stub_url: str, texts: list[str], **kwargs: Any) -> tuple[list[dict], float]:
+    published: list[dict] = []
+
+    async def go() -> float:
+        client = openai.AsyncOpenAI(api_key="test", base_url=stub_url, max_retries=0)
+        guard = GrammarGuard(client, published.append, model="stub", **kwargs)
+        start = time.perf_counter()
+        for i, text in enumerate(texts):
+            guard.submit({"event": "text.committed", "text": text, "ts": float(i)})
+        await guard.drain()
+        await client.close()
+        return time.perf_counter() - start
+
+    return published, asyncio.run(go())
+
+
+def test_requests_run_concurrently_and_are_keyed_by_orig_ts(stub_url: str) -> None:
+    texts = [f"note number {i}" for i in range(8)]
+    published, elapsed = _run(stub_url, texts, max_in_flight=4, timeout_sec=5.0)
+
+    assert elapsed < 8 * StubHandler.latency * 0.75  # 2 waves of 4, not 8 in series
+    assert {m["orig_ts"]: m["text"] for m in published} == {
+        float(i): f"Note number {i}." for i in range(8)
+    }
+
+
+def test_slow_request_times_out_without_blocking_others(stub_url: str) -> None:
+    published, elapsed = _run(stub_url, ["this one is slow", "fast one"],
+                              max_in_flight=2, timeout_sec=0.5)
+
+    assert [m["orig_ts"] for m in published] == [1.0]
+    assert elapsed < 2.0
+
+
+def test_cache_hits_skip_the_request_and_publish_immediately(stub_url: str) -> None:
+    cache = RewriteCache(None)
+    _run(stub_url, ["todo call bob"], cache=cache)
+    before = StubHandler.requests
+    published: list[dict] = []
+
+    async def go() -> None:
+        guard = GrammarGuard(None, published.append, model="stub", cache=cache)
+        guard.submit({"event": "text.committed", "text": "todo call bob", "ts": 7.0})
+        assert published  # inside submit, before the event loop ran anything
+
+    asyncio.run(go())
+
+    assert StubHandler.requests == before
+    assert published[0]["orig_ts"] == 7.0 and published[0]["text"] == "Todo call bob."
+    assert cache.stats.memory_hits == 1
+
+
+def test_batching_groups_commits_and_splits_by_orig_ts(stub_url: str) -> None:
+    before = StubHandler.requests
+    published, _ = _run(stub_url, [f"note number {i}" for i in range(8)],
+                        batch_window_sec=0.05, batch_max=4)
+
+    assert StubHandler.requests - before == 2
+    assert {m["orig_ts"]: m["text"] for m in published} == {
+        float(i): f"Note number {i}." for i in range(8)
+    }
+
+
+def test_unparseable_batch_falls_back_to_single_requests(stub_url: str) -> None:
+    before = StubHandler.requests
+    published, _ = _run(stub_url, ["garble this", "and this"], batch_window_sec=0.05)
+
+    assert StubHandler.requests - before == 3  # one batch + two singles
+    assert {m["orig_ts"]: m["text"] for m in published} == {0.0: "Garble this.", 1.0: "And this."}
+
+
+def test_parse_batch_rejects_mismatched_replies() -> None:
+    assert parse_batch('{"rewrites": [" A. ", "B."]}', 2) == ["A.", "B."]
+    for bad in ('{"rewrites": ["A."]}', '["A.", "B."]', '{"rewrites": [1, 2]}', "nope", None):
+        with pytest.raises(ValueError):
+            parse_batch(bad, 2)
+
+
+def test_batch_stats_summary() -> None:
+    stats = BatchStats()
+    for size, sec in ((4, 0.2), (4, 0.3), (1, 0.1), (8, 0.9)):
+        stats.record(size, sec)
+
+    assert stats.count == 4
+    assert stats.summary() == "batches=4 sizes[1:1 4:2 8:1] p50=300ms p95=900ms fallbacks=0"
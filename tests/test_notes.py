@@ -0,0 +1,223 @@
+"""Tests for the note exporter: session store, journal, writer and search index."""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+import zmq
+
+from services.bus.client import BusClient, BusConfig, set_client
+from services.notes.exporter import COMMIT_FLUSH_AFTER, JOURNAL_NAME, NoteExporter, main
+from services.notes.journal import Journal, replay
+from services.notes.search import INDEX_NAME, NoteIndex
+from services.notes.session import SessionStore
+from services.notes.writer import LatencyHistogram
+
+
+@pytest.fixture(autouse=True)
+def bus() -> Iterator[BusClient]:
+    ctx = zmq.Context()
+    client = BusClient(BusConfig.for_transport("inproc"), ctx)
+    set_client(client)
+    yield client
+    client.term()
+
+
+def _speak(exporter: NoteExporter, text: str, ts: float) -> None:
+    exporter._handle({"event": "asr.partial", "text": text, "ts": ts, "confidence": -0.2})
+
+
+def test_journal_replays_records_and_drops_torn_tail(tmp_path: Path) -> None:
+    path = tmp_path / "j.jsonl"
+    journal = Journal(path, fsync_every=2)
+    for i in range(3):
+        journal.append({"event": "asr.partial", "i": i})
+    journal.close()
+    with path.open("ab") as f:
+        f.write(b'{"event": "asr.par')  # crash mid-write
+
+    assert [r["i"] for r in replay(path)] == [0, 1, 2]
+    journal = Journal(path)
+    journal.append({"event": "asr.partial", "i": 3})
+    journal.close()
+    assert [r["i"] for r in replay(path)] == [0, 1, 2, 3]
+
+
+def test_rotate_does_not_wait_for_a_slow_fsync(tmp_path: Path,
+                                               monkeypatch: pytest.MonkeyPatch) -> None:
+    release, syncing = threading.Event(), threading.Event()
+    real_fsync = os.fsync
+
+    def slow_fsync(fd: int) -> None:
+        syncing.set()
+        release.wait(5)
+        real_fsync(fd)
+
+    journal = Journal(tmp_path / "j", fsync_every=1000, fsync_interval_sec=3600)
+    journal.append({"event": "asr.partial", "i": 0})
+    monkeypatch.setattr(os, "fsync", slow_fsync)
+    syncer = threading.Thread(target=journal.sync)
+    syncer.start()
+    assert syncing.wait(5)
+
+    start = time.perf_counter()
+    journal.rotate(tmp_path / "sealed")
+    journal.append({"event": "asr.partial", "i": 1})
+    assert time.perf_counter() - start < 0.5
+    release.set()
+    syncer.join()
+    journal.close()
+    assert [r["i"] for r in replay(tmp_path / "sealed")] == [0]
+    assert [r["i"] for r in replay(tmp_path / "j")] == [1]
+
+
+def test_open_session_survives_a_crash(tmp_path: Path) -> None:
+    t0 = time.time()
+    exporter = NoteExporter(tmp_path)
+    _speak(exporter, "first thought", t0)
+    exporter._handle({"event": "gesture.nod", "ts": t0 + 1})
+    _speak(exporter, "second thought", t0 + 2)
+    exporter._handle({"event": "plugin.rewrite", "text": "Second thought.", "plugin": "g",
+                      "orig_ts": t0 + 2, "ts": t0 + 3})
+    # No flush, no close: the process dies here.
+
+    recovered = NoteExporter(tmp_path)
+    texts = [(e.text, e.committed) for e in recovered.session.entries]
+    assert texts == [("first thought", True), ("Second thought.", False)]
+    assert recovered.session.start == t0
+
+    recovered._flush()
+    recovered.writer.close()
+    exported = json.loads(next(tmp_path.glob("gains_notes_*.json")).read_text())
+    assert exported["committed_entries"] == 1
+    assert list(replay(tmp_path / JOURNAL_NAME)) == []
+    assert not list(tmp_path.glob(".session.*.journal"))
+    assert not NoteExporter(tmp_path).session
+
+
+def test_sealed_session_is_exported_after_a_crash(tmp_path: Path) -> None:
+    t0 = time.time()
+    exporter = NoteExporter(tmp_path)
+    exporter.writer.close()  # writer "dies" before exporting anything
+    _speak(exporter, "one", t0)
+    exporter._handle({"event": "text.committed", "ts": t0 + 1})
+    _speak(exporter, "two", t0 + 2)
+    exporter._flush()
+    assert len(list(tmp_path.glob(".session.*.journal"))) == 1
+    assert not list(tmp_path.glob("gains_notes_*"))
+
+    recovered = NoteExporter(tmp_path)
+    recovered.writer.close()
+    exported = json.loads(next(tmp_path.glob("gains_notes_*.json")).read_text())
+    assert [e["text"] for e in exported["entries"]] == ["one", "two"]
+    assert exported["end_time"] == t0 + 2
+    assert not list(tmp_path.glob(".session.*.journal"))
+    assert {p.suffix for p in tmp_path.glob("gains_notes_*")} == {".txt", ".md", ".json"}
+
+
+def test_flush_latency_histogram() -> None:
+    hist = LatencyHistogram()
+    for ms in (0.5, 3, 3, 4, 40, 900):
+        hist.record(ms / 1000)
+    assert hist.total == 6
+    assert hist.percentile(0.5) == 5.0
+    assert hist.percentile(0.95) == 1000.0
+    assert hist.max_ms == 900.0
+
+
+def test_session_store_matches_rewrites_by_orig_ts() -> None:
+    store = SessionStore()
+    store.add("call bob", 10.0)
+    assert store.commit(11.0).text == "call bob"
+    store.add("buy milk", 12.0)
+    store.add("ship it", 13.0)
+    assert store.commit(14.0).text == "ship it"  # most recent uncommitted
+    assert store.committed == 2
+
+    # A slow plug-in answers the first commit after newer speech arrived.
+    store.rewrite("Call Bob.", orig_ts=11.0, plugin="grammar_guard")
+    store.rewrite("Buy milk.", orig_ts=12.0, plugin="grammar_guard")
+    store.rewrite("Ship it!", orig_ts=None, plugin="legacy")  # no orig_ts: newest entry
+    assert [e.text for e in store.entries] == ["Call Bob.", "Buy milk.", "Ship it!"]
+    first = store.to_dicts()[0]
+    assert first["original"] == "call bob" and first["rewritten_by"] == "grammar_guard"
+    assert first["committed"] is True and first["commit_ts"] == 11.0
+    assert "committed" not in store.to_dicts()[1]
+
+
+def test_late_rewrite_for_a_flushed_session_is_dropped() -> None:
+    # The rewrite of the commit that flushed the last session arrives after
+    # speech has started in the new one.
+    store = SessionStore()
+    store.add("new sentence", 20.0)
+
+    assert store.rewrite("Old sentence, fixed.", orig_ts=11.0, plugin="grammar_guard") is None
+    assert [e.text for e in store.entries] == ["new sentence"]
+    assert store.entries[0].original is None
+
+
+def test_rewrite_of_the_flushing_commit_reaches_the_export(tmp_path: Path) -> None:
+    t0 = time.time()
+    exporter = NoteExporter(tmp_path)
+    for i in range(COMMIT_FLUSH_AFTER):
+        _speak(exporter, f"note {i}", t0 + 2 * i)
+        exporter._handle({"event": "text.committed", "ts": t0 + 2 * i + 1})
+    assert not exporter.session  # the 5th commit closed the session ...
+    _speak(exporter, "next session", t0 + 20)
+    last_commit = t0 + 2 * COMMIT_FLUSH_AFTER - 1
+    exporter._handle({"event": "plugin.rewrite", "text": "Note 4.", "plugin": "grammar_guard",
+                      "orig_ts": last_commit, "ts": t0 + 21})  # ... before its rewrite came
+
+    [sealed] = tmp_path.glob(".session.*.journal")
+    assert [r.get("orig_ts") for r in replay(sealed)][-1] == last_commit
+    assert [e.text for e in exporter.session.entries] == ["next session"]
+    assert not list(tmp_path.glob("gains_notes_*"))  # held for the grace period
+    exporter._export_due(force=True)
+    exporter.writer.close()
+    exported = json.loads(next(tmp_path.glob("gains_notes_*.json")).read_text())
+    assert exported["entries"][-1]["text"] == "Note 4."
+    assert exported["entries"][-1]["original"] == "note 4"
+
+
+def test_flushed_sessions_are_searchable(tmp_path: Path) -> None:
+    t0 = time.time()
+    exporter = NoteExporter(tmp_path)
+    _speak(exporter, "call bob about the demo", t0)
+    exporter._handle({"event": "text.committed", "ts": t0 + 1})
+    exporter._handle({"event": "plugin.rewrite", "text": "Call Bob about the demo.",
+                      "plugin": "grammar_guard", "orig_ts": t0 + 1, "ts": t0 + 2})
+    _speak(exporter, "don't ship the demo yet", t0 + 3)  # never committed
+    exporter._flush()
+    exporter.writer.close()
+
+    index = NoteIndex(tmp_path / INDEX_NAME)
+    [hit] = index.search("demo")
+    assert hit.text == "Call Bob about the demo."
+    assert hit.original == "call bob about the demo"
+    assert hit.rewritten_by == "grammar_guard"
+    assert "[demo]" in hit.snippet
+    assert len(index.search("demo", committed_only=False)) == 2
+    assert len(index.search("don't")) == 0  # quotes are safe, uncommitted filtered
+    assert index.search("demos")  # porter stemming
+
+    # Rebuilding from the JSON exports gives the same answers.
+    assert index.reindex(tmp_path) == (1, 2)
+    assert [h.session_id for h in index.search("bob")] == [hit.session_id]
+    index.close()
+
+
+def test_invalid_raw_query_is_a_one_line_error(tmp_path: Path, monkeypatch: pytest.MonkeyPatch,
+                                                capsys: pytest.CaptureFixture[str]) -> None:
+    monkeypatch.setattr(sys, "argv", ["gains-notes", "--output-dir", str(tmp_path),
+                                      "search", "--raw", "AND"])
+    with pytest.raises(SystemExit) as exc:
+        main()
+    assert exc.value.code != 0
+    assert str(exc.value.code).startswith("invalid FTS5 query: fts5: syntax error")
+    assert "Traceback" not in capsys.readouterr().err
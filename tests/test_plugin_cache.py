@@ -0,0 +1,88 @@
+"""Rewrite cache: keying, LRU, disk persistence, TTL and size eviction."""
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+from services.plugins.cache import RewriteCache, cache_key
+
+ARGS = ("grammar_guard", "gpt-4o-mini", "Fix grammar.")
+
+
+def test_key_covers_every_field() -> None:
+    base = cache_key(*ARGS, "todo call bob")
+    assert cache_key(*ARGS, "todo call bob") == base
+    assert cache_key("other", *ARGS[1:], "todo call bob") != base
+    assert cache_key(ARGS[0], "gpt-4o", ARGS[2], "todo call bob") != base
+    assert cache_key(*ARGS[:2], "Other prompt.", "todo call bob") != base
+    assert cache_key(*ARGS, "todo call bob.") != base
+
+
+def test_memory_lru_evicts_least_recently_used() -> None:
+    cache = RewriteCache(None, memory_items=2)
+    cache.put(*ARGS, "a", "A")
+    cache.put(*ARGS, "b", "B")
+    assert cache.get(*ARGS, "a") == "A"  # a is now most recent
+    cache.put(*ARGS, "c", "C")
+
+    assert cache.get(*ARGS, "b") is None
+    assert cache.get(*ARGS, "a") == "A"
+    assert cache.get(*ARGS, "c") == "C"
+    assert (cache.stats.memory_hits, cache.stats.misses) == (3, 1)
+
+
+def test_disk_tier_survives_restart_and_promotes(tmp_path: Path) -> None:
+    path = tmp_path / "rewrites.sqlite"
+    cache = RewriteCache(path)
+    cache.put(*ARGS, "new paragraph", "New paragraph.")
+    cache.close()
+
+    cache = RewriteCache(path)
+    assert cache.get(*ARGS, "new paragraph") == "New paragraph."
+    assert cache.get(*ARGS, "new paragraph") == "New paragraph."
+    assert (cache.stats.disk_hits, cache.stats.memory_hits) == (1, 1)
+    assert "hit_rate=100%" in cache.stats.summary()
+    cache.close()
+
+
+def test_ttl_expires_both_tiers(tmp_path: Path) -> None:
+    path = tmp_path / "rewrites.sqlite"
+    cache = RewriteCache(path, ttl_sec=0.05)
+    cache.put(*ARGS, "old", "Old.")
+    time.sleep(0.1)
+
+    assert cache.get(*ARGS, "old") is None
+    assert cache.prune() == 1
+    cache.close()
+
+
+def test_disk_size_bound_drops_least_recently_used(tmp_path: Path) -> None:
+    cache = RewriteCache(tmp_path / "rewrites.sqlite", memory_items=1, max_entries=3,
+                         prune_every=1)
+    for word in ("a", "b", "c"):
+        cache.put(*ARGS, word, word.upper())
+    assert cache.get(*ARGS, "a") == "A"  # disk hit refreshes a
+    cache.put(*ARGS, "d", "D")
+
+    assert cache.stats.evicted == 1
+    assert cache.get(*ARGS, "b") is None
+    assert [cache.get(*ARGS, w) for w in "acd"] == ["A", "C", "D"]
+    cache.close()
+
+
+def test_phrase_only_hit_in_memory_is_not_evicted_first(tmp_path: Path) -> None:
+    path = tmp_path / "rewrites.sqlite"
+    cache = RewriteCache(path, memory_items=2, max_entries=3, prune_every=1000)
+    cache.put(*ARGS, "new paragraph", "New paragraph.")
+    for word in ("a", "b"):
+        cache.put(*ARGS, word, word.upper())
+        assert cache.get(*ARGS, "new paragraph") == "New paragraph."  # memory hit
+    assert cache.stats.disk_hits == 0
+    cache.put(*ARGS, "c", "C")
+    assert cache.prune() == 1
+
+    cache.close()
+    cache = RewriteCache(path, memory_items=2)
+    assert cache.get(*ARGS, "new paragraph") == "New paragraph."
+    assert cache.get(*ARGS, "a") is None  # the least recently used row went instead
+    cache.close()
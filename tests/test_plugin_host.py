@@ -0,0 +1,65 @@
+"""In-process plug-in host over an inproc hub."""
+from __future__ import annotations
+
+import threading
+import time
+from types import ModuleType
+
+import zmq
+
+from services.bus.client import BusClient, BusConfig
+from services.bus.hub import serve
+from services.bus.protocol import PLUGIN_REWRITE, TEXT_COMMITTED, recv
+from services.plugins.host import PluginHost, is_callback_plugin
+from services.plugins.runner import PLUGINS_DIR, load
+
+
+def test_callback_plugins_are_detected_without_importing() -> None:
+    assert is_callback_plugin(PLUGINS_DIR / "sample_rewriter" / "plugin.py")
+    assert not is_callback_plugin(PLUGINS_DIR / "grammar_guard" / "plugin.py")
+
+
+def test_sample_rewriter_on_event() -> None:
+    plugin = load(PLUGINS_DIR / "sample_rewriter" / "plugin.py")
+
+    assert plugin.on_event({"event": TEXT_COMMITTED, "text": "nothing here", "ts": 1.0}) == []
+    [event] = plugin.on_event({"event": TEXT_COMMITTED, "text": "todo call bob", "ts": 1.0})
+    assert (event["text"], event["orig_ts"]) == ("TODO call bob", 1.0)
+
+
+def test_host_dispatches_once_and_isolates_failures() -> None:
+    ctx = zmq.Context()
+    bus = BusClient(BusConfig.for_transport("inproc"), ctx, shared=True)
+    ready = threading.Event()
+    hub = threading.Thread(target=serve, args=(bus, (), ready), daemon=True)
+    hub.start()
+    assert ready.wait(2)
+
+    broken = ModuleType("broken")
+    broken.on_event = lambda msg: 1 / 0
+    host = PluginHost(bus, workers=2)
+    host.add("sample_rewriter", load(PLUGINS_DIR / "sample_rewriter" / "plugin.py"))
+    sample, failing = host.plugins[0], host.add("broken", broken)
+    assert host.topics == (TEXT_COMMITTED,)
+    runner = threading.Thread(target=host.run, daemon=True)
+    runner.start()
+
+    sub = bus.subscriber(PLUGIN_REWRITE)
+    sub.setsockopt(zmq.RCVTIMEO, 2000)
+    bus.publisher()
+    time.sleep(0.2)
+    bus.publish({"event": TEXT_COMMITTED, "text": "todo ship it", "ts": 3.0})
+    msg = recv(sub)
+
+    assert (msg["text"], msg["orig_ts"], msg["plugin"]) == ("TODO ship it", 3.0, "sample_rewriter")
+    assert "ts" in msg
+    deadline = time.monotonic() + 2
+    while failing.calls < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (sample.calls, sample.errors, failing.calls, failing.errors) == (1, 0, 1, 1)
+
+    bus.close()
+    ctx.term()
+    runner.join(timeout=5)
+    hub.join(timeout=2)
+    assert not runner.is_alive() and not hub.is_alive()
@@ -0,0 +1,145 @@
+"""TTS: PCM cache, speaker cache path, persistent pipe sink, streaming."""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import wave
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from services.tts.audio import Clip, NullSink, PcmFormat, PipeSink
+from services.tts.cache import PcmCache
+from services.tts.stream import split_chunks, stream
+from services.tts.voice import Speaker, piper_synth, write_wav
+
+FMT = PcmFormat(22050)
+
+
+def _clip(seconds: float) -> Clip:
+    return Clip(bytes(int(seconds * FMT.bytes_per_sec)), FMT)
+
+
+class SlowSynth:
+    def __init__(self, delay: float = 0.05) -> None:
+        self.delay = delay
+        self.calls: list[str] = []
+
+    def __call__(self, text: str) -> Clip:
+        self.calls.append(text)
+        time.sleep(self.delay)
+        return _clip(0.5)
+
+
+def test_pcm_cache_is_lru_bounded_by_bytes() -> None:
+    cache = PcmCache(max_bytes=3 * FMT.bytes_per_sec)
+    for text in ("a", "b", "c"):
+        cache.put("amy", text, _clip(1.0))
+    assert cache.get("amy", "a") is not None  # a is now most recent
+    cache.put("amy", "d", _clip(1.0))
+
+    assert cache.get("amy", "b") is None
+    assert cache.get("other-voice", "a") is None
+    assert len(cache) == 3 and cache.bytes == 3 * FMT.bytes_per_sec
+    assert (cache.hits, cache.misses, cache.evicted) == (1, 2, 1)
+    cache.put("amy", "huge", _clip(10.0))
+    assert cache.get("amy", "huge") is None
+
+
+def test_repeated_prompt_skips_synthesis_and_plays_in_milliseconds() -> None:
+    synth, sink = SlowSynth(), NullSink()
+    speaker = Speaker(synth, sink)
+    speaker.prewarm(["Are you done?"])
+
+    start = time.perf_counter()
+    speaker.speak("Are you done?")
+    assert sink.first_write - start < 0.005
+    speaker.speak("Are you done?")
+    speaker.speak("Something new.")
+
+    assert synth.calls == ["Are you done?", "Something new."]
+    assert sink.bytes_written == 3 * len(_clip(0.5).pcm)
+    assert speaker.cache.hits == 2
+
+
+def test_pipe_sink_keeps_one_player_per_format(tmp_path: Path) -> None:
+    out = tmp_path / "pcm"
+    seen: list[PcmFormat] = []
+
+    def command(fmt: PcmFormat) -> list[str]:
+        seen.append(fmt)
+        code = f"import sys; open({str(out)!r}, 'ab').write(sys.stdin.buffer.read())"
+        return [sys.executable, "-c", code]
+
+    sink = PipeSink(command)
+    sink.write(b"\x01\x00" * 100, FMT)
+    pid = sink.proc.pid
+    sink.write(b"\x02\x00" * 100, FMT)
+    assert sink.proc.pid == pid
+    sink.write(b"\x03\x00" * 100, PcmFormat(16000))
+    assert sink.proc.pid != pid
+    sink.close()
+
+    assert seen == [FMT, PcmFormat(16000)]
+    assert out.read_bytes() == b"\x01\x00" * 100 + b"\x02\x00" * 100 + b"\x03\x00" * 100
+
+
+def test_piper_synth_joins_chunks_and_wav_round_trips(tmp_path: Path) -> None:
+    chunks = [SimpleNamespace(sample_rate=22050, sample_channels=1, sample_width=2,
+                              audio_int16_bytes=bytes([i]) * 200) for i in (1, 2)]
+    voice = SimpleNamespace(synthesize=lambda text: iter(chunks))
+
+    clip = piper_synth(voice, "Hello. World.")
+    assert clip.fmt == FMT and clip.pcm == b"\x01" * 200 + b"\x02" * 200
+
+    write_wav(clip, tmp_path / "out.wav")
+    with wave.open(str(tmp_path / "out.wav")) as wf:
+        assert (wf.getframerate(), wf.getnchannels(), wf.getnframes()) == (22050, 1, 200)
+
+
+def test_split_chunks_sentences_and_short_first_phrase() -> None:
+    text = ("Okay, here is the summary of today's meeting with the whole team. "
+            "We ship Friday! Questions? Bob owns QA; Alice owns notes.")
+    assert split_chunks(text) == [
+        "Okay,",
+        "here is the summary of today's meeting with the whole team.",
+        "We ship Friday!", "Questions?", "Bob owns QA;", "Alice owns notes.",
+    ]
+    assert split_chunks("Are you done?") == ["Are you done?"]
+    assert split_chunks("  ") == []
+
+
+def test_stream_overlaps_synthesis_with_playback() -> None:
+    synth, sink = SlowSynth(delay=0.1), NullSink(realtime=True)  # 0.5 s clips
+
+    stats = stream(synth, ["One.", "Two.", "Three.", "Four."], sink)
+
+    assert stats.chunks == 4
+    assert stats.first_audio_sec < 0.15
+    # Serial would be 4 * (0.1 synth + 0.5 play) = 2.4 s; overlapped is about 0.1 + 4 * 0.5.
+    assert stats.total_sec < 2.25
+    assert sink.bytes_written == 4 * len(_clip(0.5).pcm)
+
+
+def test_stream_stops_producer_when_sink_fails() -> None:
+    class BrokenSink(NullSink):
+        def write(self, pcm: bytes, fmt: PcmFormat) -> None:
+            raise OSError("device gone")
+
+    synth = SlowSynth(delay=0.0)
+    with pytest.raises(OSError):
+        stream(synth, [f"Chunk {i}." for i in range(50)], BrokenSink(), depth=1)
+    assert not any(t.name == "gains-tts-synth" for t in threading.enumerate())
+    assert len(synth.calls) < 50
+
+
+def test_speaker_streams_multi_sentence_text_through_the_cache() -> None:
+    synth, sink = SlowSynth(), NullSink()
+    speaker = Speaker(synth, sink)
+    speaker.speak("First one. Second one.")
+    speaker.speak("Second one. Third one.")
+
+    assert synth.calls == ["First one.", "Second one.", "Third one."]
+    assert sink.bytes_written == 4 * len(_clip(0.5).pcm)
@@ -0,0 +1,163 @@
+"""TTS playback queue: priorities, coalescing, bounds, cancel and barge-in."""
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Iterator
+
+import pytest
+
+from services.tts.audio import Clip, NullSink, PcmFormat
+from services.tts.playback import PlaybackQueue, is_echo
+from services.tts.voice import Speaker, event_priority, handle_event
+
+FMT = PcmFormat(16000)
+
+
+class Recorder:
+    """``speak`` stand-in: each utterance lasts ``seconds`` unless stopped."""
+
+    def __init__(self, seconds: float = 0.2) -> None:
+        self.seconds = seconds
+        self.started: list[str] = []
+        self.finished: list[str] = []
+        self.busy = threading.Event()
+
+    def __call__(self, text: str, stop: threading.Event) -> bool:
+        self.started.append(text)
+        self.busy.set()
+        if stop.wait(self.seconds):
+            return False
+        self.finished.append(text)
+        return True
+
+
+def _wait(predicate, timeout: float = 3.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def worker() -> Iterator[Callable[[PlaybackQueue], None]]:
+    stop = threading.Event()
+    threads = []
+
+    def start(queue: PlaybackQueue) -> None:
+        t = threading.Thread(target=queue.run, args=(stop,), daemon=True)
+        t.start()
+        threads.append((queue, t))
+
+    yield start
+    stop.set()
+    for queue, t in threads:
+        queue.close()
+        t.join(timeout=2)
+
+
+def test_priority_order_and_coalescing(worker) -> None:
+    speak = Recorder(0.1)
+    queue = PlaybackQueue(speak)
+    assert queue.submit("first")
+    worker(queue)
+    speak.busy.wait(1)
+
+    assert not queue.submit("first")            # already playing
+    assert queue.submit("low", priority=0)
+    assert queue.submit("later", priority=0)
+    assert not queue.submit("low", priority=1)  # coalesced, and bumped
+    assert queue.depth == 2
+    _wait(lambda: len(speak.finished) == 3)
+
+    assert speak.finished == ["first", "low", "later"]
+    assert (queue.stats.played, queue.stats.coalesced) == (3, 2)
+
+
+def test_higher_priority_preempts_current(worker) -> None:
+    speak = Recorder(5.0)
+    queue = PlaybackQueue(speak)
+    worker(queue)
+    queue.submit("long story")
+    speak.busy.wait(1)
+    queue.submit("urgent", priority=5)
+
+    _wait(lambda: speak.started[-1:] == ["urgent"])
+    assert speak.finished == [] and queue.stats.preempted == 1
+
+
+def test_bounded_queue_drops_lowest_then_oldest() -> None:
+    queue = PlaybackQueue(Recorder(), max_depth=3)
+    assert queue.submit("a", priority=1)
+    assert queue.submit("b")
+    assert queue.submit("c")
+    assert queue.submit("d")                 # drops "b": lowest priority, oldest
+    assert not queue.submit("e", priority=-1)
+
+    assert [u.text for u in queue._pending] == ["a", "c", "d"]
+    assert (queue.depth, queue.stats.dropped, queue.stats.peak_depth) == (3, 2, 3)
+    status = queue.status()
+    assert status["event"] == "tts.status" and status["depth"] == 3 and status["dropped"] == 2
+
+
+def test_stale_utterances_expire_unplayed(worker) -> None:
+    now = [0.0]
+    speak = Recorder(0.0)
+    queue = PlaybackQueue(speak, max_age_sec=10, clock=lambda: now[0])
+    queue.submit("stale")
+    now[0] = 11.0
+    queue.submit("fresh")
+    worker(queue)
+
+    _wait(lambda: speak.finished == ["fresh"])
+    assert queue.stats.expired == 1
+
+
+def test_cancel_silences_speaker_within_a_block(worker) -> None:
+    sink = NullSink(realtime=True)
+    speaker = Speaker(lambda text: Clip(bytes(FMT.bytes_per_sec * 5), FMT), sink)
+    queue = PlaybackQueue(speaker.speak)
+    worker(queue)
+    queue.submit("five seconds of audio")
+    queue.submit("next")
+    _wait(lambda: sink.bytes_written > 0)
+
+    start = time.perf_counter()
+    assert queue.cancel() == 2
+    _wait(lambda: queue.playing is None)
+    assert time.perf_counter() - start < 0.2
+    assert sink.aborts == 1 and sink.bytes_written < FMT.bytes_per_sec
+    assert (queue.stats.cancelled, queue.stats.played) == (2, 0)
+
+
+def test_barge_in_ignores_echo_of_the_prompt(worker) -> None:
+    speak = Recorder(5.0)
+    queue = PlaybackQueue(speak)
+    assert not queue.barge_in("hello")  # nothing playing
+    worker(queue)
+    queue.submit("Are you done?")
+    speak.busy.wait(1)
+
+    assert not queue.barge_in(" you done")
+    assert queue.barge_in(" actually one more thing")
+    _wait(lambda: queue.playing is None)
+    assert queue.stats.barge_ins == 1 and speak.finished == []
+
+
+def test_is_echo() -> None:
+    assert is_echo("are you", "Are you done?")
+    assert not is_echo("are we", "Are you done?")
+    assert not is_echo("", "Are you done?")
+
+
+def test_malformed_priority_plays_at_zero(caplog: pytest.LogCaptureFixture) -> None:
+    assert event_priority({"priority": 3}) == 3
+    assert event_priority({"priority": "2"}) == 2
+    assert event_priority({}) == 0
+    assert event_priority({"priority": "high"}) == 0
+    assert "'high'" in caplog.text
+
+    queue = PlaybackQueue(Recorder())
+    handle_event(queue, {"event": "tts.play", "text": "hi", "priority": "high"})
+    handle_event(queue, {"event": "tts.play", "text": "urgent", "priority": [1]})
+    assert [(u.text, u.priority) for u in queue._pending] == [("hi", 0), ("urgent", 0)]
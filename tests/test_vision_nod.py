@@ -0,0 +1,94 @@
+"""Tests for the nod detector (services/vision/nod.py), without a camera."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from services.vision.nod import CONFIG, NodDetector, pitch_from_matrix
+from services.vision.scheduler import AdaptiveScheduler
+
+FPS = 30.0
+
+
+def _nod_trace(nods: int, seconds_between: float = 2.0) -> tuple[np.ndarray, np.ndarray]:
+    """Level head with ``nods`` quick dips to -25°, plus a little jitter."""
+    rng = np.random.default_rng(0)
+    frames = int(nods * seconds_between * FPS)
+    pitch = rng.normal(0.0, 0.3, frames)
+    for k in range(nods):
+        start = int((k + 0.5) * seconds_between * FPS)
+        pitch[start:start + 6] = np.linspace(0.0, -25.0, 6)
+        pitch[start + 6:start + 12] = np.linspace(-25.0, 0.0, 6)
+    return pitch, np.arange(frames) / FPS
+
+
+def _irregular_nod_trace(nods: int, frames_per_half: int) -> tuple[np.ndarray, np.ndarray]:
+    """Nods to -25° at random gaps, so they land at every phase of the scheduler."""
+    rng = np.random.default_rng(2)
+    gaps = rng.integers(45, 120, nods)
+    pitch = rng.normal(0.0, 0.3, int(gaps.sum()) + 60)
+    start = 30
+    for gap in gaps:
+        pitch[start:start + frames_per_half] = np.linspace(0.0, -25.0, frames_per_half)
+        pitch[start + frames_per_half:start + 2 * frames_per_half] = np.linspace(
+            -25.0, 0.0, frames_per_half)
+        start += gap
+    return pitch, np.arange(len(pitch)) / FPS
+
+
+def _adaptive_nods(pitch: np.ndarray, ts: np.ndarray) -> tuple[int, AdaptiveScheduler]:
+    """Replay a trace as the vision loop does, with the scheduler at its defaults."""
+    scheduler = AdaptiveScheduler(motion_threshold_deg=CONFIG["motion_threshold_deg"],
+                                  max_interval=CONFIG["max_inference_interval"],
+                                  calm_frames=CONFIG["calm_frames"])
+    detector = NodDetector()
+    nods = 0
+    for frame in zip(pitch, ts, strict=True):
+        if not scheduler.should_process(frame):
+            continue
+        p, t = frame
+        for held_pitch, held_ts in scheduler.observe(p):
+            nods += detector.update(held_pitch, held_ts) is not None
+        nods += detector.update(p, t) is not None
+    return nods, scheduler
+
+
+@pytest.mark.parametrize("trace", [
+    _nod_trace(900),
+    _irregular_nod_trace(900, frames_per_half=4),
+    _irregular_nod_trace(900, frames_per_half=6),
+], ids=["regular", "short-nods", "irregular"])
+def test_adaptive_scheduling_keeps_every_nod(trace: tuple[np.ndarray, np.ndarray]) -> None:
+    pitch, ts = trace
+    nods, scheduler = _adaptive_nods(pitch, ts)
+    assert nods == len(NodDetector().detect(pitch, ts)) == 900
+    assert scheduler.stats.skip_ratio > 0.4 and scheduler.stats.backfilled > 0
+
+
+def test_pitch_from_pure_x_rotation() -> None:
+    theta = np.radians(-20.0)
+    m = np.eye(4)
+    m[1:3, 1:3] = [[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]]
+    assert abs(pitch_from_matrix(m) + 20.0) < 1e-9
+
+
+def test_update_fires_once_per_nod() -> None:
+    pitch, ts = _nod_trace(nods=4)
+    detector = NodDetector()
+    fired = [detector.update(p, t) for p, t in zip(pitch, ts, strict=True)]
+    hits = [v for v in fired if v is not None]
+    assert len(hits) == 4
+    assert all(v < detector.nod_threshold_deg for v in hits)
+
+
+def test_batch_detect_matches_streaming_update() -> None:
+    rng = np.random.default_rng(1)
+    pitch = np.cumsum(rng.normal(0.0, 3.0, 5000))
+    pitch = np.clip(pitch, -40, 20)
+    ts = np.arange(len(pitch)) / FPS
+    detector = NodDetector(cooldown_sec=0.5)
+
+    streamed = [i for i, (p, t) in enumerate(zip(pitch, ts, strict=True))
+                if detector.update(p, t) is not None]
+    assert streamed
+    assert detector.detect(pitch, ts).tolist() == streamed
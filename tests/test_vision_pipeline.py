@@ -0,0 +1,94 @@
+"""Tests for the vision frame pipeline and adaptive inference scheduler."""
+from __future__ import annotations
+
+import threading
+import time
+
+import numpy as np
+
+from services.vision.pipeline import FrameSlot, StageTimes, capture_frames
+from services.vision.scheduler import AdaptiveScheduler
+
+
+class FakeCapture:
+    def __init__(self, frames: int) -> None:
+        self.frames = [np.full((2, 2, 3), i, dtype=np.uint8) for i in range(frames)]
+
+    def read(self) -> tuple[bool, np.ndarray | None]:
+        if not self.frames:
+            return False, None
+        return True, self.frames.pop(0)
+
+
+def test_slot_hands_over_only_the_newest_frame() -> None:
+    slot = FrameSlot()
+    assert slot.get(timeout=0.01) is None
+    for i in range(3):
+        slot.put(np.array([i]), captured=float(i))
+    frame, captured = slot.get(timeout=0.01)
+    assert frame.tolist() == [2] and captured == 2.0
+    assert slot.overwritten == 2
+    assert slot.get(timeout=0.01) is None  # already taken
+
+    slot.put(np.array([3]), captured=3.0)
+    slot.close()
+    assert slot.get(timeout=0.01)[1] == 3.0  # drained before reporting closed
+    assert slot.get(timeout=0.01) is None and slot.closed
+
+
+def test_slow_consumer_skips_stale_frames_with_bounded_age() -> None:
+    slot, times, stop = FrameSlot(), StageTimes(), threading.Event()
+    capture = threading.Thread(
+        target=capture_frames, args=(FakeCapture(60), slot, stop, times),
+        kwargs={"pace_fps": 200.0},
+    )
+    capture.start()
+    seen = []
+    while (item := slot.get(timeout=1.0)) is not None:
+        frame, captured = item
+        times.record("age", time.monotonic() - captured)
+        seen.append(int(frame[0, 0, 0]))
+        time.sleep(0.02)  # "inference" at 50 fps against a 200 fps source
+    capture.join()
+
+    assert seen == sorted(seen) and seen[-1] == 59
+    assert slot.overwritten + len(seen) == 60
+    assert slot.overwritten > 0
+    assert times.count("capture") == 61  # 60 frames + end of stream
+    # About one 20 ms "inference" plus scheduler jitter; a queue would grow to ~600 ms.
+    assert times.summary()["age"]["max_ms"] < 50.0
+
+
+def test_scheduler_backs_off_while_still_and_recovers_on_motion() -> None:
+    sched = AdaptiveScheduler(motion_threshold_deg=2.0, max_interval=4, calm_frames=3)
+    pitch = 0.0
+    for _ in range(200):  # still head: readings within the threshold
+        if sched.should_process():
+            sched.observe(pitch)
+            pitch = 0.5 - pitch
+    assert sched.interval == 4
+    assert sched.stats.skip_ratio > 0.5
+
+    sched.observe(-10.0)  # nod starts
+    assert sched.interval == 1
+    assert all(sched.should_process() for _ in range(3))
+
+    sched.observe(None)  # face lost: full rate, full frame
+    assert sched.interval == 1 and sched.region(640, 480) == (0, 0, 640, 480)
+
+
+def test_scheduler_crops_to_a_stable_face_box() -> None:
+    sched = AdaptiveScheduler(roi_margin=0.5, min_roi=64, max_width=100)
+    full = sched.region(640, 480)
+    sched.update_box(np.array([0.4, 0.6]), np.array([0.4, 0.6]), full)
+    assert sched.box == (256, 192, 384, 288)
+    x0, y0, x1, y1 = sched.region(640, 480)
+    assert (x0, y0, x1, y1) == (224, 144, 416, 336)
+    assert sched.scale(x1 - x0) == 100 / 192
+
+    # Small jitter inside the crop keeps the box (stable image for tracking) ...
+    sched.update_box(np.array([0.17, 0.84]), np.array([0.25, 0.75]), (x0, y0, x1, y1))
+    assert sched.box == (256, 192, 384, 288)
+    # ... a real move re-centres it.
+    sched.update_box(np.array([0.6, 0.95]), np.array([0.25, 0.75]), (x0, y0, x1, y1))
+    assert sched.box[0] > 256